@@ -0,0 +1,108 @@
+import asyncio
+import copy
+import os
+from concurrent.futures import Executor
+from functools import partial
+from typing import Dict, Hashable, Optional, Tuple
+from weakref import WeakKeyDictionary
+
+from tint_gear.main import process_image_data
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+def read_file(image_path: str) -> bytes:
+  with open(image_path, 'rb') as image_file:
+    return image_file.read()
+
+
+async def create_request_key(
+  image_path: str,
+  options: dict,
+) -> Tuple[Hashable, ...]:
+  if not isinstance(image_path, str):
+    raise TypeError("image_path must be a string.")
+
+  real_path = os.path.realpath(image_path)
+  stat = await asyncio.to_thread(os.stat, real_path)
+
+  return (
+    real_path,
+    stat.st_mtime_ns,
+    stat.st_size,
+    tuple(
+      sorted((name, tuple(value) if isinstance(value, list) else value)
+             for name, value in options.items())),
+  )
+
+
+class ThemeProcessor:
+
+  def __init__(
+    self,
+    executor: Optional[Executor] = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+  ):
+    if max_concurrency <= 0:
+      raise ValueError("max_concurrency must be a positive integer.")
+
+    self.executor = executor
+    self.semaphore = asyncio.Semaphore(max_concurrency)
+    self.in_flight: Dict[Hashable, asyncio.Task] = {}
+    self.waiters: Dict[asyncio.Task, int] = {}
+
+  async def process(self, image_path: str, **options) -> dict:
+    key = await create_request_key(image_path, options)
+
+    task = self.in_flight.get(key)
+    if task is None:
+      task = asyncio.ensure_future(self.compute(image_path, options))
+      self.in_flight[key] = task
+      task.add_done_callback(lambda _: self.forget(key, task))
+
+    self.waiters[task] = self.waiters.get(task, 0) + 1
+    try:
+      return copy.deepcopy(await asyncio.shield(task))
+    finally:
+      self.waiters[task] -= 1
+      if self.waiters[task] == 0:
+        del self.waiters[task]
+        if not task.done():
+          self.forget(key, task)
+          task.cancel()
+
+  def forget(self, key: Hashable, task: asyncio.Task):
+    if self.in_flight.get(key) is task:
+      del self.in_flight[key]
+
+  async def compute(self, image_path: str, options: dict) -> dict:
+    async with self.semaphore:
+      data = await asyncio.to_thread(read_file, image_path)
+      loop = asyncio.get_running_loop()
+      future = loop.run_in_executor(
+        self.executor,
+        partial(process_image_data, data, **options),
+      )
+      try:
+        return await asyncio.shield(future)
+      except asyncio.CancelledError:
+        await asyncio.wait([future])
+        raise
+
+
+default_processors: WeakKeyDictionary = WeakKeyDictionary()
+
+
+async def process_async(
+  image_path: str,
+  processor: Optional[ThemeProcessor] = None,
+  **options,
+) -> dict:
+  if processor is None:
+    loop = asyncio.get_running_loop()
+    processor = default_processors.get(loop)
+    if processor is None:
+      processor = ThemeProcessor()
+      default_processors[loop] = processor
+
+  return await processor.process(image_path, **options)
@@ -0,0 +1,501 @@
+import math
+import os
+from typing import Callable, List, NamedTuple, Optional
+
+import numpy as np
+
+from tint_gear.batch import (
+  GAMUT_EPSILON,
+  GAMUT_ITERATIONS,
+  LIGHTNESS_INCREMENT,
+  LUMINANCE_ITERATIONS,
+  LUMINANCE_TOLERANCE,
+  RGB_MAX,
+  RGB_MIN,
+  adjust_contrast_batch,
+  gamut_map_oklab_batch,
+  get_hue_batch,
+  get_luminance_batch,
+  get_saturation_batch,
+  oklab_to_srgb_batch,
+  set_luminance_batch,
+  set_saturation_batch,
+  srgb_to_oklab_batch,
+  step_luminance_batch,
+)
+
+BACKEND_NAMES = ['numba', 'numpy', 'python']
+BACKEND_ENVIRONMENT_VARIABLE = 'TINT_GEAR_BACKEND'
+AUTO_BACKEND = 'auto'
+NUMPY_MIN_BATCH_SIZE = 16
+
+
+class Backend(NamedTuple):
+  name: str
+  srgb_to_oklab: Callable[[np.ndarray], np.ndarray]
+  oklab_to_srgb: Callable[[np.ndarray], np.ndarray]
+  gamut_map_oklab: Callable[[np.ndarray], np.ndarray]
+  get_luminance: Callable[[np.ndarray], np.ndarray]
+  get_saturation: Callable[[np.ndarray], np.ndarray]
+  get_hue: Callable[[np.ndarray], np.ndarray]
+  set_luminance: Callable[[np.ndarray, np.ndarray], np.ndarray]
+  set_saturation: Callable[[np.ndarray, np.ndarray], np.ndarray]
+  step_luminance: Callable[..., np.ndarray]
+  adjust_contrast: Callable[..., np.ndarray]
+
+
+def assert_backend_name(name):
+  if not isinstance(name, str):
+    raise TypeError("backend name must be a string.")
+  if name != AUTO_BACKEND and name not in BACKEND_NAMES:
+    raise ValueError(f"Unknown backend {name}! Expected {AUTO_BACKEND} or "
+                     f"one of {', '.join(BACKEND_NAMES)}.")
+
+
+def create_color_kernels(jit):
+
+  @jit
+  def srgb_to_linear(value):
+    if value <= 0.04045:
+      return value / 12.92
+    return ((value + 0.055) / 1.055)**2.4
+
+  @jit
+  def linear_to_srgb(value):
+    value = min(max(value, RGB_MIN), RGB_MAX)
+    if value <= 0.0031308:
+      return 12.92 * value
+    return 1.055 * value**(1 / 2.4) - 0.055
+
+  @jit
+  def cube_root(value):
+    return math.copysign(abs(value)**(1 / 3), value)
+
+  @jit
+  def linear_srgb_to_oklab(r, g, b):
+    l_ = cube_root(0.4122214708 * r + 0.5363325363 * g + 0.0514459929 * b)
+    m_ = cube_root(0.2119034982 * r + 0.6806995451 * g + 0.1073969566 * b)
+    s_ = cube_root(0.0883024619 * r + 0.2817188376 * g + 0.6299787005 * b)
+    return (
+      0.2104542553 * l_ + 0.7936177850 * m_ - 0.0040720468 * s_,
+      1.9779984951 * l_ - 2.4285922050 * m_ + 0.4505937099 * s_,
+      0.0259040371 * l_ + 0.7827717662 * m_ - 0.8086757660 * s_,
+    )
+
+  @jit
+  def oklab_to_linear_srgb(L, a, b):
+    l = (L + 0.3963377774 * a + 0.2158037573 * b)**3
+    m = (L - 0.1055613458 * a - 0.0638541728 * b)**3
+    s = (L - 0.0894841775 * a - 1.2914855480 * b)**3
+    return (
+      4.0767416621 * l - 3.3077115913 * m + 0.2309699292 * s,
+      -1.2684380046 * l + 2.6097574011 * m - 0.3413193965 * s,
+      -0.0041960863 * l - 0.7034186147 * m + 1.7076147010 * s,
+    )
+
+  @jit
+  def srgb_to_oklab(r, g, b):
+    return linear_srgb_to_oklab(
+      srgb_to_linear(r),
+      srgb_to_linear(g),
+      srgb_to_linear(b),
+    )
+
+  @jit
+  def oklab_to_srgb(L, a, b):
+    r, g, b = oklab_to_linear_srgb(L, a, b)
+    return linear_to_srgb(r), linear_to_srgb(g), linear_to_srgb(b)
+
+  @jit
+  def is_in_gamut(r, g, b):
+    return (RGB_MIN - GAMUT_EPSILON <= r <= RGB_MAX + GAMUT_EPSILON
+            and RGB_MIN - GAMUT_EPSILON <= g <= RGB_MAX + GAMUT_EPSILON
+            and RGB_MIN - GAMUT_EPSILON <= b <= RGB_MAX + GAMUT_EPSILON)
+
+  @jit
+  def gamut_map_oklab(L, a, b):
+    L = min(max(L, 0.0), 1.0)
+    r, g, b_ = oklab_to_linear_srgb(L, a, b)
+    if is_in_gamut(r, g, b_):
+      return oklab_to_srgb(L, a, b)
+
+    low = 0.0
+    high = 1.0
+    for _ in range(GAMUT_ITERATIONS):
+      scale = (low + high) / 2
+      r, g, b_ = oklab_to_linear_srgb(L, a * scale, b * scale)
+      if is_in_gamut(r, g, b_):
+        low = scale
+      else:
+        high = scale
+    return oklab_to_srgb(L, a * low, b * low)
+
+  @jit
+  def get_luminance(r, g, b):
+    return (0.2126 * srgb_to_linear(r) + 0.7152 * srgb_to_linear(g) +
+            0.0722 * srgb_to_linear(b))
+
+  @jit
+  def get_saturation(r, g, b):
+    _, a, b = srgb_to_oklab(r, g, b)
+    return math.hypot(a, b)
+
+  @jit
+  def get_hue(r, g, b):
+    _, a, b = srgb_to_oklab(r, g, b)
+    return math.degrees(math.atan2(b, a)) % 360
+
+  @jit
+  def set_luminance(r, g, b, target):
+    _, a, b = srgb_to_oklab(r, g, b)
+    low = 0.0
+    high = 1.0
+    low_error = -target
+    high_error = 1.0 - target
+    side = 0.0
+    lightness = cube_root(target)
+
+    for _ in range(LUMINANCE_ITERATIONS):
+      mapped_r, mapped_g, mapped_b = gamut_map_oklab(lightness, a, b)
+      error = get_luminance(mapped_r, mapped_g, mapped_b) - target
+      if abs(error) <= LUMINANCE_TOLERANCE:
+        break
+
+      too_dark = error < 0
+      if too_dark:
+        low = lightness
+        low_error = error
+      else:
+        high = lightness
+        high_error = error
+      new_side = -1.0 if too_dark else 1.0
+      if side == new_side:
+        if too_dark:
+          high_error = high_error / 2
+        else:
+          low_error = low_error / 2
+      side = new_side
+
+      span = high_error - low_error
+      secant = (low * high_error -
+                high * low_error) / (span if span > 0 else 1.0)
+      if span > 0 and low < secant < high:
+        lightness = secant
+      else:
+        lightness = (low + high) / 2
+
+    return gamut_map_oklab(lightness, a, b)
+
+  @jit
+  def step_luminance(r, g, b, target, increment):
+    L, a, b_ = srgb_to_oklab(r, g, b)
+    lightness = min(max(L, 0.0), 1.0)
+    step = increment if get_luminance(r, g, b) < target else -increment
+
+    for _ in range(math.ceil(1 / increment)):
+      lightness += step
+      if not 0.0 <= lightness <= 1.0:
+        break
+
+      r, g, b = oklab_to_srgb(lightness, a, b_)
+      luminance = get_luminance(r, g, b)
+      if ((step > 0 and luminance >= target)
+          or (step < 0 and luminance <= target)):
+        break
+
+    return (
+      min(max(r, RGB_MIN), RGB_MAX),
+      min(max(g, RGB_MIN), RGB_MAX),
+      min(max(b, RGB_MIN), RGB_MAX),
+    )
+
+  @jit
+  def set_saturation(r, g, b, target):
+    L, a, b = srgb_to_oklab(r, g, b)
+    target = min(max(target, 0.0), 1.0)
+    saturation = math.hypot(a, b)
+    if saturation == 0:
+      return oklab_to_srgb(L, target, 0.0)
+    scale = target / saturation
+    return oklab_to_srgb(L, a * scale, b * scale)
+
+  @jit
+  def adjust_contrast(
+    r,
+    g,
+    b,
+    average_luminance,
+    is_light,
+    invert,
+    high_contrast,
+    k,
+  ):
+    luminance_diff = get_luminance(r, g, b) - average_luminance
+
+    range_min = min(
+      max((1 / (8.0 if high_contrast else 5.0)) *
+          (1 - math.exp(-k * average_luminance)), 0.0), 1.0)
+    range_max = min(max(range_min * (7.0 if high_contrast else 4.5), 0.0), 1.0)
+
+    if invert:
+      range_min = 1 - range_min
+      range_max = 1 - range_max
+
+    if is_light:
+      final_luminance = (average_luminance * (1 - range_max) + range_max +
+                         (1 - range_max) * luminance_diff)
+    else:
+      final_luminance = (average_luminance * range_min +
+                         range_min * luminance_diff)
+
+    return step_luminance(
+      r,
+      g,
+      b,
+      min(max(final_luminance, 0.0), 1.0),
+      LIGHTNESS_INCREMENT,
+    )
+
+  @jit
+  def map_colors_to_colors(colors, operation):
+    result = np.empty_like(colors)
+    for index in range(len(colors)):
+      r, g, b = colors[index, 0], colors[index, 1], colors[index, 2]
+      if operation == 0:
+        result[index] = srgb_to_oklab(r, g, b)
+      elif operation == 1:
+        result[index] = oklab_to_srgb(r, g, b)
+      else:
+        result[index] = gamut_map_oklab(r, g, b)
+    return result
+
+  @jit
+  def map_colors_to_values(colors, operation):
+    result = np.empty(len(colors))
+    for index in range(len(colors)):
+      r, g, b = colors[index, 0], colors[index, 1], colors[index, 2]
+      if operation == 0:
+        result[index] = get_luminance(r, g, b)
+      elif operation == 1:
+        result[index] = get_saturation(r, g, b)
+      else:
+        result[index] = get_hue(r, g, b)
+    return result
+
+  @jit
+  def adjust_colors(colors, targets, operation, increment):
+    result = np.empty_like(colors)
+    for index in range(len(colors)):
+      r, g, b = colors[index, 0], colors[index, 1], colors[index, 2]
+      if operation == 0:
+        result[index] = set_luminance(r, g, b, targets[index])
+      elif operation == 1:
+        result[index] = set_saturation(r, g, b, targets[index])
+      else:
+        result[index] = step_luminance(r, g, b, targets[index], increment)
+    return result
+
+  @jit
+  def adjust_contrast_colors(
+    colors,
+    average_luminance,
+    is_light,
+    invert,
+    high_contrast,
+    k,
+  ):
+    result = np.empty_like(colors)
+    for index in range(len(colors)):
+      result[index] = adjust_contrast(
+        colors[index, 0],
+        colors[index, 1],
+        colors[index, 2],
+        average_luminance,
+        is_light,
+        invert,
+        high_contrast,
+        k,
+      )
+    return result
+
+  return (
+    map_colors_to_colors,
+    map_colors_to_values,
+    adjust_colors,
+    adjust_contrast_colors,
+  )
+
+
+def create_kernel_backend(name: str, jit) -> Backend:
+  (
+    map_colors_to_colors,
+    map_colors_to_values,
+    adjust_colors,
+    adjust_contrast_colors,
+  ) = create_color_kernels(jit)
+
+  def flatten(colors):
+    colors = np.asarray(colors, dtype=np.float64)
+    return colors.shape, np.ascontiguousarray(colors.reshape(-1, 3))
+
+  def create_color_operation(operation):
+
+    def apply(colors):
+      shape, flat = flatten(colors)
+      return map_colors_to_colors(flat, operation).reshape(shape)
+
+    return apply
+
+  def create_value_operation(operation):
+
+    def apply(colors):
+      shape, flat = flatten(colors)
+      return map_colors_to_values(flat, operation).reshape(shape[:-1])
+
+    return apply
+
+  def create_adjust_operation(operation):
+
+    def apply(colors, targets, increment=LIGHTNESS_INCREMENT):
+      shape, flat = flatten(colors)
+      targets = np.ascontiguousarray(
+        np.broadcast_to(targets, shape[:-1]).ravel(),
+        dtype=np.float64,
+      )
+      return adjust_colors(
+        flat,
+        targets,
+        operation,
+        float(increment),
+      ).reshape(shape)
+
+    return apply
+
+  def adjust_contrast(
+    colors,
+    average_luminance,
+    is_light,
+    invert,
+    high_contrast,
+    k,
+  ):
+    shape, flat = flatten(colors)
+    return adjust_contrast_colors(
+      flat,
+      float(average_luminance),
+      bool(is_light),
+      bool(invert),
+      bool(high_contrast),
+      float(k),
+    ).reshape(shape)
+
+  return Backend(
+    name=name,
+    srgb_to_oklab=create_color_operation(0),
+    oklab_to_srgb=create_color_operation(1),
+    gamut_map_oklab=create_color_operation(2),
+    get_luminance=create_value_operation(0),
+    get_saturation=create_value_operation(1),
+    get_hue=create_value_operation(2),
+    set_luminance=create_adjust_operation(0),
+    set_saturation=create_adjust_operation(1),
+    step_luminance=create_adjust_operation(2),
+    adjust_contrast=adjust_contrast,
+  )
+
+
+def create_python_backend() -> Backend:
+  return create_kernel_backend('python', lambda function: function)
+
+
+def create_numpy_backend() -> Backend:
+  python_backend = create_python_backend()
+  numpy_backend = Backend(
+    name='numpy',
+    srgb_to_oklab=srgb_to_oklab_batch,
+    oklab_to_srgb=oklab_to_srgb_batch,
+    gamut_map_oklab=gamut_map_oklab_batch,
+    get_luminance=get_luminance_batch,
+    get_saturation=get_saturation_batch,
+    get_hue=get_hue_batch,
+    set_luminance=set_luminance_batch,
+    set_saturation=set_saturation_batch,
+    step_luminance=step_luminance_batch,
+    adjust_contrast=adjust_contrast_batch,
+  )
+
+  def dispatch(batch_operation, kernel_operation):
+
+    def apply(colors, *args, **kwargs):
+      if np.size(colors) < 3 * NUMPY_MIN_BATCH_SIZE:
+        return kernel_operation(colors, *args, **kwargs)
+      return batch_operation(colors, *args, **kwargs)
+
+    return apply
+
+  return numpy_backend._replace(
+    **{
+      field:
+      dispatch(
+        getattr(numpy_backend, field),
+        getattr(python_backend, field),
+      )
+      for field in Backend._fields[1:]
+    })
+
+
+def create_numba_backend() -> Optional[Backend]:
+  try:
+    import numba
+  except ImportError:
+    return None
+
+  return create_kernel_backend('numba', numba.njit(cache=True))
+
+
+def create_backend(name: str) -> Optional[Backend]:
+  if name == 'numba':
+    return create_numba_backend()
+  if name == 'numpy':
+    return create_numpy_backend()
+  return create_python_backend()
+
+
+def list_available_backends() -> List[str]:
+  available = ['numpy', 'python']
+  try:
+    import numba  # noqa: F401
+  except ImportError:
+    return available
+  return ['numba'] + available
+
+
+def select_backend(name: Optional[str] = None) -> Backend:
+  if name is None:
+    name = os.environ.get(BACKEND_ENVIRONMENT_VARIABLE, AUTO_BACKEND)
+  assert_backend_name(name)
+
+  if name == AUTO_BACKEND:
+    name = list_available_backends()[0]
+
+  backend = create_backend(name)
+  if backend is None:
+    raise ValueError(f"Backend {name} is not available! Available backends "
+                     f"are {', '.join(list_available_backends())}.")
+  return backend
+
+
+current_backend: Optional[Backend] = None
+
+
+def get_backend() -> Backend:
+  global current_backend
+  if current_backend is None:
+    current_backend = select_backend()
+  return current_backend
+
+
+def set_backend(name: Optional[str] = None) -> Backend:
+  global current_backend
+  current_backend = select_backend(name)
+  return current_backend
@@ -0,0 +1,312 @@
+import math
+
+import numpy as np
+
+RGB_MIN = 0.0
+RGB_MAX = 1.0
+
+LINEAR_SRGB_TO_LMS = np.array([
+  [0.4122214708, 0.5363325363, 0.0514459929],
+  [0.2119034982, 0.6806995451, 0.1073969566],
+  [0.0883024619, 0.2817188376, 0.6299787005],
+])
+
+LMS_TO_OKLAB = np.array([
+  [0.2104542553, 0.7936177850, -0.0040720468],
+  [1.9779984951, -2.4285922050, 0.4505937099],
+  [0.0259040371, 0.7827717662, -0.8086757660],
+])
+
+OKLAB_TO_LMS = np.array([
+  [1.0, 0.3963377774, 0.2158037573],
+  [1.0, -0.1055613458, -0.0638541728],
+  [1.0, -0.0894841775, -1.2914855480],
+])
+
+LMS_TO_LINEAR_SRGB = np.array([
+  [4.0767416621, -3.3077115913, 0.2309699292],
+  [-1.2684380046, 2.6097574011, -0.3413193965],
+  [-0.0041960863, -0.7034186147, 1.7076147010],
+])
+
+LUMINANCE_WEIGHTS = np.array([0.2126, 0.7152, 0.0722])
+
+
+def srgb_to_linear_srgb_batch(colors: np.ndarray) -> np.ndarray:
+  colors = np.asarray(colors, dtype=np.float64)
+  return np.where(
+    colors <= 0.04045,
+    colors / 12.92,
+    ((colors + 0.055) / 1.055)**2.4,
+  )
+
+
+def linear_srgb_to_srgb_batch(colors: np.ndarray) -> np.ndarray:
+  colors = np.clip(np.asarray(colors, dtype=np.float64), RGB_MIN, RGB_MAX)
+  return np.where(
+    colors <= 0.0031308,
+    12.92 * colors,
+    1.055 * colors**(1 / 2.4) - 0.055,
+  )
+
+
+def linear_srgb_to_oklab_batch(colors: np.ndarray) -> np.ndarray:
+  lms = np.asarray(colors, dtype=np.float64) @ LINEAR_SRGB_TO_LMS.T
+  return np.cbrt(lms) @ LMS_TO_OKLAB.T
+
+
+def oklab_to_linear_srgb_batch(colors: np.ndarray) -> np.ndarray:
+  lms = (np.asarray(colors, dtype=np.float64) @ OKLAB_TO_LMS.T)**3
+  return lms @ LMS_TO_LINEAR_SRGB.T
+
+
+def srgb_to_oklab_batch(colors: np.ndarray) -> np.ndarray:
+  return linear_srgb_to_oklab_batch(srgb_to_linear_srgb_batch(colors))
+
+
+def oklab_to_srgb_batch(colors: np.ndarray) -> np.ndarray:
+  return linear_srgb_to_srgb_batch(oklab_to_linear_srgb_batch(colors))
+
+
+SRGB_TO_LINEAR_LUT = srgb_to_linear_srgb_batch(np.arange(256) / 255.0)
+
+
+def srgb8_to_oklab_batch(pixels: np.ndarray) -> np.ndarray:
+  return linear_srgb_to_oklab_batch(SRGB_TO_LINEAR_LUT[pixels])
+
+
+def get_luminance_batch(colors: np.ndarray) -> np.ndarray:
+  return srgb_to_linear_srgb_batch(colors) @ LUMINANCE_WEIGHTS
+
+
+def get_saturation_batch(colors: np.ndarray) -> np.ndarray:
+  oklab = srgb_to_oklab_batch(colors)
+  return np.hypot(oklab[..., 1], oklab[..., 2])
+
+
+def get_hue_batch(colors: np.ndarray) -> np.ndarray:
+  oklab = srgb_to_oklab_batch(colors)
+  return np.degrees(np.arctan2(oklab[..., 2], oklab[..., 1])) % 360
+
+
+GAMUT_EPSILON = 1e-9
+GAMUT_ITERATIONS = 30
+
+
+def is_in_gamut_batch(linear_colors: np.ndarray) -> np.ndarray:
+  return np.all(
+    (linear_colors >= RGB_MIN - GAMUT_EPSILON) &
+    (linear_colors <= RGB_MAX + GAMUT_EPSILON),
+    axis=-1,
+  )
+
+
+def gamut_map_oklab_batch(
+  colors: np.ndarray,
+  iterations: int = GAMUT_ITERATIONS,
+) -> np.ndarray:
+  colors = np.asarray(colors, dtype=np.float64)
+  mapped = np.concatenate(
+    [np.clip(colors[..., :1], 0.0, 1.0), colors[..., 1:]],
+    axis=-1,
+  )
+  outside = ~is_in_gamut_batch(oklab_to_linear_srgb_batch(mapped))
+
+  if outside.any():
+    lightness = mapped[outside][:, :1]
+    ab = mapped[outside][:, 1:]
+    low = np.zeros(lightness.shape)
+    high = np.ones(lightness.shape)
+    for _ in range(iterations):
+      scale = (low + high) / 2
+      linear = oklab_to_linear_srgb_batch(
+        np.concatenate([lightness, ab * scale], axis=-1))
+      scale_inside = is_in_gamut_batch(linear)[:, np.newaxis]
+      low = np.where(scale_inside, scale, low)
+      high = np.where(scale_inside, high, scale)
+    mapped[outside] = np.concatenate([lightness, ab * low], axis=-1)
+
+  return oklab_to_srgb_batch(mapped)
+
+
+CONTRAST_OFFSET = 0.05
+LUMINANCE_ITERATIONS = 48
+LUMINANCE_TOLERANCE = 1e-9
+LIGHTNESS_INCREMENT = 0.01
+
+
+def calculate_contrast_ratio_batch(
+  luminances: np.ndarray,
+  other_luminances: np.ndarray,
+) -> np.ndarray:
+  lighter = np.maximum(luminances, other_luminances)
+  darker = np.minimum(luminances, other_luminances)
+  return (lighter + CONTRAST_OFFSET) / (darker + CONTRAST_OFFSET)
+
+
+def set_luminance_batch(
+  colors: np.ndarray,
+  target_luminances: np.ndarray,
+  iterations: int = LUMINANCE_ITERATIONS,
+  tolerance: float = LUMINANCE_TOLERANCE,
+) -> np.ndarray:
+  oklab = srgb_to_oklab_batch(colors)
+  shape = oklab.shape
+  oklab = oklab.reshape(-1, 3)
+  targets = np.broadcast_to(target_luminances, shape[:-1]).ravel()
+
+  low = np.zeros(len(oklab))
+  high = np.ones(len(oklab))
+  low_error = -targets
+  high_error = 1.0 - targets
+  side = np.zeros(len(oklab))
+  oklab[:, 0] = np.cbrt(targets)
+
+  active = np.arange(len(oklab))
+  for _ in range(iterations):
+    errors = get_luminance_batch(gamut_map_oklab_batch(
+      oklab[active])) - targets[active]
+    unresolved = np.abs(errors) > tolerance
+    active, errors = active[unresolved], errors[unresolved]
+    if len(active) == 0:
+      break
+
+    lightness = oklab[active, 0]
+    too_dark = errors < 0
+    low[active] = np.where(too_dark, lightness, low[active])
+    high[active] = np.where(too_dark, high[active], lightness)
+    low_error[active] = np.where(too_dark, errors, low_error[active])
+    high_error[active] = np.where(too_dark, high_error[active], errors)
+    repeated = side[active] == np.where(too_dark, -1.0, 1.0)
+    high_error[active] = np.where(repeated & too_dark, high_error[active] / 2,
+                                  high_error[active])
+    low_error[active] = np.where(repeated & ~too_dark, low_error[active] / 2,
+                                 low_error[active])
+    side[active] = np.where(too_dark, -1.0, 1.0)
+
+    span = high_error[active] - low_error[active]
+    secant = (low[active] * high_error[active] -
+              high[active] * low_error[active]) / np.where(span > 0, span, 1.0)
+    midpoint = (low[active] + high[active]) / 2
+    oklab[active, 0] = np.where(
+      (span > 0) & (secant > low[active]) & (secant < high[active]),
+      secant,
+      midpoint,
+    )
+
+  return gamut_map_oklab_batch(oklab).reshape(shape)
+
+
+def step_luminance_batch(
+  colors: np.ndarray,
+  target_luminances: np.ndarray,
+  increment: float = LIGHTNESS_INCREMENT,
+) -> np.ndarray:
+  colors = np.asarray(colors, dtype=np.float64)
+  shape = colors.shape
+  colors = colors.reshape(-1, 3)
+  targets = np.broadcast_to(target_luminances, shape[:-1]).ravel()
+
+  oklab = srgb_to_oklab_batch(colors)
+  oklab[:, 0] = np.clip(oklab[:, 0], 0.0, 1.0)
+  steps = np.where(
+    get_luminance_batch(colors) < targets,
+    increment,
+    -increment,
+  )
+
+  stepped = np.full(len(colors), np.nan)
+  active = np.arange(len(colors))
+  lightness = oklab[:, 0].copy()
+  for _ in range(math.ceil(1 / increment)):
+    lightness += steps[active]
+    inside = (lightness >= 0.0) & (lightness <= 1.0)
+    active, lightness = active[inside], lightness[inside]
+    if len(active) == 0:
+      break
+
+    stepped[active] = lightness
+    linear = np.clip(
+      oklab_to_linear_srgb_batch(
+        np.concatenate([lightness[:, np.newaxis], oklab[active, 1:]], axis=-1)),
+      RGB_MIN,
+      RGB_MAX,
+    )
+    luminances = linear @ LUMINANCE_WEIGHTS
+    crossed = np.where(
+      steps[active] > 0,
+      luminances >= targets[active],
+      luminances <= targets[active],
+    )
+    active, lightness = active[~crossed], lightness[~crossed]
+
+  result = colors.copy()
+  moved = ~np.isnan(stepped)
+  oklab[moved, 0] = stepped[moved]
+  result[moved] = oklab_to_srgb_batch(oklab[moved])
+  return np.clip(result, RGB_MIN, RGB_MAX).reshape(shape)
+
+
+def pack_colors_batch(colors: np.ndarray) -> np.ndarray:
+  components = np.rint(
+    np.clip(np.asarray(colors, dtype=np.float64), RGB_MIN, RGB_MAX) *
+    255).astype(np.uint32)
+  return ((components[..., 0] << 16) | (components[..., 1] << 8)
+          | components[..., 2])
+
+
+def unpack_colors_batch(packed: np.ndarray) -> np.ndarray:
+  packed = np.asarray(packed, dtype=np.uint32)
+  components = np.stack(
+    [(packed >> 16) & 0xff, (packed >> 8) & 0xff, packed & 0xff],
+    axis=-1,
+  )
+  return components / 255.0
+
+
+def set_saturation_batch(
+  colors: np.ndarray,
+  target_saturations: np.ndarray,
+) -> np.ndarray:
+  oklab = srgb_to_oklab_batch(colors)
+  target_saturations = np.clip(target_saturations, 0.0, 1.0)
+
+  saturations = np.hypot(oklab[..., 1], oklab[..., 2])
+  gray = saturations == 0
+  scales = np.where(gray, 0.0,
+                    target_saturations / np.where(gray, 1.0, saturations))
+  oklab[..., 1] = np.where(gray, target_saturations, oklab[..., 1] * scales)
+  oklab[..., 2] = oklab[..., 2] * scales
+  return oklab_to_srgb_batch(oklab)
+
+
+def adjust_contrast_batch(
+  colors: np.ndarray,
+  average_luminance: float,
+  is_light: bool,
+  invert: bool,
+  high_contrast: bool,
+  k: float,
+) -> np.ndarray:
+  luminances = get_luminance_batch(colors)
+  luminance_diffs = luminances - average_luminance
+
+  range_min = np.clip((1 / (8.0 if high_contrast else 5.0)) *
+                      (1 - np.exp(-k * average_luminance)), 0.0, 1.0)
+  range_max = np.clip(range_min * (7.0 if high_contrast else 4.5), 0.0, 1.0)
+
+  if invert:
+    range_min = 1 - range_min
+    range_max = 1 - range_max
+
+  if is_light:
+    final_luminances = (average_luminance * (1 - range_max) + range_max +
+                        (1 - range_max) * luminance_diffs)
+  else:
+    final_luminances = (average_luminance * range_min +
+                        range_min * luminance_diffs)
+
+  return step_luminance_batch(
+    colors,
+    np.clip(final_luminances, 0.0, 1.0),
+  )
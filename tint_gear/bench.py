@@ -0,0 +1,103 @@
+import os
+import random
+import argparse
+import tempfile
+import time
+from typing import Callable, List
+
+from PIL import Image
+
+from tint_gear.extract import extract_prominent_colors
+from tint_gear.main import derive_theme
+
+DEFAULT_PALETTE_SIZES = [8, 16, 32, 64, 128, 256]
+
+
+def main():
+  parsed_args = parse_args()
+
+  if parsed_args.image_path is not None:
+    run_benchmark(
+      parsed_args.image_path,
+      parsed_args.sizes,
+      parsed_args.repeat,
+    )
+    return
+
+  with tempfile.TemporaryDirectory() as directory:
+    image_path = os.path.join(directory, 'noise.png')
+    create_noise_image(image_path, parsed_args.width, parsed_args.height)
+    run_benchmark(image_path, parsed_args.sizes, parsed_args.repeat)
+
+
+def create_noise_image(image_path: str, width: int, height: int, seed=0):
+  noise = random.Random(seed).randbytes(width * height * 3)
+  Image.frombytes('RGB', (width, height), noise).save(image_path)
+
+
+def measure(function: Callable[[], object], repeat: int) -> float:
+  timings = []
+  for _ in range(repeat):
+    start = time.perf_counter()
+    function()
+    timings.append(time.perf_counter() - start)
+  return min(timings)
+
+
+def run_benchmark(image_path: str, sizes: List[int], repeat: int):
+  print(f"{'colors':>8} {'palette':>8} {'extract ms':>12} {'derive ms':>12}")
+  for size in sizes:
+    colors = extract_prominent_colors(image_path, size)
+    extract_time = measure(
+      lambda: extract_prominent_colors(image_path, size),
+      repeat,
+    )
+    derive_time = measure(lambda: derive_theme(colors), repeat)
+    print(f"{size:>8} {len(colors):>8} "
+          f"{extract_time * 1000:>12.2f} {derive_time * 1000:>12.2f}")
+
+
+def parse_args():
+  parser = argparse.ArgumentParser(description="Tint Gear benchmark")
+
+  parser.add_argument(
+    'image_path',
+    type=str,
+    nargs='?',
+    help="Path to the image file; a noise image is generated when omitted.",
+  )
+
+  parser.add_argument(
+    '--sizes',
+    type=int,
+    nargs='+',
+    default=DEFAULT_PALETTE_SIZES,
+    help="Palette sizes to benchmark",
+  )
+
+  parser.add_argument(
+    '--repeat',
+    type=int,
+    default=3,
+    help="Number of timed runs per palette size",
+  )
+
+  parser.add_argument(
+    '--width',
+    type=int,
+    default=512,
+    help="Width of the generated noise image",
+  )
+
+  parser.add_argument(
+    '--height',
+    type=int,
+    default=512,
+    help="Height of the generated noise image",
+  )
+
+  return parser.parse_args()
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,107 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from typing import List, Optional, Tuple
+
+from tint_gear.theme import get_algorithm_fingerprint
+
+CACHE_TIMEOUT = 30.0
+CACHE_VERSION = 3
+WEIGHT_RESOLUTION = 1 << 16
+
+connections = threading.local()
+
+
+def quantize_populations(populations: List[int]) -> List[int]:
+  total = sum(populations)
+  if total <= 0:
+    raise ValueError("populations must not all be zero.")
+
+  return [
+    round(population * WEIGHT_RESOLUTION / total) for population in populations
+  ]
+
+
+def create_cache_key(
+  colors: List[Tuple[float, float, float]],
+  weights: Optional[List[int]],
+  options: dict,
+) -> str:
+  serialized = json.dumps(
+    {
+      'version': CACHE_VERSION,
+      'algorithm': get_algorithm_fingerprint(),
+      'colors': [list(map(float, color)) for color in colors],
+      'weights': weights,
+      'options': options,
+    },
+    sort_keys=True,
+    separators=(',', ':'),
+  )
+  return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+
+def open_cache(cache_path: str) -> sqlite3.Connection:
+  if not isinstance(cache_path, str):
+    raise TypeError("cache_path must be a string.")
+
+  connection = sqlite3.connect(cache_path, timeout=CACHE_TIMEOUT)
+  connection.execute("PRAGMA journal_mode=WAL")
+  connection.execute("PRAGMA synchronous=NORMAL")
+  connection.execute("CREATE TABLE IF NOT EXISTS themes ("
+                     "key TEXT PRIMARY KEY, "
+                     "value TEXT NOT NULL)")
+  return connection
+
+
+def get_cache_connection(cache_path: str) -> sqlite3.Connection:
+  if getattr(connections, 'pid', None) != os.getpid():
+    connections.pid = os.getpid()
+    connections.by_path = {}
+
+  connection = connections.by_path.get(cache_path)
+  if connection is None:
+    connection = open_cache(cache_path)
+    connections.by_path[cache_path] = connection
+
+  return connection
+
+
+def encode_theme(deserialized_colors: dict) -> str:
+  return json.dumps(deserialized_colors, separators=(',', ':'))
+
+
+def decode_theme(value: str) -> dict:
+  deserialized_colors = json.loads(value)
+  deserialized_colors['colors'] = [
+    tuple(color) for color in deserialized_colors['colors']
+  ]
+  for section in ['bootstrap', 'terminal']:
+    deserialized_colors[section] = {
+      name: {
+        variant: tuple(color)
+        for variant, color in color_object.items()
+      }
+      for name, color_object in deserialized_colors[section].items()
+    }
+  return deserialized_colors
+
+
+def load_theme(cache_path: str, key: str) -> Optional[dict]:
+  row = get_cache_connection(cache_path).execute(
+    "SELECT value FROM themes WHERE key = ?",
+    (key, ),
+  ).fetchone()
+
+  return decode_theme(row[0]) if row is not None else None
+
+
+def store_theme(cache_path: str, key: str, deserialized_colors: dict):
+  connection = get_cache_connection(cache_path)
+  with connection:
+    connection.execute(
+      "INSERT OR REPLACE INTO themes (key, value) VALUES (?, ?)",
+      (key, encode_theme(deserialized_colors)),
+    )
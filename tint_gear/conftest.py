@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+COLORS = [
+  (0.1, 0.2, 0.3),
+  (0.9, 0.4, 0.2),
+  (0.2, 0.8, 0.5),
+  (0.95, 0.95, 0.9),
+]
+
+
+def write_gradient_image(image_path, width=64, height=48, shift=0):
+  x, y = np.meshgrid(np.arange(width), np.arange(height))
+  pixels = np.stack([x * 4 + shift, y * 5, (x * y) % 256],
+                    axis=-1).astype(np.uint8)
+  Image.fromarray(pixels, 'RGB').save(image_path)
+  return str(image_path)
+
+
+@pytest.fixture
+def colors():
+  return list(COLORS)
+
+
+@pytest.fixture
+def create_image():
+  return write_gradient_image
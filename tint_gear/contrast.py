@@ -0,0 +1,214 @@
+import math
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+from tint_gear.backend import get_backend
+from tint_gear.batch import CONTRAST_OFFSET, calculate_contrast_ratio_batch
+from tint_gear.emit import BOOTSTRAP_NAMES, TERMINAL_NAMES
+
+MIN_CONTRAST_RATIO = 1.0
+MAX_CONTRAST_RATIO = 21.0
+CONTRAST_MARGIN = 1e-3
+SOLVER_MAX_ITERATIONS = 2000
+SOLVER_TOLERANCE = 1e-7
+LUMINANCE_TOLERANCE = 1e-9
+RATIO_TOLERANCE = 1e-6
+
+ANSI_NAMES = [
+  name for name in TERMINAL_NAMES if name not in ['black', 'brightBlack']
+]
+
+
+class ContrastTarget(NamedTuple):
+  foreground: str
+  background: str
+  ratio: float
+
+
+def assert_role_name(name):
+  if not isinstance(name, str):
+    raise TypeError("role name must be a string.")
+  if name != 'ansi' and name not in BOOTSTRAP_NAMES + TERMINAL_NAMES:
+    raise ValueError(f"Unknown role {name}! Expected a bootstrap or "
+                     "terminal color name or ansi.")
+
+
+def assert_contrast_target(target):
+  if not isinstance(target, ContrastTarget):
+    raise TypeError("target must be a ContrastTarget.")
+  assert_role_name(target.foreground)
+  assert_role_name(target.background)
+  if not MIN_CONTRAST_RATIO <= target.ratio <= MAX_CONTRAST_RATIO:
+    raise ValueError(f"Contrast ratio must be between {MIN_CONTRAST_RATIO} "
+                     f"and {MAX_CONTRAST_RATIO}.")
+
+
+def parse_contrast_target(value: str) -> ContrastTarget:
+  roles, separator, ratio = value.partition('=')
+  foreground, role_separator, background = roles.partition(':')
+  if not separator or not role_separator:
+    raise ValueError(f"Invalid contrast target {value}! "
+                     "Expected FOREGROUND:BACKGROUND=RATIO.")
+
+  target = ContrastTarget(foreground, background, float(ratio))
+  assert_contrast_target(target)
+  return target
+
+
+def resolve_roles(name: str) -> List[Tuple[str, str]]:
+  if name == 'ansi':
+    return [('terminal', ansi_name) for ansi_name in ANSI_NAMES]
+  if name in BOOTSTRAP_NAMES:
+    return [('bootstrap', name)]
+  return [('terminal', name)]
+
+
+def solve_luminances(
+  luminances: np.ndarray,
+  pairs: np.ndarray,
+  ratios: np.ndarray,
+  max_iterations: int = SOLVER_MAX_ITERATIONS,
+  tolerance: float = SOLVER_TOLERANCE,
+) -> np.ndarray:
+  initial = np.log(np.asarray(luminances, dtype=np.float64) + CONTRAST_OFFSET)
+  variant_count, variable_count = initial.shape
+  pair_count = len(pairs)
+  foreground, background = pairs[:, 0], pairs[:, 1]
+
+  signs = np.where(
+    initial[:, foreground] >= initial[:, background],
+    1.0,
+    -1.0,
+  )
+  constraints = np.zeros(
+    (variant_count, pair_count + 2 * variable_count, variable_count))
+  rows = np.arange(pair_count)
+  constraints[:, rows, foreground] = signs
+  constraints[:, rows, background] = -signs
+  identity = np.eye(variable_count)
+  constraints[:, pair_count:pair_count + variable_count] = identity
+  constraints[:, pair_count + variable_count:] = -identity
+
+  bounds = np.concatenate([
+    np.log(ratios) + CONTRAST_MARGIN,
+    np.full(variable_count, math.log(CONTRAST_OFFSET)),
+    np.full(variable_count, -math.log(1.0 + CONTRAST_OFFSET)),
+  ])
+
+  gram = constraints @ constraints.transpose(0, 2, 1)
+  step = 1.0 / np.abs(gram).sum(axis=-1).max(axis=-1)[:, np.newaxis]
+
+  multipliers = np.zeros((variant_count, len(bounds)))
+  solution = initial
+  for _ in range(max_iterations):
+    slack = bounds - np.einsum('vmn,vn->vm', constraints, solution)
+    multipliers = np.maximum(0.0, multipliers + step * slack)
+    previous = solution
+    solution = initial + np.einsum('vmn,vm->vn', constraints, multipliers)
+    if (slack.max() <= tolerance
+        and np.abs(solution - previous).max() <= tolerance):
+      break
+
+  solution = np.clip(
+    solution,
+    math.log(CONTRAST_OFFSET),
+    math.log(1.0 + CONTRAST_OFFSET),
+  )
+  return np.exp(solution) - CONTRAST_OFFSET
+
+
+def assert_contrast_reached(
+  luminances: np.ndarray,
+  pairs: np.ndarray,
+  pair_targets: List[ContrastTarget],
+):
+  reached = calculate_contrast_ratio_batch(
+    luminances[:, pairs[:, 0]],
+    luminances[:, pairs[:, 1]],
+  ).min(axis=0)
+
+  unmet: Dict[ContrastTarget, float] = {}
+  for target, ratio in zip(pair_targets, reached.tolist()):
+    if ratio < target.ratio * (1.0 - RATIO_TOLERANCE):
+      unmet[target] = min(ratio, unmet.get(target, ratio))
+
+  if unmet:
+    raise ValueError(
+      "Contrast targets can not be reached while keeping which color of "
+      "each pair is lighter: " +
+      ', '.join(f"{target.foreground}:{target.background}={target.ratio:g} "
+                f"reached {ratio:.2f}" for target, ratio in unmet.items()))
+
+
+def solve_contrast(
+  deserialized_colors: dict,
+  targets: List[ContrastTarget],
+  max_iterations: int = SOLVER_MAX_ITERATIONS,
+) -> dict:
+  for target in targets:
+    assert_contrast_target(target)
+
+  variables: Dict[int, int] = {}
+  color_objects = []
+  pairs = []
+  ratios = []
+  pair_targets = []
+  for target in targets:
+    for foreground in resolve_roles(target.foreground):
+      for background in resolve_roles(target.background):
+        indices = []
+        for section, name in [foreground, background]:
+          color_object = deserialized_colors[section][name]
+          if id(color_object) not in variables:
+            variables[id(color_object)] = len(color_objects)
+            color_objects.append(color_object)
+          indices.append(variables[id(color_object)])
+        if indices[0] != indices[1]:
+          pairs.append(indices)
+          ratios.append(target.ratio)
+          pair_targets.append(target)
+
+  if not pairs:
+    return deserialized_colors
+
+  variants = list(color_objects[0])
+  colors = np.array(
+    [[color_object[variant] for color_object in color_objects]
+     for variant in variants],
+    dtype=np.float64,
+  )
+  backend = get_backend()
+  luminances = backend.get_luminance(colors)
+  solved = solve_luminances(
+    luminances,
+    np.array(pairs),
+    np.array(ratios, dtype=np.float64),
+    max_iterations=max_iterations,
+  )
+  adjusted = backend.set_luminance(colors, solved)
+  changed = np.abs(solved - luminances) > LUMINANCE_TOLERANCE
+  assert_contrast_reached(
+    backend.get_luminance(np.where(changed[..., np.newaxis], adjusted, colors)),
+    np.array(pairs),
+    pair_targets,
+  )
+
+  adjusted_objects = {}
+  for index, color_object in enumerate(color_objects):
+    adjusted_objects[id(color_object)] = {
+      variant: (tuple(adjusted[variant_index, index].tolist())
+                if changed[variant_index, index] else color_object[variant])
+      for variant_index, variant in enumerate(variants)
+    }
+
+  return {
+    **deserialized_colors,
+    **{
+      section: {
+        name: adjusted_objects.get(id(color_object), color_object)
+        for name, color_object in deserialized_colors[section].items()
+      }
+      for section in ['bootstrap', 'terminal']
+    },
+  }
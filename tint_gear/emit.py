@@ -0,0 +1,242 @@
+import os
+import stat
+import tempfile
+from contextlib import contextmanager
+from string import Template
+from typing import BinaryIO, Dict, Iterator, List, Tuple, Union
+
+from tint_gear.theme import format_hex_batch, pack_theme
+
+BOOTSTRAP_NAMES = [
+  'primary',
+  'secondary',
+  'accent',
+  'text',
+  'background',
+  'textSelection',
+  'selection',
+  'danger',
+  'warning',
+  'info',
+  'success',
+]
+
+TERMINAL_NAMES = [
+  'black',
+  'red',
+  'green',
+  'yellow',
+  'blue',
+  'magenta',
+  'cyan',
+  'white',
+  'brightBlack',
+  'brightRed',
+  'brightGreen',
+  'brightYellow',
+  'brightBlue',
+  'brightMagenta',
+  'brightCyan',
+  'brightWhite',
+]
+
+VARIANT_NAMES = [
+  'normal',
+  'high_contrast',
+  'inverted',
+  'alternate',
+]
+
+
+def kebab_case(name: str) -> str:
+  return ''.join('-' + c.lower() if c.isupper() else c
+                 for c in name).replace('_', '-')
+
+
+def create_css_template() -> str:
+  lines = [":root {"]
+  for section, names in [
+    ('bootstrap', BOOTSTRAP_NAMES),
+    ('terminal', TERMINAL_NAMES),
+  ]:
+    for name in names:
+      for variant in VARIANT_NAMES:
+        suffix = '' if variant == 'normal' else f"-{kebab_case(variant)}"
+        prefix = '' if section == 'bootstrap' else 'terminal-'
+        lines.append(f"  --tint-{prefix}{kebab_case(name)}{suffix}: "
+                     f"${{{section}_{name}_{variant}}};")
+  lines.append("}")
+  return '\n'.join(lines) + '\n'
+
+
+def create_xresources_template() -> str:
+  lines = [
+    "*.foreground: ${bootstrap_text_normal}",
+    "*.background: ${bootstrap_background_normal}",
+    "*.cursorColor: ${bootstrap_primary_normal}",
+  ]
+  for index, name in enumerate(TERMINAL_NAMES):
+    lines.append(f"*.color{index}: ${{terminal_{name}_normal}}")
+  return '\n'.join(lines) + '\n'
+
+
+def create_kitty_template() -> str:
+  lines = [
+    "foreground ${bootstrap_text_normal}",
+    "background ${bootstrap_background_normal}",
+    "selection_foreground ${bootstrap_textSelection_normal}",
+    "selection_background ${bootstrap_selection_normal}",
+    "cursor ${bootstrap_primary_normal}",
+    "url_color ${bootstrap_accent_normal}",
+  ]
+  for index, name in enumerate(TERMINAL_NAMES):
+    lines.append(f"color{index} ${{terminal_{name}_normal}}")
+  return '\n'.join(lines) + '\n'
+
+
+def create_alacritty_template() -> str:
+  lines = [
+    "[colors.primary]",
+    "foreground = \"${bootstrap_text_normal}\"",
+    "background = \"${bootstrap_background_normal}\"",
+    "",
+    "[colors.selection]",
+    "text = \"${bootstrap_textSelection_normal}\"",
+    "background = \"${bootstrap_selection_normal}\"",
+  ]
+  for table, names in [
+    ('normal', TERMINAL_NAMES[:8]),
+    ('bright', TERMINAL_NAMES[8:]),
+  ]:
+    lines.append("")
+    lines.append(f"[colors.{table}]")
+    for name in names:
+      key = name[len('bright'):].lower() if table == 'bright' else name
+      lines.append(f"{key} = \"${{terminal_{name}_normal}}\"")
+  return '\n'.join(lines) + '\n'
+
+
+def create_helix_template() -> str:
+  lines = [
+    "\"ui.background\" = { bg = \"background\" }",
+    "\"ui.text\" = \"text\"",
+    "\"ui.cursor\" = { fg = \"background\", bg = \"primary\" }",
+    "\"ui.selection\" = { fg = \"textSelection\", bg = \"selection\" }",
+    "\"ui.statusline\" = { fg = \"text\", bg = \"selection\" }",
+    "\"ui.linenr\" = \"secondary\"",
+    "\"ui.linenr.selected\" = \"accent\"",
+    "\"keyword\" = \"primary\"",
+    "\"function\" = \"secondary\"",
+    "\"type\" = \"accent\"",
+    "\"string\" = \"success\"",
+    "\"constant\" = \"warning\"",
+    "\"comment\" = { fg = \"selection\", modifiers = [\"italic\"] }",
+    "\"error\" = \"danger\"",
+    "\"warning\" = \"warning\"",
+    "\"info\" = \"info\"",
+    "\"hint\" = \"info\"",
+    "",
+    "[palette]",
+  ]
+  for name in BOOTSTRAP_NAMES:
+    lines.append(f"{name} = \"${{bootstrap_{name}_normal}}\"")
+  return '\n'.join(lines) + '\n'
+
+
+EMITTERS: Dict[str, Template] = {
+  'css': Template(create_css_template()),
+  'xresources': Template(create_xresources_template()),
+  'kitty': Template(create_kitty_template()),
+  'alacritty': Template(create_alacritty_template()),
+  'helix': Template(create_helix_template()),
+}
+
+
+def assert_emitter(emitter):
+  if not isinstance(emitter, str):
+    raise TypeError("emitter must be a string.")
+  if emitter not in EMITTERS and not os.path.isfile(emitter):
+    raise ValueError(
+      f"Unknown emitter {emitter}! Expected one of {', '.join(EMITTERS)} "
+      "or a path to a template file.")
+
+
+def create_template_mapping(deserialized_colors: dict) -> Dict[str, str]:
+  packed_theme = pack_theme(deserialized_colors)
+  mapping = {
+    'is_light_theme': 'true' if packed_theme.is_light_theme else 'false'
+  }
+  for index, hex_color in enumerate(format_hex_batch(packed_theme.palette)):
+    mapping[f"colors_{index}"] = hex_color
+  for (section, name, variant), hex_color in zip(
+      packed_theme.roles,
+      format_hex_batch(packed_theme.colors),
+  ):
+    mapping[f"{section}_{name}_{variant}"] = hex_color
+  return mapping
+
+
+def load_template(emitter: str) -> Template:
+  assert_emitter(emitter)
+
+  if emitter in EMITTERS:
+    return EMITTERS[emitter]
+
+  with open(emitter, 'r', encoding='utf-8') as template_file:
+    return Template(template_file.read())
+
+
+def get_file_mode(output_path: str) -> int:
+  try:
+    return stat.S_IMODE(os.stat(output_path).st_mode)
+  except FileNotFoundError:
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+@contextmanager
+def open_atomic(output_path: str) -> Iterator[BinaryIO]:
+  directory = os.path.dirname(os.path.abspath(output_path))
+  file_descriptor, temporary_path = tempfile.mkstemp(
+    dir=directory,
+    prefix=f".{os.path.basename(output_path)}.",
+    suffix='.tmp',
+  )
+  try:
+    with os.fdopen(file_descriptor, 'wb') as temporary_file:
+      yield temporary_file
+      temporary_file.flush()
+      os.fchmod(temporary_file.fileno(), get_file_mode(output_path))
+      os.fsync(temporary_file.fileno())
+    os.replace(temporary_path, output_path)
+  except BaseException:
+    if os.path.exists(temporary_path):
+      os.remove(temporary_path)
+    raise
+
+
+def write_atomic(output_path: str, content: Union[str, bytes]):
+  with open_atomic(output_path) as output_file:
+    output_file.write(
+      content.encode('utf-8') if isinstance(content, str) else content)
+
+
+def render_emitters(
+  deserialized_colors: dict,
+  emitters: List[str],
+) -> List[str]:
+  mapping = create_template_mapping(deserialized_colors)
+  return [load_template(emitter).substitute(mapping) for emitter in emitters]
+
+
+def emit_all(
+  deserialized_colors: dict,
+  outputs: List[Tuple[str, str]],
+):
+  rendered = render_emitters(
+    deserialized_colors,
+    [emitter for emitter, _ in outputs],
+  )
+  for (_, output_path), content in zip(outputs, rendered):
+    write_atomic(output_path, content)
@@ -1,11 +1,72 @@
+import io
+import math
 import os
-from colorthief import ColorThief
-from typing import List, Tuple
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from colorthief import MMCQ, VBox, PQueue
+from PIL import Image
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from tint_gear.batch import (
+  LUMINANCE_WEIGHTS,
+  SRGB_TO_LINEAR_LUT,
+  linear_srgb_to_oklab_batch,
+  oklab_to_srgb_batch,
+  srgb_to_oklab_batch,
+  srgb8_to_oklab_batch,
+)
+from tint_gear.profiling import (
+  MEGABYTE,
+  get_resident_memory,
+  profile_stage,
+)
 
 RGB_MIN = 0.0
 RGB_MAX = 1.0
 EPSILON = 1e-6
 
+MIN_NUM_COLORS = 2
+MAX_NUM_COLORS = 256
+
+SAMPLE_QUALITY = 10
+ALPHA_THRESHOLD = 125
+WHITE_THRESHOLD = 250
+
+HISTOGRAM_SIZE = 1 << (3 * MMCQ.SIGBITS)
+
+TILE_ROWS = 256
+
+FLAT_MAX_BINS = 3
+FLAT_MIN_COVERAGE = 0.99
+
+DRAFT_SCALES = [1, 2, 4, 8]
+STRIP_PIXEL_SIZE = 16
+SAMPLE_PIXEL_SIZE = 64
+
+FRAME_SMOOTHING = 0.5
+FRAME_MAX_ITERATIONS = 5
+
+STATISTICS_MAX_SIZE = 256
+LUMINANCE_BINS = 64
+
+KMEANS_MAX_ITERATIONS = 20
+KMEANS_TOLERANCE = 1e-4
+KMEANS_BATCH_SIZE = 4096
+KMEANS_CHUNK_SIZE = 65536
+KMEANS_SEED = 0
+
+
+class ExtractionPlan(NamedTuple):
+  scale: int
+  quality: int
+  tile_rows: int
+
+
+class ImageStatistics(NamedTuple):
+  luminance_histogram: List[int]
+  average_luminance: float
+  average_saturation: float
+
 
 def clamp_value(
   value: float,
@@ -30,24 +91,715 @@ def assert_image_path(image_path):
 def assert_num_colors(num_colors):
   if not isinstance(num_colors, int):
     raise TypeError("num_colors must be an integer.")
-  if num_colors <= 0:
-    raise ValueError("num_colors must be a positive integer.")
+  if num_colors < MIN_NUM_COLORS:
+    raise ValueError(f"num_colors must be at least {MIN_NUM_COLORS}.")
+  if num_colors > MAX_NUM_COLORS:
+    raise ValueError(f"num_colors must be at most {MAX_NUM_COLORS}.")
+
+
+def assert_pixels(pixels):
+  if not isinstance(pixels, np.ndarray):
+    raise TypeError("pixels must be a numpy array.")
+  if pixels.ndim != 2 or pixels.shape[1] != 3:
+    raise ValueError("pixels must have shape (N, 3).")
+  if len(pixels) == 0:
+    raise ValueError("pixels must not be empty.")
+
+
+def assert_histogram(histogram):
+  if not isinstance(histogram, np.ndarray):
+    raise TypeError("histogram must be a numpy array.")
+  if histogram.shape != (HISTOGRAM_SIZE, ):
+    raise ValueError(f"histogram must have shape ({HISTOGRAM_SIZE},).")
+  if not histogram.any():
+    raise ValueError("histogram must not be empty.")
+
+
+def assert_regions(regions, width, height):
+  if not isinstance(regions, list) or len(regions) == 0:
+    raise TypeError("regions must be a non-empty list.")
+  for region in regions:
+    if len(region) != 4 or not all(isinstance(v, int) for v in region):
+      raise TypeError("Each region must be a tuple of four integers.")
+    x, y, region_width, region_height = region
+    if region_width <= 0 or region_height <= 0:
+      raise ValueError(f"Region {region} must have a positive size.")
+    if (x < 0 or y < 0 or x + region_width > width
+        or y + region_height > height):
+      raise ValueError(
+        f"Region {region} is out of bounds! Image size: {width}x{height}")
+
+
+def assert_frame_options(frame_step, max_frames, smoothing):
+  if not isinstance(frame_step, int) or frame_step <= 0:
+    raise ValueError("frame_step must be a positive integer.")
+  if max_frames is not None and (not isinstance(max_frames, int)
+                                 or max_frames <= 0):
+    raise ValueError("max_frames must be a positive integer.")
+  if not 0 <= smoothing < 1:
+    raise ValueError("smoothing must be in the range [0, 1).")
+
+
+def assert_workers(workers):
+  if workers is None:
+    return
+  if not isinstance(workers, int):
+    raise TypeError("workers must be an integer.")
+  if workers <= 0:
+    raise ValueError("workers must be a positive integer.")
+
+
+def assert_max_memory(max_memory):
+  if max_memory is None:
+    return
+  if not isinstance(max_memory, int):
+    raise TypeError("max_memory must be an integer.")
+  if max_memory <= 0:
+    raise ValueError("max_memory must be a positive integer.")
 
 
 def extract_prominent_colors(
   image_path: str,
   num_colors: int = 8,
+  refine: bool = False,
+  workers: Optional[int] = None,
+  max_memory: Optional[int] = None,
 ) -> List[Tuple[float, float, float]]:
+  colors, _ = extract_palette_histogram(
+    image_path,
+    num_colors,
+    refine=refine,
+    workers=workers,
+    max_memory=max_memory,
+  )
+  return colors
+
+
+def extract_palette_histogram(
+  image_path: str,
+  num_colors: int = 8,
+  refine: bool = False,
+  workers: Optional[int] = None,
+  max_memory: Optional[int] = None,
+) -> Tuple[List[Tuple[float, float, float]], List[int]]:
   assert_image_path(image_path)
   assert_num_colors(num_colors)
+  assert_workers(workers)
+  assert_max_memory(max_memory)
+
+  if max_memory is not None:
+    return extract_bounded_palette_histogram(
+      image_path,
+      num_colors,
+      max_memory,
+      refine=refine,
+    )
+
+  return quantize_image_pixels(
+    load_image_pixels(image_path),
+    num_colors,
+    refine=refine,
+    workers=workers,
+  )
+
+
+def extract_region_palette_histograms(
+  image_path: str,
+  regions: List[Tuple[int, int, int, int]],
+  num_colors: int = 8,
+  refine: bool = False,
+  workers: Optional[int] = None,
+) -> List[Tuple[List[Tuple[float, float, float]], List[int]]]:
+  assert_image_path(image_path)
+  assert_num_colors(num_colors)
+  assert_workers(workers)
+
+  rgba = load_image_pixels(image_path)
+  assert_regions(regions, rgba.shape[1], rgba.shape[0])
+
+  return [
+    quantize_image_pixels(
+      crop_region(rgba, region),
+      num_colors,
+      refine=refine,
+      workers=workers,
+    ) for region in regions
+  ]
+
+
+def crop_region(
+  rgba: np.ndarray,
+  region: Tuple[int, int, int, int],
+) -> np.ndarray:
+  x, y, width, height = region
+  return rgba[y:y + height, x:x + width]
+
+
+def quantize_image_pixels(
+  rgba: np.ndarray,
+  num_colors: int = 8,
+  refine: bool = False,
+  workers: Optional[int] = None,
+) -> Tuple[List[Tuple[float, float, float]], List[int]]:
+  with profile_stage('histogram'):
+    if workers is None:
+      histogram = create_color_histogram(sample_rows(rgba))
+    else:
+      histogram = create_tiled_color_histogram(rgba, workers=workers)
+
+  return quantize_pixel_histogram(rgba, histogram, num_colors, refine=refine)
+
+
+def quantize_pixel_histogram(
+  rgba: np.ndarray,
+  histogram: np.ndarray,
+  num_colors: int = 8,
+  refine: bool = False,
+) -> Tuple[List[Tuple[float, float, float]], List[int]]:
+  if not histogram.any():
+    raise ValueError("The image has no opaque non-white pixels.")
+
+  with profile_stage('quantize'):
+    colors, populations = quantize_histogram(histogram, num_colors)
+
+  if refine:
+    with profile_stage('refine'):
+      colors, populations = refine_colors(sample_rows(rgba), colors)
+
+  return colors, populations
+
+
+def get_decoded_pixel_size(mode: str) -> int:
+  if mode in ['1', 'L', 'P']:
+    return 1
+  if mode.startswith('I;16'):
+    return 2
+  return 4
+
+
+def plan_extraction(
+  width: int,
+  height: int,
+  pixel_size: int,
+  max_memory: int,
+  scales: List[int] = DRAFT_SCALES,
+  refine: bool = False,
+) -> ExtractionPlan:
+  assert_max_memory(max_memory)
+
+  for scale in scales:
+    scaled_width = math.ceil(width / scale)
+    scaled_height = math.ceil(height / scale)
+    available = (max_memory - scaled_width * scaled_height * pixel_size -
+                 HISTOGRAM_SIZE * np.dtype(np.int64).itemsize)
+    row_size = scaled_width * STRIP_PIXEL_SIZE
+    if available < 2 * row_size:
+      continue
+
+    tile_rows = min(available // 2 // row_size, TILE_ROWS)
+    quality = SAMPLE_QUALITY
+    if refine:
+      sample_memory = (available - tile_rows * row_size -
+                       KMEANS_CHUNK_SIZE * SAMPLE_PIXEL_SIZE)
+      if sample_memory <= 0:
+        continue
+      quality = max(
+        quality,
+        math.ceil(scaled_width * scaled_height * SAMPLE_PIXEL_SIZE /
+                  sample_memory),
+      )
+
+    return ExtractionPlan(scale=scale, quality=quality, tile_rows=tile_rows)
+
+  raise ValueError(f"A {width}x{height} image can not be extracted within "
+                   f"the {max_memory / MEGABYTE:.1f} MiB of the memory budget "
+                   "left for pixel buffers.")
+
+
+def create_bounded_histogram(
+  image_path: str,
+  max_memory: int,
+  refine: bool = False,
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+  resident_memory = get_resident_memory() or 0
+  if resident_memory >= max_memory:
+    raise ValueError(
+      f"A memory budget of {max_memory / MEGABYTE:.1f} MiB is below the "
+      f"{resident_memory / MEGABYTE:.1f} MiB already in use.")
+
+  with Image.open(image_path) as image:
+    width, height = image.size
+    plan = plan_extraction(
+      width,
+      height,
+      get_decoded_pixel_size(image.mode),
+      max_memory - resident_memory,
+      scales=DRAFT_SCALES if image.format == 'JPEG' else [1],
+      refine=refine,
+    )
+
+    with profile_stage('decode'):
+      if plan.scale > 1:
+        image.draft(
+          image.mode,
+          (math.ceil(width / plan.scale), math.ceil(height / plan.scale)),
+        )
+      image.load()
+    width, height = image.size
+
+    histogram = np.zeros(HISTOGRAM_SIZE, dtype=np.int64)
+    samples = None
+    sample_count = 0
+    if refine:
+      samples = np.empty((-(-width * height // plan.quality), 3),
+                         dtype=np.uint8)
+    for start_row, end_row in create_tiles(height, plan.tile_rows):
+      with profile_stage('decode'):
+        strip = np.asarray(
+          image.crop((0, start_row, width, end_row)).convert('RGBA'))
+      with profile_stage('histogram'):
+        pixels = sample_strip(strip, start_row, plan.quality)
+        histogram += create_color_histogram(pixels)
+      if samples is not None:
+        samples[sample_count:sample_count + len(pixels)] = pixels
+        sample_count += len(pixels)
+      del strip, pixels
+
+  return histogram, samples[:sample_count] if samples is not None else None
+
+
+def extract_bounded_palette_histogram(
+  image_path: str,
+  num_colors: int,
+  max_memory: int,
+  refine: bool = False,
+) -> Tuple[List[Tuple[float, float, float]], List[int]]:
+  histogram, samples = create_bounded_histogram(
+    image_path,
+    max_memory,
+    refine=refine,
+  )
+
+  if not histogram.any():
+    raise ValueError("The image has no opaque non-white pixels.")
+
+  with profile_stage('quantize'):
+    colors, populations = quantize_histogram(histogram, num_colors)
+
+  if samples is not None:
+    with profile_stage('refine'):
+      colors, populations = refine_colors(samples, colors)
+
+  return colors, populations
+
+
+def load_image_pixels(image_path: str) -> np.ndarray:
+  assert_image_path(image_path)
+
+  with profile_stage('decode'), Image.open(image_path) as image:
+    return np.asarray(image.convert('RGBA'))
+
+
+def decode_image_pixels(data: bytes) -> np.ndarray:
+  if not isinstance(data, (bytes, bytearray, memoryview)):
+    raise TypeError("data must be bytes.")
+
+  with profile_stage('decode'), Image.open(io.BytesIO(data)) as image:
+    return np.asarray(image.convert('RGBA'))
+
+
+def sample_rows(
+  rgba: np.ndarray,
+  start_row: int = 0,
+  end_row: Optional[int] = None,
+  quality: int = SAMPLE_QUALITY,
+) -> np.ndarray:
+  return sample_strip(rgba[start_row:end_row], start_row, quality)
+
+
+def sample_strip(
+  rows: np.ndarray,
+  start_row: int = 0,
+  quality: int = SAMPLE_QUALITY,
+) -> np.ndarray:
+  width = rows.shape[1]
+  offset = (-start_row * width) % quality
+
+  if rows.flags.c_contiguous:
+    sampled = rows.reshape(-1, 4)[offset::quality]
+  else:
+    indices = np.arange(offset, rows.shape[0] * width, quality)
+    sampled = rows[indices // width, indices % width]
+
+  opaque = sampled[:, 3] >= ALPHA_THRESHOLD
+  white = np.all(sampled[:, :3] > WHITE_THRESHOLD, axis=1)
+
+  return sampled[opaque & ~white, :3]
+
+
+def sample_pixels(
+  image_path: str,
+  quality: int = SAMPLE_QUALITY,
+) -> np.ndarray:
+  pixels = sample_rows(load_image_pixels(image_path), quality=quality)
+
+  if len(pixels) == 0:
+    raise ValueError("The image has no opaque non-white pixels.")
+
+  return pixels
+
+
+def create_tiles(
+  height: int,
+  tile_rows: int = TILE_ROWS,
+) -> List[Tuple[int, int]]:
+  return [(start_row, min(start_row + tile_rows, height))
+          for start_row in range(0, height, tile_rows)]
+
+
+def create_tiled_color_histogram(
+  rgba: np.ndarray,
+  quality: int = SAMPLE_QUALITY,
+  workers: Optional[int] = None,
+  tile_rows: int = TILE_ROWS,
+) -> np.ndarray:
+  height = rgba.shape[0]
+  tiles = create_tiles(height, tile_rows)
+
+  def create_tile_histogram(tile):
+    start_row, end_row = tile
+    pixels = sample_rows(rgba, start_row, end_row, quality)
+    return create_color_histogram(pixels)
+
+  with ThreadPoolExecutor(max_workers=workers) as executor:
+    histogram = np.zeros(HISTOGRAM_SIZE, dtype=np.int64)
+    for tile_histogram in executor.map(create_tile_histogram, tiles):
+      histogram += tile_histogram
+
+  return histogram
+
+
+def create_color_histogram(pixels: np.ndarray) -> np.ndarray:
+  if len(pixels) == 0:
+    return np.zeros(HISTOGRAM_SIZE, dtype=np.int64)
+
+  assert_pixels(pixels)
+
+  quantized = (pixels >> MMCQ.RSHIFT).astype(np.intp)
+  indices = ((quantized[:, 0] << (2 * MMCQ.SIGBITS)) +
+             (quantized[:, 1] << MMCQ.SIGBITS) + quantized[:, 2])
+
+  return np.bincount(indices, minlength=HISTOGRAM_SIZE).astype(np.int64)
+
+
+def get_vbox_bounds(vbox: VBox) -> Tuple[int, int, int, int, int, int]:
+  return vbox.r1, vbox.r2, vbox.g1, vbox.g2, vbox.b1, vbox.b2
+
+
+def get_vbox_count_key(vbox: VBox) -> Tuple[int, Tuple[int, ...]]:
+  return vbox.count, get_vbox_bounds(vbox)
+
+
+def get_vbox_volume_key(vbox: VBox) -> Tuple[int, Tuple[int, ...]]:
+  return vbox.count * vbox.volume, get_vbox_bounds(vbox)
+
+
+def median_cut(
+  histo: Dict[int, int],
+  queue: PQueue,
+  target: float,
+):
+  n_color = 1
+  n_iter = 0
+  while n_iter < MMCQ.MAX_ITERATION:
+    vbox = queue.pop()
+    if not vbox.count:
+      queue.push(vbox)
+      n_iter += 1
+      continue
+    vbox1, vbox2 = MMCQ.median_cut_apply(histo, vbox)
+    if not vbox1:
+      raise AssertionError("Median cut produced no box!")
+    queue.push(vbox1)
+    if vbox2:
+      queue.push(vbox2)
+      n_color += 1
+    if n_color >= target:
+      return
+    n_iter += 1
+
+
+def get_histogram_bin_colors(indices: np.ndarray) -> np.ndarray:
+  mask = (1 << MMCQ.SIGBITS) - 1
+  components = np.stack(
+    [
+      indices >> (2 * MMCQ.SIGBITS),
+      (indices >> MMCQ.SIGBITS) & mask, indices & mask
+    ],
+    axis=-1,
+  )
+  return (components << MMCQ.RSHIFT) + (1 << MMCQ.RSHIFT) // 2
+
+
+def is_flat_histogram(
+  histogram: np.ndarray,
+  max_bins: int = FLAT_MAX_BINS,
+  min_coverage: float = FLAT_MIN_COVERAGE,
+) -> bool:
+  assert_histogram(histogram)
+
+  counts = np.sort(histogram[histogram > 0])[::-1]
+  return counts[:max_bins].sum() >= min_coverage * counts.sum()
+
+
+def extract_dominant_colors(
+  histogram: np.ndarray,
+  num_colors: int = 8,
+  max_bins: int = FLAT_MAX_BINS,
+) -> Tuple[List[Tuple[float, float, float]], List[int]]:
+  assert_histogram(histogram)
+  assert_num_colors(num_colors)
+
+  indices = np.flatnonzero(histogram)
+  indices = indices[np.lexsort((indices, -histogram[indices]))]
+  dominant = indices[:min(max_bins, num_colors)]
 
-  color_thief = ColorThief(image_path)
-  palette = color_thief.get_palette(color_count=num_colors)
+  centers = get_histogram_bin_colors(dominant)
+  residual_colors = get_histogram_bin_colors(indices)
+  distances = ((residual_colors[:, np.newaxis] -
+                centers[np.newaxis])**2).sum(axis=-1)
+  populations = np.bincount(
+    np.argmin(distances, axis=1),
+    weights=histogram[indices],
+    minlength=len(dominant),
+  ).astype(np.int64)
 
-  clamped_palette = [(
+  colors = [(
     clamp_value(r / 255.0, RGB_MIN, RGB_MAX),
     clamp_value(g / 255.0, RGB_MIN, RGB_MAX),
     clamp_value(b / 255.0, RGB_MIN, RGB_MAX),
-  ) for r, g, b in palette]
+  ) for r, g, b in centers.tolist()]
+  return colors, populations.tolist()
+
+
+def quantize_histogram(
+  histogram: np.ndarray,
+  num_colors: int = 8,
+) -> Tuple[List[Tuple[float, float, float]], List[int]]:
+  assert_histogram(histogram)
+  assert_num_colors(num_colors)
+
+  if is_flat_histogram(histogram):
+    return extract_dominant_colors(histogram, num_colors)
+
+  indices = np.flatnonzero(histogram)
+  histo = dict(zip(indices.tolist(), histogram[indices].tolist()))
+  red = indices >> (2 * MMCQ.SIGBITS)
+  green = (indices >> MMCQ.SIGBITS) & ((1 << MMCQ.SIGBITS) - 1)
+  blue = indices & ((1 << MMCQ.SIGBITS) - 1)
+
+  vbox = VBox(
+    int(red.min()),
+    int(red.max()),
+    int(green.min()),
+    int(green.max()),
+    int(blue.min()),
+    int(blue.max()),
+    histo,
+  )
+
+  queue = PQueue(get_vbox_count_key)
+  queue.push(vbox)
+  median_cut(histo, queue, MMCQ.FRACT_BY_POPULATIONS * num_colors)
+
+  volume_queue = PQueue(get_vbox_volume_key)
+  while queue.size():
+    volume_queue.push(queue.pop())
+  median_cut(histo, volume_queue, num_colors - volume_queue.size())
+
+  vboxes = []
+  while volume_queue.size():
+    vboxes.append(volume_queue.pop())
+
+  colors = [(
+    clamp_value(r / 255.0, RGB_MIN, RGB_MAX),
+    clamp_value(g / 255.0, RGB_MIN, RGB_MAX),
+    clamp_value(b / 255.0, RGB_MIN, RGB_MAX),
+  ) for r, g, b in (vbox.avg for vbox in vboxes)]
+  populations = [vbox.count for vbox in vboxes]
+
+  return colors, populations
+
+
+def assign_clusters(
+  samples: np.ndarray,
+  centers: np.ndarray,
+) -> np.ndarray:
+  distances = ((samples * samples).sum(axis=1)[:, None] -
+               2 * samples @ centers.T + (centers * centers).sum(axis=1)[None])
+  return np.argmin(distances, axis=1)
+
+
+def refine_colors(
+  pixels: np.ndarray,
+  colors: List[Tuple[float, float, float]],
+  max_iterations: int = KMEANS_MAX_ITERATIONS,
+  tolerance: float = KMEANS_TOLERANCE,
+  batch_size: int = KMEANS_BATCH_SIZE,
+  seed: int = KMEANS_SEED,
+  keep_empty: bool = False,
+) -> Tuple[List[Tuple[float, float, float]], List[int]]:
+  assert_pixels(pixels)
+  assert len(colors) > 0, "colors must not be empty."
+
+  samples = srgb8_to_oklab_batch(pixels)
+  centers = srgb8_to_oklab_batch(
+    np.rint(np.asarray(colors) * 255).astype(np.uint8))
+  counts = np.zeros(len(centers))
+  generator = np.random.default_rng(seed)
+
+  for _ in range(max_iterations):
+    if len(samples) > batch_size:
+      batch = samples[generator.integers(0, len(samples), batch_size)]
+    else:
+      batch = samples
+
+    labels = assign_clusters(batch, centers)
+    batch_counts = np.bincount(labels, minlength=len(centers))
+    batch_sums = np.column_stack([
+      np.bincount(labels, weights=batch[:, axis], minlength=len(centers))
+      for axis in range(3)
+    ])
+
+    counts += batch_counts
+    updated = batch_counts > 0
+    previous_centers = centers.copy()
+    centers[updated] += (
+      (batch_sums[updated] - batch_counts[updated, None] * centers[updated]) /
+      counts[updated, None])
+
+    if np.max(np.linalg.norm(centers - previous_centers, axis=1)) < tolerance:
+      break
+
+  populations = np.zeros(len(centers), dtype=np.int64)
+  for start in range(0, len(samples), KMEANS_CHUNK_SIZE):
+    labels = assign_clusters(samples[start:start + KMEANS_CHUNK_SIZE], centers)
+    populations += np.bincount(labels, minlength=len(centers))
+
+  populated = populations > 0
+  if keep_empty:
+    populated[:] = True
+  refined = np.clip(oklab_to_srgb_batch(centers[populated]), RGB_MIN, RGB_MAX)
+
+  refined_colors = [(float(r), float(g), float(b)) for r, g, b in refined]
+  return refined_colors, populations[populated].tolist()
+
+
+def extract_image_statistics(
+  image_path: str,
+  max_size: int = STATISTICS_MAX_SIZE,
+) -> ImageStatistics:
+  assert_image_path(image_path)
+
+  with profile_stage('decode'), Image.open(image_path) as image:
+    image.draft('RGB', (max_size, max_size))
+    image = image.convert('RGBA')
+    image.thumbnail((max_size, max_size), Image.Resampling.NEAREST)
+    rgba = np.asarray(image)
+
+  pixels = sample_rows(rgba, quality=1)
+  if len(pixels) == 0:
+    raise ValueError("The image has no opaque non-white pixels.")
+
+  linear = SRGB_TO_LINEAR_LUT[pixels]
+  luminance = np.clip(linear @ LUMINANCE_WEIGHTS, RGB_MIN, RGB_MAX)
+  oklab = linear_srgb_to_oklab_batch(linear)
+  chroma = np.hypot(oklab[:, 1], oklab[:, 2])
+
+  luminance_histogram, _ = np.histogram(
+    luminance,
+    bins=LUMINANCE_BINS,
+    range=(RGB_MIN, RGB_MAX),
+  )
+
+  return ImageStatistics(
+    luminance_histogram=luminance_histogram.tolist(),
+    average_luminance=clamp_value(float(luminance.mean()), RGB_MIN, RGB_MAX),
+    average_saturation=clamp_value(float(chroma.mean()), RGB_MIN, RGB_MAX),
+  )
+
+
+def iterate_frames(
+  image_path: str,
+  frame_step: int = 1,
+  max_frames: Optional[int] = None,
+) -> Iterator[Tuple[int, np.ndarray]]:
+  assert_image_path(image_path)
+  assert_frame_options(frame_step, max_frames, 0)
+
+  with Image.open(image_path) as image:
+    frame_count = getattr(image, 'n_frames', 1)
+    frame_indices = range(0, frame_count, frame_step)
+    for index in frame_indices[:max_frames]:
+      image.seek(index)
+      yield index, np.asarray(image.convert('RGBA'))
+
+
+def extract_frame_palette_histograms(
+  image_path: str,
+  num_colors: int = 8,
+  frame_step: int = 1,
+  max_frames: Optional[int] = None,
+  smoothing: float = FRAME_SMOOTHING,
+) -> Iterator[Tuple[int, List[Tuple[float, float, float]], List[int]]]:
+  assert_image_path(image_path)
+  assert_num_colors(num_colors)
+  assert_frame_options(frame_step, max_frames, smoothing)
+
+  colors = None
+  smoothed = None
+  for index, rgba in iterate_frames(image_path, frame_step, max_frames):
+    pixels = sample_rows(rgba)
+    if len(pixels) == 0:
+      continue
+
+    if colors is None:
+      colors, _ = quantize_histogram(create_color_histogram(pixels), num_colors)
+    colors, populations = refine_colors(
+      pixels,
+      colors,
+      max_iterations=FRAME_MAX_ITERATIONS,
+      keep_empty=True,
+    )
+
+    current = srgb_to_oklab_batch(colors)
+    if smoothed is None:
+      smoothed = current
+    else:
+      smoothed = smoothing * smoothed + (1 - smoothing) * current
+
+    smoothed_colors = np.clip(oklab_to_srgb_batch(smoothed), RGB_MIN, RGB_MAX)
+    yield (
+      index,
+      [(float(r), float(g), float(b)) for r, g, b in smoothed_colors],
+      populations,
+    )
+
+
+def extract_merged_frame_palette_histogram(
+  image_path: str,
+  num_colors: int = 8,
+  frame_step: int = 1,
+  max_frames: Optional[int] = None,
+) -> Tuple[List[Tuple[float, float, float]], List[int]]:
+  assert_image_path(image_path)
+  assert_num_colors(num_colors)
+
+  histogram = np.zeros(HISTOGRAM_SIZE, dtype=np.int64)
+  for _, rgba in iterate_frames(image_path, frame_step, max_frames):
+    histogram += create_color_histogram(sample_rows(rgba))
+
+  if not histogram.any():
+    raise ValueError("The image has no opaque non-white pixels.")
 
-  return clamped_palette
+  return quantize_histogram(histogram, num_colors)
@@ -0,0 +1,420 @@
+import argparse
+import sys
+import time
+from typing import Callable, List, NamedTuple, Optional
+
+import numpy as np
+
+from tint_gear.backend import (
+  BACKEND_NAMES,
+  Backend,
+  list_available_backends,
+  select_backend,
+)
+from tint_gear.batch import (
+  get_saturation_batch,
+  linear_srgb_to_oklab_batch,
+  linear_srgb_to_srgb_batch,
+  oklab_to_linear_srgb_batch,
+  pack_colors_batch,
+  srgb8_to_oklab_batch,
+  srgb_to_linear_srgb_batch,
+  srgb_to_oklab_batch,
+)
+from tint_gear.lib import (
+  adjust_contrast,
+  get_hue,
+  get_luminance,
+  get_saturation,
+  hex_to_srgb,
+  linear_srgb_to_oklab,
+  linear_srgb_to_srgb,
+  oklab_to_linear_srgb,
+  set_luminance,
+  set_saturation,
+  srgb_to_hex,
+  srgb_to_linear_srgb,
+)
+
+GRID_SIZE = 256
+DEFAULT_STEP = 1
+DEFAULT_CHUNK_SIZE = 65536
+HUE_CHROMA_MIN = 1e-4
+TARGET_WEIGHTS = np.array([7, 3, 1])
+CONTRAST_OPTIONS = (0.2, False, False, False, 4.0)
+
+
+class Kernel(NamedTuple):
+  name: str
+  prepare: Callable[[np.ndarray], np.ndarray]
+  scalar: Callable[..., object]
+  batch: Callable[..., np.ndarray]
+  tolerance: float
+  error: Optional[Callable[[np.ndarray, np.ndarray, np.ndarray],
+                           np.ndarray]] = None
+  per_backend: bool = False
+
+
+class KernelReport(NamedTuple):
+  name: str
+  backend: str
+  samples: int
+  max_error: float
+  mean_error: float
+  scalar_throughput: float
+  batch_throughput: float
+  passed: bool
+
+
+def prepare_srgb(pixels: np.ndarray) -> np.ndarray:
+  return pixels / 255.0
+
+
+def prepare_linear_srgb(pixels: np.ndarray) -> np.ndarray:
+  return srgb_to_linear_srgb_batch(pixels / 255.0)
+
+
+def prepare_oklab(pixels: np.ndarray) -> np.ndarray:
+  return srgb_to_oklab_batch(pixels / 255.0)
+
+
+def prepare_srgb_targets(pixels: np.ndarray) -> np.ndarray:
+  targets = (pixels.astype(np.int64) @ TARGET_WEIGHTS) % 256
+  return np.column_stack([pixels / 255.0, targets / 255.0])
+
+
+def call_backend(name: str):
+
+  def apply(backend: Backend, inputs: np.ndarray) -> np.ndarray:
+    return getattr(backend, name)(inputs)
+
+  return apply
+
+
+def call_backend_with_targets(name: str):
+
+  def apply(backend: Backend, inputs: np.ndarray) -> np.ndarray:
+    return getattr(backend, name)(inputs[:, :3], inputs[:, 3])
+
+  return apply
+
+
+def adjust_srgb_contrast(r: float, g: float, b: float):
+  return adjust_contrast((r, g, b), *CONTRAST_OPTIONS)
+
+
+def adjust_contrast_backend(backend: Backend, inputs: np.ndarray) -> np.ndarray:
+  return backend.adjust_contrast(inputs, *CONTRAST_OPTIONS)
+
+
+def srgb8_to_oklab(r: int, g: int, b: int):
+  return linear_srgb_to_oklab(*srgb_to_linear_srgb(r / 255, g / 255, b / 255))
+
+
+def srgb_to_rgb8(r: float, g: float, b: float):
+  return [
+    round(component * 255) for component in hex_to_srgb(srgb_to_hex(r, g, b))
+  ]
+
+
+def pack_to_rgb8_batch(colors: np.ndarray) -> np.ndarray:
+  packed = pack_colors_batch(colors)
+  return np.stack([packed >> 16, (packed >> 8) & 0xff, packed & 0xff], axis=-1)
+
+
+def calculate_hue_errors(
+  inputs: np.ndarray,
+  scalar: np.ndarray,
+  batch: np.ndarray,
+) -> np.ndarray:
+  differences = np.abs(scalar - batch) % 360
+  errors = np.minimum(differences, 360 - differences)
+  return np.where(get_saturation_batch(inputs) < HUE_CHROMA_MIN, 0.0, errors)
+
+
+KERNELS = [
+  Kernel(
+    'srgb_to_linear_srgb',
+    prepare_srgb,
+    srgb_to_linear_srgb,
+    srgb_to_linear_srgb_batch,
+    1e-12,
+  ),
+  Kernel(
+    'linear_srgb_to_srgb',
+    prepare_linear_srgb,
+    linear_srgb_to_srgb,
+    linear_srgb_to_srgb_batch,
+    1e-12,
+  ),
+  Kernel(
+    'linear_srgb_to_oklab',
+    prepare_linear_srgb,
+    linear_srgb_to_oklab,
+    linear_srgb_to_oklab_batch,
+    1e-9,
+  ),
+  Kernel(
+    'oklab_to_linear_srgb',
+    prepare_oklab,
+    oklab_to_linear_srgb,
+    oklab_to_linear_srgb_batch,
+    1e-6,
+  ),
+  Kernel(
+    'srgb8_to_oklab',
+    lambda pixels: pixels,
+    srgb8_to_oklab,
+    srgb8_to_oklab_batch,
+    1e-9,
+  ),
+  Kernel(
+    'get_luminance',
+    prepare_srgb,
+    get_luminance,
+    call_backend('get_luminance'),
+    1e-12,
+    per_backend=True,
+  ),
+  Kernel(
+    'get_saturation',
+    prepare_srgb,
+    get_saturation,
+    call_backend('get_saturation'),
+    1e-9,
+    per_backend=True,
+  ),
+  Kernel(
+    'get_hue',
+    prepare_srgb,
+    get_hue,
+    call_backend('get_hue'),
+    1e-6,
+    calculate_hue_errors,
+    per_backend=True,
+  ),
+  Kernel(
+    'set_luminance',
+    prepare_srgb_targets,
+    set_luminance,
+    call_backend_with_targets('step_luminance'),
+    1e-6,
+    per_backend=True,
+  ),
+  Kernel(
+    'set_saturation',
+    prepare_srgb_targets,
+    set_saturation,
+    call_backend_with_targets('set_saturation'),
+    1e-6,
+    per_backend=True,
+  ),
+  Kernel(
+    'adjust_contrast',
+    prepare_srgb,
+    adjust_srgb_contrast,
+    adjust_contrast_backend,
+    1e-6,
+    per_backend=True,
+  ),
+  Kernel(
+    'srgb_to_hex',
+    prepare_srgb,
+    srgb_to_rgb8,
+    pack_to_rgb8_batch,
+    0.0,
+  ),
+]
+
+
+def assert_step(step):
+  if not isinstance(step, int):
+    raise TypeError("step must be an integer.")
+  if not 1 <= step < GRID_SIZE:
+    raise ValueError(f"step must be between 1 and {GRID_SIZE - 1}.")
+
+
+def find_kernels(names: Optional[List[str]] = None) -> List[Kernel]:
+  if names is None:
+    return KERNELS
+
+  kernels = {kernel.name: kernel for kernel in KERNELS}
+  for name in names:
+    if name not in kernels:
+      raise ValueError(f"Unknown kernel {name}! "
+                       f"Expected one of {', '.join(kernels)}.")
+  return [kernels[name] for name in names]
+
+
+def create_grid_levels(step: int = DEFAULT_STEP) -> np.ndarray:
+  assert_step(step)
+
+  levels = np.arange(0, GRID_SIZE, step)
+  if levels[-1] != GRID_SIZE - 1:
+    levels = np.append(levels, GRID_SIZE - 1)
+  return levels.astype(np.uint8)
+
+
+def iterate_grid(
+  step: int = DEFAULT_STEP,
+  chunk_size: int = DEFAULT_CHUNK_SIZE,
+):
+  levels = create_grid_levels(step)
+  size = len(levels)
+  for start in range(0, size**3, chunk_size):
+    indices = np.arange(start, min(start + chunk_size, size**3))
+    yield np.stack(
+      [
+        levels[indices // (size * size)],
+        levels[(indices // size) % size],
+        levels[indices % size],
+      ],
+      axis=-1,
+    )
+
+
+def compare_kernel(
+  kernel: Kernel,
+  step: int = DEFAULT_STEP,
+  chunk_size: int = DEFAULT_CHUNK_SIZE,
+  backend: Optional[Backend] = None,
+) -> KernelReport:
+  samples = 0
+  max_error = 0.0
+  error_sum = 0.0
+  scalar_time = 0.0
+  batch_time = 0.0
+
+  for pixels in iterate_grid(step, chunk_size):
+    inputs = kernel.prepare(pixels)
+    scalar_inputs = inputs.tolist()
+
+    start = time.perf_counter()
+    scalar = np.array([kernel.scalar(*values) for values in scalar_inputs])
+    scalar_time += time.perf_counter() - start
+
+    batch_args = (backend, inputs) if kernel.per_backend else (inputs, )
+    start = time.perf_counter()
+    batch = kernel.batch(*batch_args)
+    batch_time += time.perf_counter() - start
+
+    if kernel.error is not None:
+      errors = kernel.error(inputs, scalar, batch)
+    else:
+      errors = np.abs(scalar - batch).reshape(len(pixels), -1).max(axis=-1)
+
+    samples += len(pixels)
+    max_error = max(max_error, float(errors.max()))
+    error_sum += float(errors.sum())
+
+  return KernelReport(
+    name=kernel.name,
+    backend=backend.name if kernel.per_backend else 'numpy',
+    samples=samples,
+    max_error=max_error,
+    mean_error=error_sum / samples,
+    scalar_throughput=samples / scalar_time if scalar_time > 0 else np.inf,
+    batch_throughput=samples / batch_time if batch_time > 0 else np.inf,
+    passed=max_error <= kernel.tolerance,
+  )
+
+
+def run_harness(
+  names: Optional[List[str]] = None,
+  step: int = DEFAULT_STEP,
+  chunk_size: int = DEFAULT_CHUNK_SIZE,
+  backend_names: Optional[List[str]] = None,
+) -> List[KernelReport]:
+  backends = [
+    select_backend(name) for name in backend_names or list_available_backends()
+  ]
+
+  reports = []
+  for kernel in find_kernels(names):
+    if kernel.per_backend:
+      reports.extend(
+        compare_kernel(kernel, step, chunk_size, backend)
+        for backend in backends)
+    else:
+      reports.append(compare_kernel(kernel, step, chunk_size))
+  return reports
+
+
+def print_reports(reports: List[KernelReport]):
+  print(f"{'kernel':<22} {'backend':<8} {'samples':>10} {'max error':>11} "
+        f"{'mean error':>11} {'scalar/s':>11} {'batch/s':>11} "
+        f"{'speedup':>8} {'result':>6}")
+  for report in reports:
+    print(f"{report.name:<22} {report.backend:<8} {report.samples:>10} "
+          f"{report.max_error:>11.3e} {report.mean_error:>11.3e} "
+          f"{report.scalar_throughput:>11.0f} {report.batch_throughput:>11.0f} "
+          f"{report.batch_throughput / report.scalar_throughput:>8.1f} "
+          f"{'ok' if report.passed else 'FAIL':>6}")
+
+
+def main():
+  parsed_args = parse_args()
+
+  reports = run_harness(
+    parsed_args.kernels,
+    parsed_args.step,
+    parsed_args.chunk_size,
+    parsed_args.backends,
+  )
+
+  print_reports(reports)
+  if not all(report.passed for report in reports):
+    sys.exit(1)
+
+
+def parse_args():
+  parser = argparse.ArgumentParser(
+    description="Tint Gear scalar and batch kernel comparison")
+
+  parser.add_argument(
+    '--kernels',
+    nargs='+',
+    choices=[kernel.name for kernel in KERNELS],
+    help="Kernels to compare; all kernels when omitted",
+  )
+
+  parser.add_argument(
+    '--backends',
+    nargs='+',
+    choices=BACKEND_NAMES,
+    help="Backends to compare; all available backends when omitted",
+  )
+
+  parser.add_argument(
+    '--step',
+    type=int,
+    default=DEFAULT_STEP,
+    help=("Distance between 8-bit grid levels; 1 compares all "
+          f"{GRID_SIZE ** 3} sRGB colors"),
+  )
+
+  parser.add_argument(
+    '--chunk-size',
+    type=int,
+    default=DEFAULT_CHUNK_SIZE,
+    help="Number of colors converted per batch call",
+  )
+
+  parsed_args = parser.parse_args()
+
+  if not 1 <= parsed_args.step < GRID_SIZE:
+    parser.error(f"--step must be between 1 and {GRID_SIZE - 1}")
+
+  if parsed_args.chunk_size <= 0:
+    parser.error("--chunk-size must be a positive integer")
+
+  unavailable = set(parsed_args.backends or []) - set(list_available_backends())
+  if unavailable:
+    parser.error(f"--backends {', '.join(sorted(unavailable))} "
+                 "not available")
+
+  return parsed_args
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,422 @@
+import argparse
+import io
+import json
+import os
+import sys
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from tint_gear.backend import get_backend
+from tint_gear.batch import pack_colors_batch, unpack_colors_batch
+from tint_gear.emit import write_atomic
+from tint_gear.main import process_batch
+from tint_gear.result import (
+  add_theme_arguments,
+  get_theme_options,
+  load_result,
+)
+from tint_gear.theme import format_hex_batch, get_algorithm_fingerprint
+
+INDEX_VERSION = 2
+INDEX_ROLES = [
+  ('bootstrap', 'primary'),
+  ('bootstrap', 'secondary'),
+  ('bootstrap', 'accent'),
+  ('bootstrap', 'text'),
+  ('bootstrap', 'background'),
+]
+INDEX_VARIANT = 'normal'
+QUERY_CHUNK_SIZE = 256
+DEFAULT_NEIGHBORS = 5
+DEFAULT_DUPLICATE_DISTANCE = 0.02
+
+
+class ThemeIndex(NamedTuple):
+  paths: np.ndarray
+  roles: np.ndarray
+  palettes: np.ndarray
+  palette_sizes: np.ndarray
+
+
+def assert_neighbors(neighbors):
+  if not isinstance(neighbors, int):
+    raise TypeError("neighbors must be an integer.")
+  if neighbors <= 0:
+    raise ValueError("neighbors must be a positive integer.")
+
+
+def assert_distance(distance):
+  if not isinstance(distance, (int, float)):
+    raise TypeError("distance must be a number.")
+  if distance < 0:
+    raise ValueError("distance must not be negative.")
+
+
+def main():
+  parsed_args = parse_args()
+
+  try:
+    run(parsed_args)
+  except ValueError as error:
+    sys.exit(f"tint-gear-index: error: {error}")
+
+
+def run(parsed_args):
+  if parsed_args.command == 'add':
+    index = load_theme_index(parsed_args.index_path) if os.path.exists(
+      parsed_args.index_path) else create_theme_index([], [])
+    index = append_theme_index(
+      index,
+      parsed_args.paths,
+      load_results(
+        parsed_args.paths,
+        parsed_args.processes,
+        **get_theme_options(parsed_args),
+      ),
+    )
+    save_theme_index(parsed_args.index_path, index)
+    sys.stdout.write(f"Indexed {len(index.paths)} themes\n")
+    return
+
+  index = load_theme_index(parsed_args.index_path)
+
+  if parsed_args.command == 'query':
+    theme_options = get_theme_options(parsed_args)
+    themes = [load_result(path, **theme_options) for path in parsed_args.paths]
+    neighbors, distances = query_theme_index(
+      index,
+      extract_role_features(themes),
+      neighbors=parsed_args.neighbors,
+    )
+    print_neighbors(
+      index,
+      parsed_args.paths,
+      neighbors,
+      distances,
+      parsed_args.json,
+    )
+  else:
+    print_duplicates(
+      index,
+      find_duplicate_themes(index, parsed_args.distance),
+      parsed_args.json,
+    )
+
+
+def load_results(
+  paths: List[str],
+  processes: Optional[int] = None,
+  **theme_options,
+):
+  image_paths = [path for path in paths if not path.endswith('.json')]
+  batch_colors = process_batch(
+    image_paths,
+    processes=processes,
+    **theme_options,
+  ) if image_paths else []
+  for image_path, result in zip(image_paths, batch_colors):
+    if isinstance(result, Exception):
+      raise ValueError(f"{image_path}: {result}") from result
+  processed = iter(batch_colors)
+
+  return [
+    load_result(path) if path.endswith('.json') else next(processed)
+    for path in paths
+  ]
+
+
+def extract_role_features(themes: List[dict]) -> np.ndarray:
+  colors = np.array(
+    [[theme[section][name][INDEX_VARIANT] for section, name in INDEX_ROLES]
+     for theme in themes],
+    dtype=np.float64,
+  ).reshape(-1, len(INDEX_ROLES), 3)
+  return get_backend().srgb_to_oklab(
+    unpack_colors_batch(pack_colors_batch(colors))).astype(np.float32)
+
+
+def create_theme_index(paths: List[str], themes: List[dict]) -> ThemeIndex:
+  if len(paths) != len(themes):
+    raise ValueError("Expected one path per theme.")
+
+  palette_sizes = np.array([len(theme['colors']) for theme in themes],
+                           dtype=np.int32)
+  palettes = np.zeros((len(themes), int(palette_sizes.max(initial=0))),
+                      dtype=np.uint32)
+  for row, theme in enumerate(themes):
+    palettes[row, :palette_sizes[row]] = pack_colors_batch(
+      np.array(theme['colors'], dtype=np.float64).reshape(-1, 3))
+
+  return ThemeIndex(
+    paths=np.array(paths, dtype=np.str_),
+    roles=extract_role_features(themes),
+    palettes=palettes,
+    palette_sizes=palette_sizes,
+  )
+
+
+def append_theme_index(
+  index: ThemeIndex,
+  paths: List[str],
+  themes: List[dict],
+) -> ThemeIndex:
+  appended = create_theme_index(paths, themes)
+  keep = ~np.isin(index.paths, appended.paths)
+
+  width = max(index.palettes.shape[1], appended.palettes.shape[1])
+  palettes = [
+    np.pad(palettes, ((0, 0), (0, width - palettes.shape[1])))
+    for palettes in [index.palettes[keep], appended.palettes]
+  ]
+
+  return ThemeIndex(
+    paths=np.concatenate([index.paths[keep], appended.paths]),
+    roles=np.concatenate([index.roles[keep], appended.roles]),
+    palettes=np.concatenate(palettes),
+    palette_sizes=np.concatenate(
+      [index.palette_sizes[keep], appended.palette_sizes]),
+  )
+
+
+def save_theme_index(index_path: str, index: ThemeIndex):
+  buffer = io.BytesIO()
+  np.savez_compressed(
+    buffer,
+    index_version=INDEX_VERSION,
+    algorithm_fingerprint=get_algorithm_fingerprint(),
+    **index._asdict(),
+  )
+  write_atomic(index_path, buffer.getvalue())
+
+
+def load_theme_index(index_path: str) -> ThemeIndex:
+  with np.load(index_path) as arrays:
+    if int(arrays['index_version']) != INDEX_VERSION:
+      raise ValueError(f"Unsupported theme index version in {index_path}!")
+    if str(arrays['algorithm_fingerprint']) != get_algorithm_fingerprint():
+      raise ValueError(f"Theme index {index_path} was built with another "
+                       "algorithm version; rebuild it.")
+
+    return ThemeIndex(**{field: arrays[field] for field in ThemeIndex._fields})
+
+
+def calculate_squared_distances(
+  queries: np.ndarray,
+  features: np.ndarray,
+  feature_norms: np.ndarray,
+) -> np.ndarray:
+  queries = queries.reshape(len(queries), -1).astype(np.float64)
+  squared = queries @ features.T
+  squared *= -2.0
+  squared += np.einsum('ij,ij->i', queries, queries)[:, np.newaxis]
+  squared += feature_norms[np.newaxis]
+  return np.maximum(squared, 0.0, out=squared)
+
+
+def calculate_role_distances(
+  queries: np.ndarray,
+  features: np.ndarray,
+  feature_norms: np.ndarray,
+) -> np.ndarray:
+  return np.sqrt(
+    calculate_squared_distances(queries, features, feature_norms) /
+    len(INDEX_ROLES))
+
+
+def query_theme_index(
+  index: ThemeIndex,
+  queries: np.ndarray,
+  neighbors: int = DEFAULT_NEIGHBORS,
+) -> Tuple[np.ndarray, np.ndarray]:
+  assert_neighbors(neighbors)
+
+  features = index.roles.reshape(len(index.roles), -1).astype(np.float64)
+  feature_norms = np.einsum('ij,ij->i', features, features)
+  neighbors = min(neighbors, len(features))
+
+  indices = np.zeros((len(queries), neighbors), dtype=np.int64)
+  distances = np.zeros((len(queries), neighbors), dtype=np.float32)
+  for start in range(0, len(queries), QUERY_CHUNK_SIZE):
+    chunk = calculate_role_distances(
+      queries[start:start + QUERY_CHUNK_SIZE],
+      features,
+      feature_norms,
+    )
+    nearest = np.argpartition(chunk, neighbors - 1, axis=1)[:, :neighbors]
+    nearest_distances = np.take_along_axis(chunk, nearest, axis=1)
+    order = np.lexsort((nearest, nearest_distances), axis=1)
+    indices[start:start + len(chunk)] = np.take_along_axis(nearest, order, 1)
+    distances[start:start + len(chunk)] = np.take_along_axis(
+      nearest_distances, order, 1)
+
+  return indices, distances
+
+
+def find_duplicate_themes(
+  index: ThemeIndex,
+  distance: float = DEFAULT_DUPLICATE_DISTANCE,
+) -> List[List[int]]:
+  assert_distance(distance)
+
+  features = index.roles.reshape(len(index.roles), -1).astype(np.float64)
+  order = np.argsort(features[:, 0], kind='stable')
+  features = features[order]
+  feature_norms = np.einsum('ij,ij->i', features, features)
+  keys = features[:, 0]
+  radius = distance * np.sqrt(len(INDEX_ROLES))
+  assigned = np.zeros(len(features), dtype=bool)
+
+  groups = []
+  for start in range(0, len(features), QUERY_CHUNK_SIZE):
+    end = min(start + QUERY_CHUNK_SIZE, len(features))
+    low = np.searchsorted(keys, keys[start] - radius, side='left')
+    high = np.searchsorted(keys, keys[end - 1] + radius, side='right')
+    rows, columns = np.nonzero(
+      calculate_squared_distances(
+        features[start:end],
+        features[low:high],
+        feature_norms[low:high],
+      ) <= distance**2 * len(INDEX_ROLES))
+    bounds = np.searchsorted(rows, np.arange(end - start + 1))
+    for offset in np.flatnonzero(np.diff(bounds) > 1).tolist():
+      row = start + offset
+      if assigned[row]:
+        continue
+
+      members = columns[bounds[offset]:bounds[offset + 1]] + low
+      members = np.union1d(members[~assigned[members]], [row])
+      assigned[members] = True
+      if len(members) > 1:
+        groups.append(np.sort(order[members]).tolist())
+
+  groups.sort()
+  return groups
+
+
+def print_neighbors(index, query_paths, neighbors, distances, in_json=False):
+  results = [{
+    'path':
+    query_path,
+    'neighbors': [{
+      'path':
+      str(index.paths[neighbor]),
+      'distance':
+      round(float(distance), 6),
+      'colors':
+      format_hex_batch(
+        index.palettes[neighbor, :index.palette_sizes[neighbor]]),
+    } for neighbor, distance in zip(row_neighbors, row_distances)],
+  }
+             for query_path, row_neighbors, row_distances in zip(
+               query_paths, neighbors, distances)]
+
+  if in_json:
+    json.dump(results, sys.stdout)
+    return
+
+  for result in results:
+    sys.stdout.write(f"{result['path']}\n")
+    for neighbor in result['neighbors']:
+      sys.stdout.write(f"  {neighbor['distance']:.4f} {neighbor['path']}\n")
+
+
+def print_duplicates(index, groups, in_json=False):
+  paths = [[str(index.paths[member]) for member in group] for group in groups]
+
+  if in_json:
+    json.dump(paths, sys.stdout)
+    return
+
+  for group in paths:
+    sys.stdout.write('\n'.join(group) + '\n\n')
+
+
+def parse_args():
+  parser = argparse.ArgumentParser(description="Tint Gear theme index")
+
+  parser.add_argument(
+    'index_path',
+    type=str,
+    help="Path to the .npz theme index",
+  )
+
+  commands = parser.add_subparsers(dest='command', required=True)
+
+  add_parser = commands.add_parser(
+    'add',
+    help="Add images or tint-gear json results to the index",
+  )
+  add_parser.add_argument(
+    'paths',
+    type=str,
+    nargs='+',
+    metavar='path',
+    help="Images or tint-gear json results to index",
+  )
+  add_parser.add_argument(
+    '--processes',
+    type=int,
+    default=None,
+    help="Number of processes to extract images with",
+  )
+  add_theme_arguments(add_parser)
+
+  query_parser = commands.add_parser(
+    'query',
+    help="Find the indexed themes closest to images or json results",
+  )
+  query_parser.add_argument(
+    'paths',
+    type=str,
+    nargs='+',
+    metavar='path',
+    help="Images or tint-gear json results to look up",
+  )
+  query_parser.add_argument(
+    '-n',
+    '--neighbors',
+    type=int,
+    default=DEFAULT_NEIGHBORS,
+    help="Number of closest themes to print",
+  )
+  add_theme_arguments(query_parser)
+  query_parser.add_argument(
+    '--json',
+    action='store_true',
+    help="Output in JSON format",
+  )
+
+  duplicates_parser = commands.add_parser(
+    'duplicates',
+    help="Group near-identical indexed themes",
+  )
+  duplicates_parser.add_argument(
+    '--distance',
+    type=float,
+    default=DEFAULT_DUPLICATE_DISTANCE,
+    help="Maximum RMS Oklab distance between key role colors of duplicates",
+  )
+  duplicates_parser.add_argument(
+    '--json',
+    action='store_true',
+    help="Output in JSON format",
+  )
+
+  parsed_args = parser.parse_args()
+
+  if (parsed_args.command == 'add' and parsed_args.processes is not None
+      and parsed_args.processes <= 0):
+    parser.error("--processes must be a positive integer")
+
+  if parsed_args.command == 'query' and parsed_args.neighbors <= 0:
+    parser.error("--neighbors must be a positive integer")
+
+  if parsed_args.command == 'duplicates' and parsed_args.distance < 0:
+    parser.error("--distance must not be negative")
+
+  return parsed_args
+
+
+if __name__ == '__main__':
+  main()
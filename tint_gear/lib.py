@@ -1,5 +1,16 @@
+import heapq
 import math
-from typing import Tuple, List
+from bisect import bisect_left
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from tint_gear.backend import get_backend
+from tint_gear.batch import (
+  gamut_map_oklab_batch,
+  get_luminance_batch,
+  get_saturation_batch,
+)
 
 EPSILON = 1e-6
 
@@ -21,6 +32,10 @@ LIGHTNESS_MAX = 1.0
 AB_MIN = -1.0
 AB_MAX = 1.0
 
+MIN_DISTINCT_COLORS = 3
+SYNTHESIZED_HUE_ROTATIONS = [120.0, 180.0]
+SYNTHESIZED_MIN_CHROMA = 0.05
+
 
 def assert_rgb_component(value):
   assert isinstance(
@@ -39,6 +54,13 @@ def assert_list_of_rgb_colors(colors):
     assert_rgb_color(*c)
 
 
+def assert_weights(weights, length):
+  assert len(weights) == length, (
+    f"Expected {length} weights, got {len(weights)}.")
+  assert all(weight >= 0 for weight in weights), "Weights must not be negative."
+  assert sum(weights) > 0, "Weights must not all be zero."
+
+
 def assert_hue(value):
   assert isinstance(value, (float, int)), f"Hue {value} must be a float or int."
   assert HUE_MIN <= value <= HUE_MAX, f"Hue {value} is out of bounds."
@@ -195,14 +217,13 @@ def srgb_to_hex(
 ) -> str:
   assert_rgb_color(r, g, b)
 
-  hex_value = "#{:02x}{:02x}{:02x}".format(
-    int(clamp_with_epsilon(r, RGB_MIN, RGB_MAX) * 255),
-    int(clamp_with_epsilon(g, RGB_MIN, RGB_MAX) * 255),
-    int(clamp_with_epsilon(b, RGB_MIN, RGB_MAX) * 255),
-  )
+  red = round(clamp_with_epsilon(r, RGB_MIN, RGB_MAX) * 255)
+  green = round(clamp_with_epsilon(g, RGB_MIN, RGB_MAX) * 255)
+  blue = round(clamp_with_epsilon(b, RGB_MIN, RGB_MAX) * 255)
+  hex_value = f"#{red:02x}{green:02x}{blue:02x}"
 
   if pretty:
-    ansi_color = f"\033[38;2;{int(r * 255)};{int(g * 255)};{int(b * 255)}m"
+    ansi_color = f"\033[38;2;{red};{green};{blue}m"
     reset = "\033[0m"
     return f"{ansi_color}{hex_value}{reset}"
 
@@ -306,41 +327,15 @@ def set_saturation(
   assert_rgb_color(r, g, b)
   assert_saturation(target_saturation)
 
-  linear_r, linear_g, linear_b = srgb_to_linear_srgb(r, g, b)
-  L, a, b = linear_srgb_to_oklab(linear_r, linear_g, linear_b)
-
-  current_saturation = math.sqrt(a**2 + b**2)
-  if current_saturation == 0:
-    new_a = clamp_with_epsilon(
-      target_saturation,
-      SATURATION_MIN,
-      SATURATION_MAX,
-    )
-    new_b = 0
-  else:
-    scale = clamp_with_epsilon(
-      target_saturation,
-      SATURATION_MIN,
-      SATURATION_MAX,
-    ) / current_saturation
-    new_a = a * scale
-    new_b = b * scale
-
-  new_linear_r, new_linear_g, new_linear_b = oklab_to_linear_srgb(
-    L,
-    new_a,
-    new_b,
-  )
-  new_r, new_g, new_b = linear_srgb_to_srgb(
-    new_linear_r,
-    new_linear_g,
-    new_linear_b,
+  new_r, new_g, new_b = get_backend().set_saturation(
+    np.array([r, g, b]),
+    target_saturation,
   )
 
   return (
-    clamp_with_epsilon(new_r, RGB_MIN, RGB_MAX),
-    clamp_with_epsilon(new_g, RGB_MIN, RGB_MAX),
-    clamp_with_epsilon(new_b, RGB_MIN, RGB_MAX),
+    clamp_with_epsilon(float(new_r), RGB_MIN, RGB_MAX),
+    clamp_with_epsilon(float(new_g), RGB_MIN, RGB_MAX),
+    clamp_with_epsilon(float(new_b), RGB_MIN, RGB_MAX),
   )
 
 
@@ -367,51 +362,35 @@ def set_luminance(
   assert_rgb_color(r, g, b)
   assert_luminance(target_luminance)
 
-  new_r, new_g, new_b = r, g, b
-
-  linear_r, linear_g, linear_b = srgb_to_linear_srgb(new_r, new_g, new_b)
-  L, a, b = linear_srgb_to_oklab(linear_r, linear_g, linear_b)
-  current_luminance = get_luminance(new_r, new_g, new_b)
-  new_L = L
-
-  if current_luminance < target_luminance:
-    adjust_lightness = increment
-  else:
-    adjust_lightness = -increment
-
-  iteration = 0
-  while iteration < (1 / increment):
-    new_L = new_L + adjust_lightness
-    if not LIGHTNESS_MIN <= new_L <= LIGHTNESS_MAX:
-      break
-
-    new_linear_r, new_linear_g, new_linear_b = oklab_to_linear_srgb(new_L, a, b)
-    new_r, new_g, new_b = linear_srgb_to_srgb(
-      new_linear_r,
-      new_linear_g,
-      new_linear_b,
-    )
-    current_luminance = get_luminance(new_r, new_g, new_b)
-
-    if ((adjust_lightness > 0 and current_luminance >= target_luminance)
-        or (adjust_lightness < 0 and current_luminance <= target_luminance)):
-      break
-
-    iteration += 1
+  new_r, new_g, new_b = get_backend().step_luminance(
+    np.array([r, g, b]),
+    target_luminance,
+    increment,
+  )
 
-  return (clamp_with_epsilon(new_r, RGB_MIN, RGB_MAX),
-          clamp_with_epsilon(new_g, RGB_MIN, RGB_MAX),
-          clamp_with_epsilon(new_b, RGB_MIN, RGB_MAX))
+  return (clamp_with_epsilon(float(new_r), RGB_MIN, RGB_MAX),
+          clamp_with_epsilon(float(new_g), RGB_MIN, RGB_MAX),
+          clamp_with_epsilon(float(new_b), RGB_MIN, RGB_MAX))
 
 
 def calculate_average_luminance(
-  colors: List[Tuple[float, float, float]], ) -> float:
+  colors: List[Tuple[float, float, float]],
+  weights: Optional[List[float]] = None,
+) -> float:
   assert_list_of_rgb_colors(colors)
 
-  total_luminance = 0
-  for r, g, b in colors:
-    total_luminance += get_luminance(r, g, b)
-  average_luminance = total_luminance / len(colors)
+  if weights is None:
+    total_luminance = 0
+    for r, g, b in colors:
+      total_luminance += get_luminance(r, g, b)
+    average_luminance = total_luminance / len(colors)
+  else:
+    assert_weights(weights, len(colors))
+    average_luminance = float(
+      np.average(
+        get_luminance_batch(np.asarray(colors)),
+        weights=weights,
+      ))
 
   return clamp_with_epsilon(
     average_luminance,
@@ -421,13 +400,23 @@ def calculate_average_luminance(
 
 
 def calculate_average_saturation(
-  colors: List[Tuple[float, float, float]], ) -> float:
+  colors: List[Tuple[float, float, float]],
+  weights: Optional[List[float]] = None,
+) -> float:
   assert_list_of_rgb_colors(colors)
 
-  total_saturation = 0
-  for r, g, b in colors:
-    total_saturation += get_saturation(r, g, b)
-  average_saturation = total_saturation / len(colors)
+  if weights is None:
+    total_saturation = 0
+    for r, g, b in colors:
+      total_saturation += get_saturation(r, g, b)
+    average_saturation = total_saturation / len(colors)
+  else:
+    assert_weights(weights, len(colors))
+    average_saturation = float(
+      np.average(
+        get_saturation_batch(np.asarray(colors)),
+        weights=weights,
+      ))
 
   return clamp_with_epsilon(
     average_saturation,
@@ -447,51 +436,176 @@ def determine_theme_light_or_dark(
           if alternate else average_luminance > threshold)
 
 
-def determine_primary_secondary_accent(
+class PaletteIndex(NamedTuple):
+  colors: List[Tuple[float, float, float]]
+  luminances: List[float]
+  saturations: List[float]
+  hues: List[float]
+
+
+class HueIndex(NamedTuple):
+  hues: List[float]
+  colors: List[Tuple[float, float, float]]
+
+
+def create_palette_index(
+  colors: List[Tuple[float, float, float]], ) -> PaletteIndex:
+  assert_list_of_rgb_colors(colors)
+
+  return PaletteIndex(
+    colors=list(colors),
+    luminances=[get_luminance(*color) for color in colors],
+    saturations=[get_saturation(*color) for color in colors],
+    hues=[get_hue(*color) for color in colors],
+  )
+
+
+def select_by_luminance(
+  palette_index: PaletteIndex,
+  rank: int,
+  lightest: bool = False,
+) -> int:
+  assert isinstance(rank, int), "rank must be an integer."
+  assert 0 <= rank < len(palette_index.colors), f"Rank {rank} is out of bounds."
+
+  luminances = palette_index.luminances
+  select = heapq.nlargest if lightest else heapq.nsmallest
+
+  return select(
+    rank + 1,
+    range(len(luminances)),
+    key=lambda i: (luminances[i], i),
+  )[rank]
+
+
+def calculate_hue_difference(
+  hue: float,
+  other_hue: float,
+) -> float:
+  hue_difference = abs(hue - other_hue) % 360
+  return min(hue_difference, 360 - hue_difference)
+
+
+def create_hue_index(
   colors: List[Tuple[float, float, float]],
-  saturation_increase: float = 0.2,
-) -> Tuple[Tuple[float, float, float], Tuple[float, float, float], Tuple[
-    float, float, float]]:
+  hues: Optional[List[float]] = None,
+) -> HueIndex:
   assert_list_of_rgb_colors(colors)
+  assert len(colors) > 0, "colors must not be empty."
+
+  if hues is None:
+    hues = [get_hue(*color) for color in colors]
+  assert len(hues) == len(colors), "hues must match colors."
+
+  order = sorted(range(len(colors)), key=lambda i: (hues[i], i))
+
+  return HueIndex(
+    hues=[hues[i] for i in order],
+    colors=[colors[i] for i in order],
+  )
+
+
+def find_nearest_hue(
+  hue_index: HueIndex,
+  hue: float,
+) -> Tuple[Tuple[float, float, float], float]:
+  assert_hue(hue)
+
+  hues = hue_index.hues
+  position = bisect_left(hues, hue)
+  after = position % len(hues)
+  before = (position - 1) % len(hues)
+
+  nearest = min(
+    [before, after],
+    key=lambda i: calculate_hue_difference(hues[i], hue),
+  )
 
-  colors = sorted(
-    colors,
-    key=lambda x: get_saturation(*x),
-    reverse=True,
+  return hue_index.colors[nearest], hues[nearest]
+
+
+def synthesize_hue_rotations(
+  color: Tuple[float, float, float],
+  rotations: List[float],
+  chroma: Optional[float] = None,
+) -> List[Tuple[float, float, float]]:
+  assert_rgb_color(*color)
+
+  L, a, b = linear_srgb_to_oklab(*srgb_to_linear_srgb(*color))
+  if chroma is None:
+    chroma = math.hypot(a, b)
+  chroma = max(chroma, SYNTHESIZED_MIN_CHROMA)
+  hue = math.atan2(b, a)
+  angles = hue + np.radians(rotations)
+
+  oklab = np.stack(
+    [
+      np.full(len(angles), L),
+      chroma * np.cos(angles),
+      chroma * np.sin(angles),
+    ],
+    axis=-1,
   )
+  return [tuple(rotated) for rotated in gamut_map_oklab_batch(oklab).tolist()]
 
-  primary = colors[0]
 
-  primary_hue = get_hue(*primary)
-  hue_differences = []
+def determine_primary_secondary_accent(
+  colors: List[Tuple[float, float, float]],
+  saturation_increase: float = 0.2,
+  palette_index: Optional[PaletteIndex] = None,
+) -> Tuple[Tuple[float, float, float], Tuple[float, float, float], Tuple[
+    float, float, float]]:
+  assert_list_of_rgb_colors(colors)
 
-  for color in colors[1:]:
-    hue = get_hue(*color)
-    hue_diff = abs(primary_hue - hue)
-    hue_diff = min(hue_diff, 360 - hue_diff)
-    hue_differences.append((hue_diff, color))
+  if palette_index is None:
+    palette_index = create_palette_index(colors)
 
-  hue_differences.sort(reverse=True, key=lambda x: x[0])
+  saturations = palette_index.saturations
+  hues = palette_index.hues
 
-  accent = hue_differences[0][1]
-  secondary = hue_differences[1][1]
+  primary_index = max(
+    range(len(saturations)),
+    key=lambda i: (saturations[i], -i),
+  )
+  primary_hue = hues[primary_index]
 
   primary = set_saturation(
-    *primary,
+    *palette_index.colors[primary_index],
     clamp_with_epsilon(
-      get_saturation(*primary) + saturation_increase,
+      saturations[primary_index] + saturation_increase,
       min_value=SATURATION_MIN,
       max_value=SATURATION_MAX,
       epsilon=0.5,
     ),
   )
 
+  if len(set(palette_index.colors)) < MIN_DISTINCT_COLORS:
+    secondary, accent = synthesize_hue_rotations(
+      palette_index.colors[primary_index],
+      SYNTHESIZED_HUE_ROTATIONS,
+      chroma=clamp_with_epsilon(
+        saturations[primary_index] + 0.2,
+        min_value=SATURATION_MIN,
+        max_value=SATURATION_MAX,
+        epsilon=0.5,
+      ),
+    )
+    return primary, secondary, accent
+
+  accent_index, secondary_index = heapq.nlargest(
+    2,
+    (i for i in range(len(saturations)) if i != primary_index),
+    key=lambda i: (
+      calculate_hue_difference(primary_hue, hues[i]),
+      saturations[i],
+      -i,
+    ),
+  )
+
   secondary = set_saturation(
-    secondary[0],
-    secondary[1],
-    secondary[2],
+    *palette_index.colors[secondary_index],
     clamp_with_epsilon(
-      get_saturation(*secondary) + 0.2,
+      saturations[secondary_index] + 0.2,
       min_value=SATURATION_MIN,
       max_value=SATURATION_MAX,
       epsilon=0.5,
@@ -499,11 +613,9 @@ def determine_primary_secondary_accent(
   )
 
   accent = set_saturation(
-    accent[0],
-    accent[1],
-    accent[2],
+    *palette_index.colors[accent_index],
     clamp_with_epsilon(
-      get_saturation(*accent) + 0.2,
+      saturations[accent_index] + 0.2,
       min_value=SATURATION_MIN,
       max_value=SATURATION_MAX,
       epsilon=0.5,
@@ -517,28 +629,34 @@ def determine_black_white(
   colors: List[Tuple[float, float, float]],
   is_light_theme: bool,
   max_saturation: float,
-  index: int = 0
+  index: int = 0,
+  palette_index: Optional[PaletteIndex] = None,
 ) -> Tuple[Tuple[float, float, float], Tuple[float, float, float]]:
   assert_list_of_rgb_colors(colors)
   assert isinstance(is_light_theme, bool), "is_light_theme must be a boolean."
   assert_saturation(max_saturation)
 
+  if palette_index is None:
+    palette_index = create_palette_index(colors)
+
+  index = min(index, len(palette_index.colors) - 1)
+  darkest_index = select_by_luminance(palette_index, index)
+  lightest_index = select_by_luminance(palette_index, index, lightest=True)
+
   if is_light_theme:
-    black_color = sorted(colors, key=lambda color: get_luminance(*color))[index]
-    white_color = list(
-      reversed(sorted(colors, key=lambda color: get_luminance(*color))))[index]
+    black_index, white_index = darkest_index, lightest_index
   else:
-    black_color = list(
-      reversed(sorted(colors, key=lambda color: get_luminance(*color))))[index]
-    white_color = sorted(colors, key=lambda color: get_luminance(*color))[index]
+    black_index, white_index = lightest_index, darkest_index
 
-  bg_r, bg_g, bg_b = black_color
-  bg_saturation = min(get_saturation(bg_r, bg_g, bg_b), max_saturation)
-  black_color = set_saturation(bg_r, bg_g, bg_b, bg_saturation)
+  black_color = set_saturation(
+    *palette_index.colors[black_index],
+    min(palette_index.saturations[black_index], max_saturation),
+  )
 
-  text_r, text_g, text_b = white_color
-  text_saturation = min(get_saturation(text_r, text_g, text_b), max_saturation)
-  white_color = set_saturation(text_r, text_g, text_b, text_saturation)
+  white_color = set_saturation(
+    *palette_index.colors[white_index],
+    min(palette_index.saturations[white_index], max_saturation),
+  )
 
   if is_light_theme:
     white_color = set_luminance(
@@ -559,24 +677,22 @@ def determine_semantic_color(
   colors: List[Tuple[float, float, float]],
   hue_nudge_degrees: float = 10,
   saturation_decrease: float = 0.1,
+  hue_index: Optional[HueIndex] = None,
 ) -> Tuple[float, float, float]:
   assert_rgb_color(*default_color)
   assert_list_of_rgb_colors(colors)
   assert_hue(hue_nudge_degrees)
   assert_saturation(saturation_decrease)
 
+  if hue_index is None:
+    hue_index = create_hue_index(colors)
+
   default_r, default_g, default_b = default_color
   default_hue = get_hue(*default_color)
 
-  closest_color = min(
-    colors,
-    key=lambda color: abs(get_hue(*color) - default_hue),
-  )
-
-  closest_hue = get_hue(*closest_color)
+  _, closest_hue = find_nearest_hue(hue_index, default_hue)
 
-  hue_difference = abs(default_hue - closest_hue)
-  hue_difference = min(hue_difference, 360 - hue_difference)
+  hue_difference = calculate_hue_difference(default_hue, closest_hue)
 
   adjusted_color = default_color
   if hue_difference <= 60:
@@ -622,44 +738,17 @@ def adjust_contrast(
   assert isinstance(is_light, bool), "is_light must be a boolean."
   assert isinstance(high_contrast, bool), "high_contrast must be a boolean."
 
-  r, g, b = color
-
-  current_luminance = get_luminance(r, g, b)
-  color_luminance_diff = current_luminance - average_luminance
-
-  range_min = clamp_with_epsilon(
-    (1 / (8.0 if high_contrast else 5.0)) *
-    (1 - math.exp(-k * average_luminance)),
-    LUMINANCE_MIN,
-    LUMINANCE_MAX,
-  )
-  range_max = clamp_with_epsilon(
-    range_min * (7.0 if high_contrast else 4.5),
-    LUMINANCE_MIN,
-    LUMINANCE_MAX,
+  r, g, b = get_backend().adjust_contrast(
+    np.array(color, dtype=np.float64),
+    average_luminance,
+    is_light,
+    invert,
+    high_contrast,
+    k,
   )
 
-  if invert:
-    range_min = 1 - range_min
-    range_max = 1 - range_max
-
-  current_luminance = get_luminance(*color)
-  if is_light:
-    proportional_luminance_light = (average_luminance * (1 - range_max) +
-                                    range_max)
-    proportional_luminance_diff_ligth = (1 - range_max) * color_luminance_diff
-    final_luminance = proportional_luminance_light + proportional_luminance_diff_ligth
-  else:
-    proportional_luminance_dark = average_luminance * range_min
-    proportional_luminance_diff_dark = range_min * color_luminance_diff
-    final_luminance = proportional_luminance_dark + proportional_luminance_diff_dark
-
-  final_luminance = clamp_with_epsilon(
-    final_luminance,
-    LUMINANCE_MIN,
-    LUMINANCE_MAX,
-    epsilon=1e-1,
+  return (
+    clamp_with_epsilon(float(r), RGB_MIN, RGB_MAX),
+    clamp_with_epsilon(float(g), RGB_MIN, RGB_MAX),
+    clamp_with_epsilon(float(b), RGB_MIN, RGB_MAX),
   )
-
-  adjusted_color = set_luminance(r, g, b, final_luminance)
-  return adjusted_color
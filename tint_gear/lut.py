@@ -0,0 +1,232 @@
+import argparse
+
+import numpy as np
+
+from tint_gear.backend import (
+  AUTO_BACKEND,
+  BACKEND_NAMES,
+  get_backend,
+  set_backend,
+)
+from tint_gear.emit import VARIANT_NAMES, write_atomic
+from tint_gear.result import (
+  add_theme_arguments,
+  get_theme_options,
+  load_result,
+)
+from tint_gear.recolor import (
+  DEFAULT_STRENGTH,
+  PALETTE_SOURCES,
+  RECOLOR_MODES,
+  assert_recolor_options,
+  create_palette_grid,
+  create_recolor_palette,
+  recolor_pixels,
+)
+
+LUT_SIZES = [17, 33, 65]
+LUT_TRANSFORMS = ['contrast', 'recolor']
+DEFAULT_LUT_SIZE = 33
+
+
+def assert_lut_size(size):
+  if size not in LUT_SIZES:
+    raise ValueError(f"Unsupported LUT size {size}! "
+                     f"Expected one of {', '.join(map(str, LUT_SIZES))}.")
+
+
+def main():
+  parsed_args = parse_args()
+  set_backend(parsed_args.backend)
+
+  deserialized_colors = load_result(
+    parsed_args.theme,
+    **get_theme_options(parsed_args),
+  )
+  lattice = create_lattice(parsed_args.size)
+
+  if parsed_args.transform == 'contrast':
+    colors = apply_contrast_transform(
+      lattice,
+      deserialized_colors,
+      high_contrast=parsed_args.high_contrast,
+      k=parsed_args.k,
+      saturation=parsed_args.saturation,
+    )
+  else:
+    colors = apply_recolor_transform(
+      lattice,
+      create_recolor_palette(
+        deserialized_colors,
+        source=parsed_args.palette,
+        variant=parsed_args.variant,
+      ),
+      mode=parsed_args.mode,
+      strength=parsed_args.strength,
+    )
+
+  write_cube(parsed_args.output_path, colors, parsed_args.size)
+
+
+def create_lattice(size: int = DEFAULT_LUT_SIZE) -> np.ndarray:
+  assert_lut_size(size)
+
+  levels = np.linspace(0.0, 1.0, size)
+  blue, green, red = np.meshgrid(levels, levels, levels, indexing='ij')
+  return np.stack([red.ravel(), green.ravel(), blue.ravel()], axis=-1)
+
+
+def apply_contrast_transform(
+  lattice: np.ndarray,
+  deserialized_colors: dict,
+  high_contrast: bool = False,
+  k: float = 4.0,
+  saturation: float = 1.0,
+) -> np.ndarray:
+  is_light_theme = deserialized_colors['is_light_theme']
+  backend = get_backend()
+  colors = backend.adjust_contrast(
+    lattice,
+    deserialized_colors['average_luminance'],
+    is_light=is_light_theme,
+    invert=is_light_theme,
+    high_contrast=high_contrast,
+    k=k,
+  )
+
+  if saturation != 1.0:
+    colors = backend.set_saturation(
+      colors,
+      backend.get_saturation(colors) * saturation,
+    )
+
+  return colors
+
+
+def apply_recolor_transform(
+  lattice: np.ndarray,
+  palette: np.ndarray,
+  mode: str = 'nearest',
+  strength: float = DEFAULT_STRENGTH,
+) -> np.ndarray:
+  assert_recolor_options(mode, strength, 0.0)
+
+  rgb = np.rint(lattice * 255).astype(np.uint8)[np.newaxis]
+  recolored = recolor_pixels(
+    rgb,
+    palette,
+    create_palette_grid(palette),
+    mode=mode,
+    strength=strength,
+  )
+  return recolored[0] / 255.0
+
+
+def write_cube(
+  output_path: str,
+  colors: np.ndarray,
+  size: int,
+  title: str = "tint-gear",
+):
+  assert_lut_size(size)
+  if colors.shape != (size**3, 3):
+    raise ValueError(f"Expected {size**3} lattice colors.")
+
+  header = (f"TITLE \"{title}\"\n"
+            f"LUT_3D_SIZE {size}\n"
+            "DOMAIN_MIN 0.0 0.0 0.0\n"
+            "DOMAIN_MAX 1.0 1.0 1.0\n")
+  values = np.clip(colors, 0.0, 1.0).ravel().tolist()
+  body = ("%.6f %.6f %.6f\n" * len(colors)) % tuple(values)
+  write_atomic(output_path, header + body)
+
+
+def parse_args():
+  parser = argparse.ArgumentParser(description="Tint Gear LUT export")
+
+  parser.add_argument(
+    'theme',
+    type=str,
+    help="Path to an image or tint-gear json result to take colors from.",
+  )
+
+  parser.add_argument(
+    'output_path',
+    type=str,
+    help="Path to write the .cube LUT to.",
+  )
+
+  parser.add_argument(
+    '--transform',
+    choices=LUT_TRANSFORMS,
+    default='contrast',
+    help="Color transform to bake into the LUT",
+  )
+
+  parser.add_argument(
+    '--size',
+    type=int,
+    choices=LUT_SIZES,
+    default=DEFAULT_LUT_SIZE,
+    help="Number of lattice points along each axis",
+  )
+
+  add_theme_arguments(parser)
+
+  parser.add_argument(
+    '--saturation',
+    type=float,
+    default=1.0,
+    help="Multiply saturation by this factor after the contrast mapping",
+  )
+
+  parser.add_argument(
+    '--palette',
+    choices=PALETTE_SOURCES,
+    default='terminal',
+    help="Theme colors to recolor with",
+  )
+
+  parser.add_argument(
+    '--variant',
+    choices=VARIANT_NAMES,
+    default='normal',
+    help="Theme color variant to recolor with",
+  )
+
+  parser.add_argument(
+    '--mode',
+    choices=RECOLOR_MODES,
+    default='nearest',
+    help=("Replace colors with the nearest theme color or shift their hue "
+          "and chroma towards it in Oklab"),
+  )
+
+  parser.add_argument(
+    '--strength',
+    type=float,
+    default=DEFAULT_STRENGTH,
+    help="How far to shift hue and chroma in shift mode, from 0 to 1",
+  )
+
+  parser.add_argument(
+    '--backend',
+    choices=BACKEND_NAMES + [AUTO_BACKEND],
+    default=None,
+    help=("Compute backend for batched color kernels; defaults to the "
+          "TINT_GEAR_BACKEND environment variable or the fastest available"),
+  )
+
+  parsed_args = parser.parse_args()
+
+  if parsed_args.saturation < 0.0:
+    parser.error("--saturation must not be negative")
+
+  if not 0.0 <= parsed_args.strength <= 1.0:
+    parser.error("--strength must be between 0 and 1")
+
+  return parsed_args
+
+
+if __name__ == '__main__':
+  main()
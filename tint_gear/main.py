@@ -1,7 +1,40 @@
+import os
 import sys
 import json
 import argparse
-from tint_gear.extract import extract_prominent_colors
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import resource_tracker
+from typing import List, Optional, Tuple, Union
+from tint_gear.backend import AUTO_BACKEND, BACKEND_NAMES, set_backend
+from tint_gear.cache import (
+  create_cache_key,
+  load_theme,
+  quantize_populations,
+  store_theme,
+)
+from tint_gear.contrast import (
+  ContrastTarget,
+  parse_contrast_target,
+  solve_contrast,
+)
+from tint_gear.emit import EMITTERS, emit_all
+from tint_gear.extract import (
+  FRAME_SMOOTHING,
+  MIN_NUM_COLORS,
+  MAX_NUM_COLORS,
+  extract_palette_histogram,
+  extract_region_palette_histograms,
+  extract_image_statistics,
+  extract_frame_palette_histograms,
+  extract_merged_frame_palette_histogram,
+  decode_image_pixels,
+  quantize_image_pixels,
+  quantize_pixel_histogram,
+  create_tiles,
+  assert_image_path,
+  assert_num_colors,
+  assert_workers,
+)
 from tint_gear.lib import (
   calculate_average_luminance,
   calculate_average_saturation,
@@ -9,22 +42,199 @@ from tint_gear.lib import (
   determine_primary_secondary_accent,
   determine_black_white,
   determine_semantic_color,
+  create_palette_index,
+  create_hue_index,
   adjust_contrast,
-  srgb_to_hex,
+)
+from tint_gear.preview import render_preview, render_previews
+from tint_gear.profiling import MEGABYTE, profile_stage, profiling
+from tint_gear.shared import (
+  SharedArray,
+  SharedTheme,
+  attach_shared_array,
+  create_shared_histograms,
+  decode_shared_pixels,
+  fill_shared_histogram,
+  load_shared_theme,
+  share_theme,
+  unlink_shared_array,
+  unlink_shared_theme,
+)
+from tint_gear.theme import (
+  deserialize_colors,
+  pack_theme,
+  serialize_packed_theme,
 )
 
 
 def main():
   parsed_args = parse_args()
+  set_backend(parsed_args.backend)
 
-  deserialized_colors = process(
-    image_path=parsed_args.image_path,
-    light_theme_threshold=parsed_args.light_theme_threshold,
-    alternate=parsed_args.alternate,
-    k=parsed_args.k,
-    num_colors=parsed_args.num_colors,
-    high_contrast=parsed_args.high_contrast,
-  )
+  try:
+    with profiling(parsed_args.profile):
+      run(parsed_args)
+  except ValueError as error:
+    sys.exit(f"tint-gear: error: {error}")
+
+
+def run(parsed_args):
+  if parsed_args.preview_only:
+    loaded_colors = load_colors(parsed_args.image_path)
+    if isinstance(loaded_colors, list):
+      print_colors_list(
+        loaded_colors,
+        [
+          f"Frame {colors['frame']}"
+          if colors is not None and 'frame' in colors else f"Theme {index}"
+          for index, colors in enumerate(loaded_colors)
+        ],
+        pretty=True,
+      )
+    else:
+      print_colors(loaded_colors, pretty=True)
+    return
+
+  if parsed_args.statistics:
+    print_statistics(
+      process_statistics(
+        image_path=parsed_args.image_path,
+        light_theme_threshold=parsed_args.light_theme_threshold,
+        alternate=parsed_args.alternate,
+      ),
+      parsed_args.pretty,
+      parsed_args.json,
+    )
+    return
+
+  theme_options = {
+    'light_theme_threshold': parsed_args.light_theme_threshold,
+    'alternate': parsed_args.alternate,
+    'k': parsed_args.k,
+    'num_colors': parsed_args.num_colors,
+    'high_contrast': parsed_args.high_contrast,
+    'weighted': parsed_args.weighted,
+    'contrast_targets': parsed_args.contrast_target,
+    'cache_path': parsed_args.cache,
+  }
+  options = {
+    **theme_options,
+    'refine': parsed_args.refine,
+    'workers': parsed_args.workers,
+  }
+
+  if len(parsed_args.image_paths) > 1:
+    batch_colors = process_batch(
+      image_paths=parsed_args.image_paths,
+      refine=parsed_args.refine,
+      processes=parsed_args.processes,
+      **theme_options,
+    )
+
+    errors = [
+      (image_path, result)
+      for image_path, result in zip(parsed_args.image_paths, batch_colors)
+      if isinstance(result, Exception)
+    ]
+    batch_colors = [
+      None if isinstance(result, Exception) else result
+      for result in batch_colors
+    ]
+
+    if parsed_args.emit:
+      for index, deserialized_colors in enumerate(batch_colors):
+        if deserialized_colors is None:
+          continue
+        emit_all(
+          deserialized_colors,
+          [(emitter, output_path.format(image=index))
+           for emitter, output_path in parsed_args.emit],
+        )
+
+    print_colors_list(
+      batch_colors,
+      parsed_args.image_paths,
+      parsed_args.pretty,
+      parsed_args.json,
+    )
+
+    for image_path, error in errors:
+      print(f"tint-gear: error: {image_path}: {error}", file=sys.stderr)
+    if errors:
+      sys.exit(1)
+    return
+
+  if parsed_args.region:
+    region_colors = process_regions(
+      image_path=parsed_args.image_path,
+      regions=[tuple(region) for region in parsed_args.region],
+      **options,
+    )
+
+    if parsed_args.emit:
+      for index, deserialized_colors in enumerate(region_colors):
+        emit_all(
+          deserialized_colors,
+          [(emitter, output_path.format(region=index))
+           for emitter, output_path in parsed_args.emit],
+        )
+
+    print_colors_list(
+      region_colors,
+      [f"Region {index}" for index in range(len(region_colors))],
+      parsed_args.pretty,
+      parsed_args.json,
+    )
+    return
+
+  frame_options = {
+    'frame_step': parsed_args.frame_step,
+    'max_frames': parsed_args.max_frames,
+  }
+
+  if parsed_args.frames == 'timeline':
+    frame_colors = process_frames(
+      image_path=parsed_args.image_path,
+      smoothing=parsed_args.smoothing,
+      **frame_options,
+      **theme_options,
+    )
+
+    if parsed_args.emit:
+      for deserialized_colors in frame_colors:
+        emit_all(
+          deserialized_colors,
+          [(emitter, output_path.format(frame=deserialized_colors['frame']))
+           for emitter, output_path in parsed_args.emit],
+        )
+
+    print_colors_list(
+      frame_colors,
+      [f"Frame {colors['frame']}" for colors in frame_colors],
+      parsed_args.pretty,
+      parsed_args.json,
+    )
+    return
+
+  if parsed_args.frames == 'merged':
+    deserialized_colors = process_merged_frames(
+      image_path=parsed_args.image_path,
+      **frame_options,
+      **theme_options,
+    )
+  else:
+    deserialized_colors = process(
+      image_path=parsed_args.image_path,
+      max_memory=(parsed_args.max_memory *
+                  MEGABYTE if parsed_args.max_memory is not None else None),
+      **options,
+    )
+
+  if parsed_args.emit:
+    emit_all(
+      deserialized_colors,
+      [(emitter, output_path) for emitter, output_path in parsed_args.emit],
+    )
 
   print_colors(
     deserialized_colors,
@@ -40,18 +250,426 @@ def process(
   k: float = 4.0,
   num_colors: int = 8,
   high_contrast: bool = False,
+  refine: bool = False,
+  weighted: bool = False,
+  workers: Optional[int] = None,
+  contrast_targets: Optional[List[ContrastTarget]] = None,
+  cache_path: Optional[str] = None,
+  max_memory: Optional[int] = None,
+) -> dict:
+  colors, populations = extract_palette_histogram(
+    image_path,
+    num_colors,
+    refine=refine,
+    workers=workers,
+    max_memory=max_memory,
+  )
+
+  return derive_theme(
+    colors,
+    populations=populations if weighted else None,
+    light_theme_threshold=light_theme_threshold,
+    alternate=alternate,
+    k=k,
+    high_contrast=high_contrast,
+    contrast_targets=contrast_targets,
+    cache_path=cache_path,
+  )
+
+
+def process_image_data(
+  data: bytes,
+  light_theme_threshold: float = 0.25,
+  alternate: bool = False,
+  k: float = 4.0,
+  num_colors: int = 8,
+  high_contrast: bool = False,
+  refine: bool = False,
+  weighted: bool = False,
+  workers: Optional[int] = None,
+  contrast_targets: Optional[List[ContrastTarget]] = None,
+  cache_path: Optional[str] = None,
+) -> dict:
+  assert_num_colors(num_colors)
+  assert_workers(workers)
+
+  colors, populations = quantize_image_pixels(
+    decode_image_pixels(data),
+    num_colors,
+    refine=refine,
+    workers=workers,
+  )
+
+  return derive_theme(
+    colors,
+    populations=populations if weighted else None,
+    light_theme_threshold=light_theme_threshold,
+    alternate=alternate,
+    k=k,
+    high_contrast=high_contrast,
+    contrast_targets=contrast_targets,
+    cache_path=cache_path,
+  )
+
+
+def process_regions(
+  image_path: str,
+  regions: List[Tuple[int, int, int, int]],
+  light_theme_threshold: float = 0.25,
+  alternate: bool = False,
+  k: float = 4.0,
+  num_colors: int = 8,
+  high_contrast: bool = False,
+  refine: bool = False,
+  weighted: bool = False,
+  workers: Optional[int] = None,
+  contrast_targets: Optional[List[ContrastTarget]] = None,
+  cache_path: Optional[str] = None,
+) -> List[dict]:
+  region_palettes = extract_region_palette_histograms(
+    image_path,
+    regions,
+    num_colors,
+    refine=refine,
+    workers=workers,
+  )
+
+  return [
+    derive_theme(
+      colors,
+      populations=populations if weighted else None,
+      light_theme_threshold=light_theme_threshold,
+      alternate=alternate,
+      k=k,
+      high_contrast=high_contrast,
+      contrast_targets=contrast_targets,
+      cache_path=cache_path,
+    ) for colors, populations in region_palettes
+  ]
+
+
+def process_frames(
+  image_path: str,
+  light_theme_threshold: float = 0.25,
+  alternate: bool = False,
+  k: float = 4.0,
+  num_colors: int = 8,
+  high_contrast: bool = False,
+  weighted: bool = False,
+  frame_step: int = 1,
+  max_frames: Optional[int] = None,
+  smoothing: float = FRAME_SMOOTHING,
+  contrast_targets: Optional[List[ContrastTarget]] = None,
+  cache_path: Optional[str] = None,
+) -> List[dict]:
+  frame_colors = []
+  for frame, colors, populations in extract_frame_palette_histograms(
+      image_path,
+      num_colors,
+      frame_step=frame_step,
+      max_frames=max_frames,
+      smoothing=smoothing,
+  ):
+    deserialized_colors = derive_theme(
+      colors,
+      populations=populations if weighted else None,
+      light_theme_threshold=light_theme_threshold,
+      alternate=alternate,
+      k=k,
+      high_contrast=high_contrast,
+      contrast_targets=contrast_targets,
+      cache_path=cache_path,
+    )
+    deserialized_colors['frame'] = frame
+    frame_colors.append(deserialized_colors)
+
+  return frame_colors
+
+
+def process_merged_frames(
+  image_path: str,
+  light_theme_threshold: float = 0.25,
+  alternate: bool = False,
+  k: float = 4.0,
+  num_colors: int = 8,
+  high_contrast: bool = False,
+  weighted: bool = False,
+  frame_step: int = 1,
+  max_frames: Optional[int] = None,
+  contrast_targets: Optional[List[ContrastTarget]] = None,
+  cache_path: Optional[str] = None,
+) -> dict:
+  colors, populations = extract_merged_frame_palette_histogram(
+    image_path,
+    num_colors,
+    frame_step=frame_step,
+    max_frames=max_frames,
+  )
+
+  return derive_theme(
+    colors,
+    populations=populations if weighted else None,
+    light_theme_threshold=light_theme_threshold,
+    alternate=alternate,
+    k=k,
+    high_contrast=high_contrast,
+    contrast_targets=contrast_targets,
+    cache_path=cache_path,
+  )
+
+
+def process_batch(
+  image_paths: List[str],
+  light_theme_threshold: float = 0.25,
+  alternate: bool = False,
+  k: float = 4.0,
+  num_colors: int = 8,
+  high_contrast: bool = False,
+  refine: bool = False,
+  weighted: bool = False,
+  processes: Optional[int] = None,
+  contrast_targets: Optional[List[ContrastTarget]] = None,
+  cache_path: Optional[str] = None,
+) -> List[Union[dict, Exception]]:
+  for image_path in image_paths:
+    assert_image_path(image_path)
+  assert_num_colors(num_colors)
+  assert_workers(processes)
+
+  theme_options = {
+    'light_theme_threshold': light_theme_threshold,
+    'alternate': alternate,
+    'k': k,
+    'high_contrast': high_contrast,
+    'contrast_targets': contrast_targets,
+    'cache_path': cache_path,
+  }
+  window = processes or os.cpu_count() or 1
+
+  resource_tracker.ensure_running()
+  batch_colors = []
+  with ProcessPoolExecutor(max_workers=processes) as executor:
+    for start in range(0, len(image_paths), window):
+      batch_colors.extend(
+        process_batch_window(
+          executor,
+          image_paths[start:start + window],
+          num_colors=num_colors,
+          refine=refine,
+          weighted=weighted,
+          theme_options=theme_options,
+        ))
+
+  return batch_colors
+
+
+def process_batch_window(
+  executor: ProcessPoolExecutor,
+  image_paths: List[str],
+  num_colors: int,
+  refine: bool,
+  weighted: bool,
+  theme_options: dict,
+) -> List[Union[dict, Exception]]:
+  pixel_handles: List[Union[SharedArray, Exception]] = []
+  histogram_handles: List[Optional[SharedArray]] = []
+  shared_themes: List[Union[SharedTheme, Exception]] = []
+  try:
+    pixel_handles = collect_shared_results(
+      [executor.submit(decode_shared_pixels, path) for path in image_paths])
+
+    tile_futures: List[List[Future]] = []
+    for pixel_handle in pixel_handles:
+      if isinstance(pixel_handle, Exception):
+        histogram_handles.append(None)
+        tile_futures.append([])
+        continue
+
+      tiles = create_tiles(pixel_handle.shape[0])
+      histogram_handle = create_shared_histograms(len(tiles))
+      histogram_handles.append(histogram_handle)
+      tile_futures.append([
+        executor.submit(
+          fill_shared_histogram,
+          pixel_handle,
+          histogram_handle,
+          index,
+          tile,
+        ) for index, tile in enumerate(tiles)
+      ])
+
+    image_errors = [
+      pixel_handle
+      if isinstance(pixel_handle, Exception) else get_future_error(futures)
+      for pixel_handle, futures in zip(pixel_handles, tile_futures)
+    ]
+
+    shared_themes = collect_shared_results([
+      error if error is not None else executor.submit(
+        derive_shared_theme,
+        pixel_handle,
+        histogram_handle,
+        num_colors=num_colors,
+        refine=refine,
+        weighted=weighted,
+        theme_options=theme_options,
+      ) for pixel_handle, histogram_handle, error in zip(
+        pixel_handles, histogram_handles, image_errors)
+    ])
+
+    return [
+      shared_theme if isinstance(shared_theme, Exception) else
+      load_shared_theme(shared_theme) for shared_theme in shared_themes
+    ]
+  finally:
+    for handle in pixel_handles + histogram_handles:
+      if isinstance(handle, SharedArray):
+        unlink_shared_array(handle)
+    for shared_theme in shared_themes:
+      if isinstance(shared_theme, SharedTheme):
+        unlink_shared_theme(shared_theme)
+
+
+def get_future_error(futures: List[Future]) -> Optional[Exception]:
+  error = None
+  for future in futures:
+    try:
+      future.result()
+    except Exception as exception:
+      error = error or exception
+
+  return error
+
+
+def collect_shared_results(futures: List[Union[Future, Exception]], ) -> list:
+  results = []
+  for future in futures:
+    if isinstance(future, Exception):
+      results.append(future)
+      continue
+
+    try:
+      results.append(future.result())
+    except Exception as exception:
+      results.append(exception)
+
+  return results
+
+
+def derive_shared_theme(
+  pixels: SharedArray,
+  histograms: SharedArray,
+  num_colors: int,
+  refine: bool,
+  weighted: bool,
+  theme_options: dict,
+) -> SharedTheme:
+  pixel_memory, rgba = attach_shared_array(pixels)
+  histogram_memory, histogram_rows = attach_shared_array(histograms)
+  try:
+    colors, populations = quantize_pixel_histogram(
+      rgba,
+      histogram_rows.sum(axis=0),
+      num_colors,
+      refine=refine,
+    )
+  finally:
+    del rgba, histogram_rows
+    pixel_memory.close()
+    histogram_memory.close()
+
+  return share_theme(
+    derive_theme(
+      colors,
+      populations=populations if weighted else None,
+      **theme_options,
+    ))
+
+
+def process_statistics(
+  image_path: str,
+  light_theme_threshold: float = 0.25,
+  alternate: bool = False,
+) -> dict:
+  statistics = extract_image_statistics(image_path)
+  is_light_theme = determine_theme_light_or_dark(
+    statistics.average_luminance,
+    light_theme_threshold,
+    alternate,
+  )
+
+  return {
+    'average_luminance': statistics.average_luminance,
+    'average_saturation': statistics.average_saturation,
+    'is_light_theme': is_light_theme,
+    'luminance_histogram': statistics.luminance_histogram,
+  }
+
+
+def derive_theme(
+  colors: List[Tuple[float, float, float]],
+  populations: Optional[List[int]] = None,
+  light_theme_threshold: float = 0.25,
+  alternate: bool = False,
+  k: float = 4.0,
+  high_contrast: bool = False,
+  contrast_targets: Optional[List[ContrastTarget]] = None,
+  cache_path: Optional[str] = None,
 ) -> dict:
-  colors = extract_prominent_colors(image_path, num_colors)
+  theme_options = {
+    'light_theme_threshold': light_theme_threshold,
+    'alternate': alternate,
+    'k': k,
+    'high_contrast': high_contrast,
+    'contrast_targets': contrast_targets,
+  }
+
+  with profile_stage('derive'):
+    weights = (quantize_populations(populations)
+               if populations is not None else None)
+
+    if cache_path is None:
+      deserialized_colors = compute_theme(colors, weights, **theme_options)
+    else:
+      key = create_cache_key(colors, weights, theme_options)
+      deserialized_colors = load_theme(cache_path, key)
+      if deserialized_colors is None:
+        deserialized_colors = compute_theme(colors, weights, **theme_options)
+        store_theme(cache_path, key, deserialized_colors)
+
+    deserialized_colors['populations'] = populations
+    return deserialized_colors
 
-  average_luminance = calculate_average_luminance(colors)
-  average_saturation = calculate_average_saturation(colors)
+
+def compute_theme(
+  colors: List[Tuple[float, float, float]],
+  populations: Optional[List[int]] = None,
+  light_theme_threshold: float = 0.25,
+  alternate: bool = False,
+  k: float = 4.0,
+  high_contrast: bool = False,
+  contrast_targets: Optional[List[ContrastTarget]] = None,
+) -> dict:
+  average_luminance = calculate_average_luminance(colors, populations)
+  average_saturation = calculate_average_saturation(colors, populations)
   is_light_theme = determine_theme_light_or_dark(
     average_luminance,
     light_theme_threshold,
     alternate,
   )
 
-  primary, secondary, accent = determine_primary_secondary_accent(colors)
+  palette_index = create_palette_index(colors)
+  hue_index = create_hue_index(colors, hues=palette_index.hues)
+
+  primary, secondary, accent = determine_primary_secondary_accent(
+    colors,
+    palette_index=palette_index,
+  )
+  primary_alt, secondary_alt, accent_alt = determine_primary_secondary_accent(
+    colors,
+    saturation_increase=0.4,
+    palette_index=palette_index,
+  )
 
   def adjust_color_alternate(base_color, index, color_type):
     if color_type == 'black_white':
@@ -60,6 +678,7 @@ def process(
         is_light_theme,
         max_saturation=0.3,
         index=index + 1,
+        palette_index=palette_index,
       )
       return alt_color
     elif color_type == 'semantic':
@@ -68,12 +687,9 @@ def process(
         colors,
         hue_nudge_degrees=20,
         saturation_decrease=0.2,
+        hue_index=hue_index,
       )
     elif color_type == 'psa':
-      primary_alt, secondary_alt, accent_alt = determine_primary_secondary_accent(
-        colors,
-        saturation_increase=0.4,
-      )
       if base_color == primary:
         return primary_alt
       elif base_color == secondary:
@@ -147,12 +763,14 @@ def process(
     colors,
     is_light_theme,
     max_saturation=0.1,
+    palette_index=palette_index,
   )
   selection_color, text_selection_color = determine_black_white(
     colors,
     is_light_theme,
     max_saturation=0.3,
     index=2,
+    palette_index=palette_index,
   )
   text_colors = {}
   for name, color, index in [
@@ -198,13 +816,21 @@ def process(
     'cyan': (0.0, 0.8, 0.8),
   }
   for color_name, default_color in default_colors.items():
-    color = determine_semantic_color(default_color, colors)
+    color = determine_semantic_color(
+      default_color,
+      colors,
+      hue_index=hue_index,
+    )
     ansi_colors[color_name] = create_color_object(
       color,
       color_type='semantic',
       invert=True,
     )
-    bright_color = determine_semantic_color(default_color, colors)
+    bright_color = determine_semantic_color(
+      default_color,
+      colors,
+      hue_index=hue_index,
+    )
     ansi_colors[f'bright{color_name.capitalize()}'] = create_color_object(
       bright_color,
       color_type='semantic',
@@ -226,6 +852,7 @@ def process(
     'average_saturation': average_saturation,
     'is_light_theme': is_light_theme,
     'colors': colors,
+    'populations': populations,
     'bootstrap': {
       **bootstrap_colors,
       **text_colors,
@@ -233,6 +860,10 @@ def process(
     },
     'terminal': ansi_colors,
   }
+
+  if contrast_targets:
+    result = solve_contrast(result, contrast_targets)
+
   return result
 
 
@@ -240,9 +871,13 @@ def parse_args():
   parser = argparse.ArgumentParser(description="Tint Gear")
 
   parser.add_argument(
-    'image_path',
+    'image_paths',
     type=str,
-    help="Path to the image file.",
+    nargs='+',
+    metavar='image_path',
+    help=("Path to the image file, or with --preview-only to a json "
+          "result where - reads it from stdin; multiple image files are "
+          "processed as a batch in a process pool."),
   )
 
   parser.add_argument(
@@ -265,7 +900,64 @@ def parse_args():
     type=int,
     default=8,
     help="Number of colors to generate for intermediate steps",
-    choices=range(1, 17),
+    choices=range(MIN_NUM_COLORS, MAX_NUM_COLORS + 1),
+    metavar=f"[{MIN_NUM_COLORS}-{MAX_NUM_COLORS}]",
+  )
+
+  parser.add_argument(
+    '--refine',
+    action='store_true',
+    help="Refine the extracted colors with k-means in Oklab",
+  )
+
+  parser.add_argument(
+    '--workers',
+    type=int,
+    default=None,
+    help="Build color histograms of image tiles with this many threads",
+  )
+
+  parser.add_argument(
+    '--max-memory',
+    type=int,
+    default=None,
+    metavar='MEBIBYTES',
+    help=("Decode and sample the image in row strips, choosing the decode "
+          "scale, sample budget and strip height to keep the resident "
+          "memory of the process within this many MiB"),
+  )
+
+  parser.add_argument(
+    '--processes',
+    type=int,
+    default=None,
+    help="Process a batch of multiple images with this many processes",
+  )
+
+  parser.add_argument(
+    '--weighted',
+    action='store_true',
+    help="Weight average luminance and saturation by color population",
+  )
+
+  parser.add_argument(
+    '--contrast-target',
+    type=parse_contrast_target,
+    action='append',
+    metavar='FOREGROUND:BACKGROUND=RATIO',
+    help=("Adjust luminances with the least change so that the contrast "
+          "ratio of two colors is at least RATIO in every variant, keeping "
+          "whichever of the two starts out lighter; fails when the targets "
+          "can not all be reached; ansi stands for all non black terminal "
+          "colors"),
+  )
+
+  parser.add_argument(
+    '--cache',
+    type=str,
+    default=None,
+    metavar='CACHE_PATH',
+    help="Reuse derived themes of identical palettes from this SQLite file",
   )
 
   parser.add_argument(
@@ -280,90 +972,212 @@ def parse_args():
     help="High contrast mode",
   )
 
+  parser.add_argument(
+    '--statistics',
+    action='store_true',
+    help="Only compute image statistics and the light or dark decision",
+  )
+
   parser.add_argument(
     '--pretty',
     action='store_true',
     help="Pretty print all colors",
   )
 
+  parser.add_argument(
+    '--preview-only',
+    action='store_true',
+    help="Pretty print the colors of an existing json result",
+  )
+
   parser.add_argument(
     '--json',
     action='store_true',
     help="When pretty printing, print indented json instead",
   )
 
-  return parser.parse_args()
+  parser.add_argument(
+    '--emit',
+    nargs=2,
+    action='append',
+    metavar=('EMITTER', 'OUTPUT_PATH'),
+    help=("Render colors with an emitter and atomically write them to a file; "
+          f"emitter is one of {', '.join(EMITTERS)} or a template file path; "
+          "with --region, {region} in the path is replaced by the region index "
+          "and with multiple image paths {image} by the image index"),
+  )
 
+  parser.add_argument(
+    '--region',
+    nargs=4,
+    type=int,
+    action='append',
+    metavar=('X', 'Y', 'WIDTH', 'HEIGHT'),
+    help="Generate a separate theme for this crop rectangle of the image",
+  )
 
-def print_colors(deserialized_colors, pretty=False, in_json=False):
+  parser.add_argument(
+    '--frames',
+    choices=['timeline', 'merged'],
+    help=("Extract colors from the frames of an animated image, either as "
+          "a smoothed theme per frame or as one theme for all frames"),
+  )
+
+  parser.add_argument(
+    '--frame-step',
+    type=int,
+    default=1,
+    help="Use every n-th frame of an animated image",
+  )
+
+  parser.add_argument(
+    '--max-frames',
+    type=int,
+    default=None,
+    help="Maximum number of frames to use from an animated image",
+  )
+
+  parser.add_argument(
+    '--smoothing',
+    type=float,
+    default=FRAME_SMOOTHING,
+    help="Temporal smoothing factor of the frame timeline in [0, 1)",
+  )
+
+  parser.add_argument(
+    '--profile',
+    action='store_true',
+    help="Print stage timings and peak memory to stderr",
+  )
+
+  parser.add_argument(
+    '--backend',
+    choices=BACKEND_NAMES + [AUTO_BACKEND],
+    default=None,
+    help=("Compute backend for batched color kernels; defaults to the "
+          "TINT_GEAR_BACKEND environment variable or the fastest available"),
+  )
+
+  parsed_args = parser.parse_args()
+  parsed_args.image_path = parsed_args.image_paths[0]
+
+  if len(parsed_args.image_paths) > 1 and (
+      parsed_args.preview_only or parsed_args.statistics or parsed_args.region
+      or parsed_args.frames or parsed_args.workers is not None):
+    parser.error("multiple image paths can not be combined with "
+                 "--preview-only, --statistics, --region, --frames or "
+                 "--workers; use --processes instead of --workers")
+
+  if (len(parsed_args.image_paths) > 1 and parsed_args.emit
+      and any('{image}' not in output_path
+              for _, output_path in parsed_args.emit)):
+    parser.error("--emit output paths must contain {image} "
+                 "when multiple image paths are given")
+
+  if parsed_args.max_memory is not None and (
+      parsed_args.max_memory <= 0 or parsed_args.workers is not None
+      or len(parsed_args.image_paths) > 1 or parsed_args.region
+      or parsed_args.frames or parsed_args.statistics):
+    parser.error("--max-memory must be positive and can only be used to "
+                 "extract a single image without --workers, --region, "
+                 "--frames or --statistics")
+
+  if parsed_args.processes is not None and parsed_args.processes <= 0:
+    parser.error("--processes must be a positive integer")
+
+  if parsed_args.region and parsed_args.frames:
+    parser.error("--region and --frames can not be combined")
+
+  if (parsed_args.frames == 'timeline' and parsed_args.emit
+      and any('{frame}' not in output_path
+              for _, output_path in parsed_args.emit)):
+    parser.error("--emit output paths must contain {frame} "
+                 "with --frames timeline")
+
+  if (parsed_args.region and len(parsed_args.region) > 1 and parsed_args.emit
+      and any('{region}' not in output_path
+              for _, output_path in parsed_args.emit)):
+    parser.error("--emit output paths must contain {region} "
+                 "when multiple regions are given")
+
+  return parsed_args
+
+
+def print_statistics(statistics, pretty=False, in_json=False):
   if pretty and not in_json:
-    print(f"Average luminance = {deserialized_colors['average_luminance']}")
-    print(f"Average saturation = {deserialized_colors['average_saturation']}")
-    print(f"Is light theme = {deserialized_colors['is_light_theme']}\n")
-
-    print("Colors:")
-    for index, color_tuple in enumerate(deserialized_colors['colors']):
-      print(f"  {index}.: {srgb_to_hex(*color_tuple, pretty=True)}")
-
-    print("\nBootstrap:")
-    for key, color_object in deserialized_colors['bootstrap'].items():
-      print(f"  {key.capitalize()}:")
-      for subkey, value in color_object.items():
-        if isinstance(value, tuple):
-          print(f"    {subkey}: {srgb_to_hex(*value, pretty=True)}")
-        elif isinstance(value, dict):
-          print(f"    {subkey}:")
-          for semantic_name, semantic_color in value.items():
-            print(
-              f"      {semantic_name}: {srgb_to_hex(*semantic_color, pretty=True)}"
-            )
-        else:
-          print(f"    {subkey}: {value}")
-
-    print("\nTerminal:")
-    for key, color_object in deserialized_colors['terminal'].items():
-      print(f"  {key}:")
-      for subkey, value in color_object.items():
-        if isinstance(value, tuple):
-          print(f"    {subkey}: {srgb_to_hex(*value, pretty=True)}")
-        elif isinstance(value, dict):
-          print(f"    {subkey}:")
-          for semantic_name, semantic_color in value.items():
-            print(
-              f"      {semantic_name}: {srgb_to_hex(*semantic_color, pretty=True)}"
-            )
-        else:
-          print(f"    {subkey}: {value}")
+    print(f"Average luminance = {statistics['average_luminance']}")
+    print(f"Average saturation = {statistics['average_saturation']}")
+    print(f"Is light theme = {statistics['is_light_theme']}")
   else:
     json.dump(
       {
-        'isLightTheme': deserialized_colors['is_light_theme'],
-        'colors': [srgb_to_hex(*x) for x in deserialized_colors['colors']],
-        'bootstrap': {
-          key: {
-            subkey: (srgb_to_hex(*value) if isinstance(value, tuple) else {
-              k: srgb_to_hex(*v)
-              for k, v in value.items()
-            } if isinstance(value, dict) else value)
-            for subkey, value in color_object.items()
-          }
-          for key, color_object in deserialized_colors['bootstrap'].items()
-        },
-        'terminal': {
-          key: {
-            subkey: (srgb_to_hex(*value) if isinstance(value, tuple) else {
-              k: srgb_to_hex(*v)
-              for k, v in value.items()
-            } if isinstance(value, dict) else value)
-            for subkey, value in color_object.items()
-          }
-          for key, color_object in deserialized_colors['terminal'].items()
-        }
+        'averageLuminance': statistics['average_luminance'],
+        'averageSaturation': statistics['average_saturation'],
+        'isLightTheme': statistics['is_light_theme'],
+        'luminanceHistogram': statistics['luminance_histogram'],
       },
       sys.stdout,
       indent=(2 if pretty else None),
     )
 
 
+def print_colors(deserialized_colors, pretty=False, in_json=False):
+  if pretty and not in_json:
+    sys.stdout.write(render_preview(deserialized_colors))
+  else:
+    json.dump(
+      serialize_colors(deserialized_colors),
+      sys.stdout,
+      indent=(2 if pretty else None),
+    )
+
+
+def print_colors_list(colors_list, labels, pretty=False, in_json=False):
+  if pretty and not in_json:
+    sys.stdout.write(
+      render_previews(
+        [colors for colors in colors_list if colors is not None],
+        [
+          label
+          for colors, label in zip(colors_list, labels) if colors is not None
+        ],
+      ))
+  else:
+    json.dump(
+      [
+        serialize_colors(deserialized_colors)
+        if deserialized_colors is not None else None
+        for deserialized_colors in colors_list
+      ],
+      sys.stdout,
+      indent=(2 if pretty else None),
+    )
+
+
+def load_colors(result_path: str):
+  if result_path == '-':
+    serialized_colors = json.load(sys.stdin)
+  else:
+    with open(result_path, 'r', encoding='utf-8') as result_file:
+      serialized_colors = json.load(result_file)
+
+  if isinstance(serialized_colors, list):
+    return [
+      deserialize_colors(colors) if colors is not None else None
+      for colors in serialized_colors
+    ]
+
+  return deserialize_colors(serialized_colors)
+
+
+def serialize_colors(deserialized_colors):
+  serialized_colors = serialize_packed_theme(pack_theme(deserialized_colors))
+
+  if 'frame' in deserialized_colors:
+    return {'frame': deserialized_colors['frame'], **serialized_colors}
+
+  return serialized_colors
+
+
 if __name__ == '__main__':
   main()
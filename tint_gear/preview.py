@@ -0,0 +1,97 @@
+import io
+from typing import Dict, List
+
+import numpy as np
+
+from tint_gear.theme import (
+  THEME_SECTIONS,
+  format_ansi_batch,
+  nest_roles,
+  pack_theme,
+)
+
+SWATCH_WIDTH = 2
+CELL_WIDTH = SWATCH_WIDTH + len(" #rrggbb")
+COLUMN_GAP = 2
+
+
+def write_section(
+  buffer: io.StringIO,
+  title: str,
+  color_objects: Dict[str, Dict[str, int]],
+  swatches: Dict[int, str],
+  capitalize: bool = False,
+):
+  labels = {
+    name: name[:1].upper() + name[1:] if capitalize else name
+    for name in color_objects
+  }
+  label_width = max(len(label) for label in labels.values()) + COLUMN_GAP
+  variants = list(next(iter(color_objects.values())))
+  column_widths = [
+    max(len(variant), CELL_WIDTH) + COLUMN_GAP for variant in variants
+  ]
+
+  buffer.write(f"{title}:\n")
+  buffer.write(" " * (2 + label_width))
+  buffer.write("".join(
+    variant.ljust(width)
+    for variant, width in zip(variants, column_widths)).rstrip())
+  buffer.write("\n")
+
+  padding = [" " * (width - CELL_WIDTH) for width in column_widths[:-1]] + [""]
+  for name, color_object in color_objects.items():
+    buffer.write(f"  {labels[name].ljust(label_width)}")
+    for variant, pad in zip(variants, padding):
+      buffer.write(swatches[color_object[variant]])
+      buffer.write(pad)
+    buffer.write("\n")
+
+
+def write_preview(
+  buffer: io.StringIO,
+  deserialized_colors: dict,
+  swatches: Dict[int, str],
+):
+  packed_theme = pack_theme(deserialized_colors)
+  values = np.unique(np.concatenate([packed_theme.palette,
+                                     packed_theme.colors]))
+  missing = values[[value not in swatches for value in values.tolist()]]
+  swatches.update(
+    zip(missing.tolist(), format_ansi_batch(missing, SWATCH_WIDTH)))
+
+  buffer.write(
+    f"Average luminance = {deserialized_colors['average_luminance']}\n"
+    f"Average saturation = {deserialized_colors['average_saturation']}\n"
+    f"Is light theme = {deserialized_colors['is_light_theme']}\n\n")
+
+  buffer.write("Colors:\n")
+  for index, value in enumerate(packed_theme.palette.tolist()):
+    buffer.write(f"  {index}.: {swatches[value]}\n")
+
+  sections = nest_roles(packed_theme.roles, packed_theme.colors.tolist())
+  for section in THEME_SECTIONS:
+    buffer.write("\n")
+    write_section(
+      buffer,
+      section.capitalize(),
+      sections[section],
+      swatches,
+      capitalize=(section == 'bootstrap'),
+    )
+
+
+def render_preview(deserialized_colors: dict) -> str:
+  buffer = io.StringIO()
+  write_preview(buffer, deserialized_colors, {})
+  return buffer.getvalue()
+
+
+def render_previews(colors_list: List[dict], labels: List[str]) -> str:
+  buffer = io.StringIO()
+  swatches: Dict[int, str] = {}
+  for label, deserialized_colors in zip(labels, colors_list):
+    buffer.write(f"{label}:\n\n")
+    write_preview(buffer, deserialized_colors, swatches)
+    buffer.write("\n")
+  return buffer.getvalue()
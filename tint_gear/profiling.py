@@ -0,0 +1,122 @@
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+try:
+  import resource
+except ImportError:
+  resource = None
+
+MEGABYTE = 1024 * 1024
+
+STATUS_PATH = '/proc/self/status'
+STATM_PATH = '/proc/self/statm'
+CLEAR_REFS_PATH = '/proc/self/clear_refs'
+RESET_PEAK_MEMORY = '5'
+
+
+def get_resident_memory() -> Optional[int]:
+  try:
+    with open(STATM_PATH, 'r', encoding='ascii') as statm_file:
+      resident_pages = int(statm_file.read().split()[1])
+  except (OSError, ValueError, IndexError):
+    return get_peak_memory()
+
+  return resident_pages * os.sysconf('SC_PAGE_SIZE')
+
+
+def reset_peak_memory() -> bool:
+  try:
+    with open(CLEAR_REFS_PATH, 'w', encoding='ascii') as clear_refs_file:
+      clear_refs_file.write(RESET_PEAK_MEMORY)
+  except OSError:
+    return False
+
+  return True
+
+
+def get_peak_memory() -> Optional[int]:
+  try:
+    with open(STATUS_PATH, 'r', encoding='ascii') as status_file:
+      for line in status_file:
+        if line.startswith('VmHWM:'):
+          return int(line.split()[1]) * 1024
+  except (OSError, ValueError, IndexError):
+    pass
+
+  if resource is None:
+    return None
+
+  peak_memory = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+  return peak_memory if sys.platform == 'darwin' else peak_memory * 1024
+
+
+def get_max_memory(*values: Optional[int]) -> Optional[int]:
+  present = [value for value in values if value is not None]
+  return max(present) if present else None
+
+
+class Profiler:
+
+  def __init__(self):
+    self.timings: Dict[str, float] = {}
+    self.peak_memory: Dict[str, Optional[int]] = {}
+    self.total_peak_memory = get_peak_memory()
+    self.start = time.perf_counter()
+
+  def record(self, name: str, seconds: float, peak_memory: Optional[int]):
+    self.timings[name] = self.timings.get(name, 0.0) + seconds
+    self.peak_memory[name] = get_max_memory(self.peak_memory.get(name),
+                                            peak_memory)
+    self.total_peak_memory = get_max_memory(self.total_peak_memory, peak_memory)
+
+  def render(self) -> str:
+    rows = [(name, seconds, self.peak_memory[name])
+            for name, seconds in self.timings.items()]
+    rows.append(('total', time.perf_counter() - self.start,
+                 get_max_memory(self.total_peak_memory, get_peak_memory())))
+
+    lines = [f"{'stage':<12} {'time ms':>10} {'peak MiB':>10}"]
+    for name, seconds, peak_memory in rows:
+      memory = ('n/a'
+                if peak_memory is None else f"{peak_memory / MEGABYTE:.1f}")
+      lines.append(f"{name:<12} {seconds * 1000:>10.2f} {memory:>10}")
+    return '\n'.join(lines) + '\n'
+
+
+current_profiler: Optional[Profiler] = None
+
+
+@contextmanager
+def profile_stage(name: str) -> Iterator[None]:
+  profiler = current_profiler
+  if profiler is None:
+    yield
+    return
+
+  profiler.total_peak_memory = get_max_memory(profiler.total_peak_memory,
+                                              get_peak_memory())
+  reset_peak_memory()
+  start = time.perf_counter()
+  try:
+    yield
+  finally:
+    profiler.record(name, time.perf_counter() - start, get_peak_memory())
+
+
+@contextmanager
+def profiling(enabled: bool = True) -> Iterator[Optional[Profiler]]:
+  global current_profiler
+  if not enabled:
+    yield None
+    return
+
+  profiler = Profiler()
+  current_profiler = profiler
+  try:
+    yield profiler
+  finally:
+    current_profiler = None
+    sys.stderr.write(profiler.render())
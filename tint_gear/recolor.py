@@ -0,0 +1,377 @@
+import argparse
+import os
+import struct
+import zlib
+from typing import Iterator
+
+import numpy as np
+from PIL import Image
+
+from tint_gear.batch import (
+  gamut_map_oklab_batch,
+  srgb8_to_oklab_batch,
+  srgb_to_oklab_batch,
+  unpack_colors_batch,
+)
+from tint_gear.emit import VARIANT_NAMES, open_atomic
+from tint_gear.extract import assert_image_path, assign_clusters
+from tint_gear.result import (
+  add_theme_arguments,
+  get_theme_options,
+  load_result,
+)
+from tint_gear.theme import THEME_SECTIONS, pack_theme
+
+RECOLOR_MODES = ['nearest', 'shift']
+PALETTE_SOURCES = THEME_SECTIONS + ['colors']
+GRID_BITS = 6
+GRID_CHUNK_SIZE = 65536
+STRIP_ROWS = 256
+DITHER_STRENGTH = 32.0
+DEFAULT_STRENGTH = 1.0
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_COLOR_TYPES = {'RGB': 2, 'RGBA': 6}
+PNG_FILTER_NONE = 0
+PNG_FILTER_SUB = 1
+PNG_FILTER_UP = 2
+
+BAYER_MATRIX = np.array([
+  [0, 32, 8, 40, 2, 34, 10, 42],
+  [48, 16, 56, 24, 50, 18, 58, 26],
+  [12, 44, 4, 36, 14, 46, 6, 38],
+  [60, 28, 52, 20, 62, 30, 54, 22],
+  [3, 35, 11, 43, 1, 33, 9, 41],
+  [51, 19, 59, 27, 49, 17, 57, 25],
+  [15, 47, 7, 39, 13, 45, 5, 37],
+  [63, 31, 55, 23, 61, 29, 53, 21],
+]) / 64.0 - 0.5
+
+
+def assert_recolor_options(mode, strength, dither):
+  if mode not in RECOLOR_MODES:
+    raise ValueError(f"Unknown recolor mode {mode}! "
+                     f"Expected one of {', '.join(RECOLOR_MODES)}.")
+  if not 0.0 <= strength <= 1.0:
+    raise ValueError("strength must be between 0 and 1.")
+  if dither < 0.0:
+    raise ValueError("dither must not be negative.")
+
+
+def main():
+  parsed_args = parse_args()
+
+  recolor_image(
+    parsed_args.image_path,
+    parsed_args.output_path,
+    create_recolor_palette(
+      load_result(parsed_args.theme, **get_theme_options(parsed_args)),
+      source=parsed_args.palette,
+      variant=parsed_args.variant,
+    ),
+    mode=parsed_args.mode,
+    strength=parsed_args.strength,
+    dither=parsed_args.dither,
+  )
+
+
+def create_recolor_palette(
+  deserialized_colors: dict,
+  source: str = 'terminal',
+  variant: str = 'normal',
+) -> np.ndarray:
+  if source not in PALETTE_SOURCES:
+    raise ValueError(f"Unknown palette source {source}! "
+                     f"Expected one of {', '.join(PALETTE_SOURCES)}.")
+
+  packed_theme = pack_theme(deserialized_colors)
+  if source == 'colors':
+    packed = packed_theme.palette
+  else:
+    selected = [
+      index
+      for index, (section, _, role_variant) in enumerate(packed_theme.roles)
+      if section == source and role_variant == variant
+    ]
+    packed = packed_theme.colors[selected]
+
+  if len(packed) == 0:
+    raise ValueError("The theme has no colors to recolor with.")
+
+  return unpack_colors_batch(np.unique(packed))
+
+
+def create_palette_grid(
+  palette: np.ndarray,
+  grid_bits: int = GRID_BITS,
+) -> np.ndarray:
+  size = 1 << grid_bits
+  step = 256 >> grid_bits
+  levels = (np.arange(size) * step + (step - 1) / 2) / 255.0
+  red, green, blue = np.meshgrid(levels, levels, levels, indexing='ij')
+  cells = np.stack([red.ravel(), green.ravel(), blue.ravel()], axis=-1)
+
+  centers = srgb_to_oklab_batch(palette)
+  grid = np.empty(len(cells), dtype=np.intp)
+  for start in range(0, len(cells), GRID_CHUNK_SIZE):
+    chunk = cells[start:start + GRID_CHUNK_SIZE]
+    grid[start:start + GRID_CHUNK_SIZE] = assign_clusters(
+      srgb_to_oklab_batch(chunk),
+      centers,
+    )
+
+  return grid.reshape(size, size, size)
+
+
+def recolor_pixels(
+  rgb: np.ndarray,
+  palette: np.ndarray,
+  grid: np.ndarray,
+  mode: str = 'nearest',
+  strength: float = DEFAULT_STRENGTH,
+  dither: float = 0.0,
+  top: int = 0,
+) -> np.ndarray:
+  height, width, _ = rgb.shape
+  shift = 8 - int(np.log2(grid.shape[0]))
+
+  lookup = rgb.astype(np.float64)
+  if dither > 0.0:
+    rows = np.arange(top, top + height) % BAYER_MATRIX.shape[0]
+    columns = np.arange(width) % BAYER_MATRIX.shape[1]
+    thresholds = BAYER_MATRIX[rows[:, np.newaxis], columns[np.newaxis, :]]
+    lookup += dither * thresholds[..., np.newaxis]
+  lookup = np.clip(np.rint(lookup), 0, 255).astype(np.intp) >> shift
+
+  indices = grid[lookup[..., 0], lookup[..., 1], lookup[..., 2]]
+
+  if mode == 'nearest':
+    return np.rint(palette[indices] * 255).astype(np.uint8)
+
+  oklab = srgb8_to_oklab_batch(rgb)
+  target = srgb_to_oklab_batch(palette)[indices]
+  oklab[..., 1:] += strength * (target[..., 1:] - oklab[..., 1:])
+  return np.rint(gamut_map_oklab_batch(oklab) * 255).astype(np.uint8)
+
+
+def recolor_image(
+  image_path: str,
+  output_path: str,
+  palette: np.ndarray,
+  mode: str = 'nearest',
+  strength: float = DEFAULT_STRENGTH,
+  dither: float = 0.0,
+  strip_rows: int = STRIP_ROWS,
+):
+  assert_image_path(image_path)
+  assert_recolor_options(mode, strength, dither)
+
+  grid = create_palette_grid(palette)
+  extension = os.path.splitext(output_path)[1].lower()
+  output_format = Image.registered_extensions().get(extension)
+  if output_format is None:
+    raise ValueError(f"Unknown image format of {output_path}!")
+
+  with Image.open(image_path) as image:
+    width, height = image.size
+    output_mode = 'RGBA' if has_alpha(image) else 'RGB'
+    if output_path.lower().endswith(('.jpg', '.jpeg')):
+      output_mode = 'RGB'
+    strips = recolor_strips(
+      image,
+      palette,
+      grid,
+      output_mode,
+      mode=mode,
+      strength=strength,
+      dither=dither,
+      strip_rows=strip_rows,
+    )
+
+    if output_format == 'PNG':
+      write_png_strips(output_path, width, height, output_mode, strips)
+      return
+
+    output = Image.new(output_mode, (width, height))
+    top = 0
+    for strip in strips:
+      output.paste(Image.fromarray(strip, output_mode), (0, top))
+      top += len(strip)
+
+  with open_atomic(output_path) as output_file:
+    output.save(output_file, format=output_format)
+
+
+def has_alpha(image: Image.Image) -> bool:
+  return 'A' in image.getbands() or 'transparency' in image.info
+
+
+def recolor_strips(
+  image: Image.Image,
+  palette: np.ndarray,
+  grid: np.ndarray,
+  output_mode: str,
+  mode: str = 'nearest',
+  strength: float = DEFAULT_STRENGTH,
+  dither: float = 0.0,
+  strip_rows: int = STRIP_ROWS,
+) -> Iterator[np.ndarray]:
+  width, height = image.size
+  for top in range(0, height, strip_rows):
+    bottom = min(top + strip_rows, height)
+    strip = np.asarray(image.crop((0, top, width, bottom)).convert('RGBA'))
+    recolored = np.empty((bottom - top, width, len(output_mode)),
+                         dtype=np.uint8)
+    recolored[..., :3] = recolor_pixels(
+      strip[..., :3],
+      palette,
+      grid,
+      mode=mode,
+      strength=strength,
+      dither=dither,
+      top=top,
+    )
+    if output_mode == 'RGBA':
+      recolored[..., 3] = strip[..., 3]
+    yield recolored
+
+
+def write_png_chunk(output_file, chunk_type: bytes, data: bytes):
+  output_file.write(struct.pack('>I', len(data)) + chunk_type + data)
+  output_file.write(struct.pack('>I', zlib.crc32(chunk_type + data)))
+
+
+def filter_png_rows(
+  rows: np.ndarray,
+  previous_row: np.ndarray,
+  pixel_size: int,
+) -> np.ndarray:
+  left = np.zeros_like(rows)
+  left[:, pixel_size:] = rows[:, :-pixel_size]
+  candidates = np.stack([
+    rows,
+    rows - left,
+    rows - np.vstack([previous_row, rows[:-1]]),
+  ])
+  costs = [
+    np.abs(candidate.view(np.int8).astype(np.int16)).sum(axis=1, dtype=np.int64)
+    for candidate in candidates
+  ]
+  choices = np.argmin(costs, axis=0)
+
+  filtered = np.empty((len(rows), rows.shape[1] + 1), dtype=np.uint8)
+  filtered[:, 0] = np.array([PNG_FILTER_NONE, PNG_FILTER_SUB,
+                             PNG_FILTER_UP])[choices]
+  filtered[:, 1:] = candidates[choices, np.arange(len(rows))]
+  return filtered
+
+
+def write_png_strips(
+  output_path: str,
+  width: int,
+  height: int,
+  output_mode: str,
+  strips: Iterator[np.ndarray],
+):
+  if output_mode not in PNG_COLOR_TYPES:
+    raise ValueError(f"Unsupported PNG mode {output_mode}!")
+
+  compressor = zlib.compressobj()
+  previous_row = np.zeros(width * len(output_mode), dtype=np.uint8)
+  with open_atomic(output_path) as output_file:
+    output_file.write(PNG_SIGNATURE)
+    write_png_chunk(
+      output_file,
+      b'IHDR',
+      struct.pack('>IIBBBBB', width, height, 8, PNG_COLOR_TYPES[output_mode], 0,
+                  0, 0),
+    )
+
+    for strip in strips:
+      rows = strip.reshape(len(strip), -1)
+      filtered = filter_png_rows(rows, previous_row, len(output_mode))
+      previous_row = rows[-1]
+      data = compressor.compress(filtered.tobytes())
+      if data:
+        write_png_chunk(output_file, b'IDAT', data)
+
+    write_png_chunk(output_file, b'IDAT', compressor.flush())
+    write_png_chunk(output_file, b'IEND', b'')
+
+
+def parse_args():
+  parser = argparse.ArgumentParser(description="Tint Gear recolor")
+
+  parser.add_argument(
+    'image_path',
+    type=str,
+    help="Path to the image file to recolor.",
+  )
+
+  parser.add_argument(
+    'output_path',
+    type=str,
+    help=("Path to write the recolored image to; PNG files are written "
+          "strip by strip, other formats are assembled in memory."),
+  )
+
+  parser.add_argument(
+    '--theme',
+    type=str,
+    required=True,
+    help="Path to an image or tint-gear json result to take colors from",
+  )
+
+  add_theme_arguments(parser)
+
+  parser.add_argument(
+    '--palette',
+    choices=PALETTE_SOURCES,
+    default='terminal',
+    help="Theme colors to recolor with",
+  )
+
+  parser.add_argument(
+    '--variant',
+    choices=VARIANT_NAMES,
+    default='normal',
+    help="Theme color variant to recolor with",
+  )
+
+  parser.add_argument(
+    '--mode',
+    choices=RECOLOR_MODES,
+    default='nearest',
+    help=("Replace pixels with the nearest theme color or shift their hue "
+          "and chroma towards it in Oklab"),
+  )
+
+  parser.add_argument(
+    '--strength',
+    type=float,
+    default=DEFAULT_STRENGTH,
+    help="How far to shift hue and chroma in shift mode, from 0 to 1",
+  )
+
+  parser.add_argument(
+    '--dither',
+    nargs='?',
+    type=float,
+    default=0.0,
+    const=DITHER_STRENGTH,
+    help="Ordered dithering amplitude in 8-bit steps",
+  )
+
+  parsed_args = parser.parse_args()
+
+  if not 0.0 <= parsed_args.strength <= 1.0:
+    parser.error("--strength must be between 0 and 1")
+
+  if parsed_args.dither < 0.0:
+    parser.error("--dither must not be negative")
+
+  return parsed_args
+
+
+if __name__ == '__main__':
+  main()
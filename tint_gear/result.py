@@ -0,0 +1,69 @@
+import argparse
+import json
+
+from tint_gear.extract import MAX_NUM_COLORS, MIN_NUM_COLORS
+from tint_gear.main import process
+from tint_gear.theme import deserialize_colors
+
+
+def load_result(path: str, **theme_options) -> dict:
+  if path.endswith('.json'):
+    with open(path, 'r', encoding='utf-8') as result_file:
+      return deserialize_colors(json.load(result_file))
+
+  return process(path, **theme_options)
+
+
+def add_theme_arguments(parser: argparse.ArgumentParser):
+  parser.add_argument(
+    '--light_theme_threshold',
+    type=float,
+    default=0.25,
+    help="Light theme lightness threshold for image inputs",
+    choices=[round(val * 0.01, 2) for val in range(0, 101)],
+  )
+
+  parser.add_argument(
+    '--num_colors',
+    type=int,
+    default=8,
+    help="Number of colors to extract from image inputs",
+    choices=range(MIN_NUM_COLORS, MAX_NUM_COLORS + 1),
+    metavar=f"[{MIN_NUM_COLORS}-{MAX_NUM_COLORS}]",
+  )
+
+  parser.add_argument(
+    '--weighted',
+    action='store_true',
+    help="Weight average luminance and saturation by color population",
+  )
+
+  parser.add_argument(
+    '--alternate',
+    action='store_true',
+    help="Alternate color mode",
+  )
+
+  parser.add_argument(
+    '-k',
+    type=float,
+    default=4.0,
+    help="Contrast gap slope",
+  )
+
+  parser.add_argument(
+    '--high-contrast',
+    action='store_true',
+    help="High contrast mode",
+  )
+
+
+def get_theme_options(parsed_args) -> dict:
+  return {
+    'light_theme_threshold': parsed_args.light_theme_threshold,
+    'alternate': parsed_args.alternate,
+    'k': parsed_args.k,
+    'num_colors': parsed_args.num_colors,
+    'high_contrast': parsed_args.high_contrast,
+    'weighted': parsed_args.weighted,
+  }
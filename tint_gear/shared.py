@@ -0,0 +1,182 @@
+from multiprocessing import shared_memory
+from typing import List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from PIL import Image
+
+from tint_gear.extract import (
+  HISTOGRAM_SIZE,
+  SAMPLE_QUALITY,
+  assert_image_path,
+  create_color_histogram,
+  create_tiles,
+  sample_rows,
+)
+from tint_gear.profiling import profile_stage
+from tint_gear.theme import PackedTheme, pack_theme, unpack_theme
+
+
+class SharedArray(NamedTuple):
+  name: str
+  shape: Tuple[int, ...]
+  dtype: str
+
+
+class SharedTheme(NamedTuple):
+  average_luminance: float
+  average_saturation: float
+  is_light_theme: bool
+  roles: List[Tuple[str, str, str]]
+  colors: SharedArray
+  palette: SharedArray
+  populations: Optional[SharedArray]
+
+
+def create_shared_array(
+  shape: Tuple[int, ...],
+  dtype: str,
+) -> Tuple[shared_memory.SharedMemory, np.ndarray, SharedArray]:
+  size = max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1)
+  memory = shared_memory.SharedMemory(create=True, size=size)
+  array = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+  return memory, array, SharedArray(memory.name, tuple(shape), dtype)
+
+
+def share_array(array: np.ndarray) -> SharedArray:
+  memory, shared, handle = create_shared_array(array.shape, array.dtype.str)
+  shared[...] = array
+  del shared
+  memory.close()
+  return handle
+
+
+def attach_shared_array(
+  handle: SharedArray, ) -> Tuple[shared_memory.SharedMemory, np.ndarray]:
+  memory = shared_memory.SharedMemory(name=handle.name)
+  return memory, np.ndarray(handle.shape, dtype=handle.dtype, buffer=memory.buf)
+
+
+def read_shared_array(handle: SharedArray) -> np.ndarray:
+  memory, shared = attach_shared_array(handle)
+  array = shared.copy()
+  del shared
+  memory.close()
+  return array
+
+
+def unlink_shared_array(handle: Optional[SharedArray]):
+  if handle is None:
+    return
+
+  try:
+    memory = shared_memory.SharedMemory(name=handle.name)
+  except FileNotFoundError:
+    return
+  memory.close()
+  memory.unlink()
+
+
+def decode_shared_pixels(image_path: str) -> SharedArray:
+  assert_image_path(image_path)
+
+  with profile_stage('decode'), Image.open(image_path) as image:
+    width, height = image.size
+    memory, rgba, handle = create_shared_array(
+      (height, width, 4),
+      np.dtype(np.uint8).str,
+    )
+    try:
+      for start_row, end_row in create_tiles(height):
+        rgba[start_row:end_row] = np.asarray(
+          image.crop((0, start_row, width, end_row)).convert('RGBA'))
+    except BaseException:
+      memory.unlink()
+      raise
+    finally:
+      del rgba
+      memory.close()
+
+  return handle
+
+
+def create_shared_histograms(tile_count: int) -> SharedArray:
+  memory, histograms, handle = create_shared_array(
+    (tile_count, HISTOGRAM_SIZE),
+    np.dtype(np.int64).str,
+  )
+  del histograms
+  memory.close()
+  return handle
+
+
+def fill_shared_histogram(
+  pixels: SharedArray,
+  histograms: SharedArray,
+  index: int,
+  tile: Tuple[int, int],
+  quality: int = SAMPLE_QUALITY,
+):
+  pixel_memory, rgba = attach_shared_array(pixels)
+  histogram_memory, histogram_rows = attach_shared_array(histograms)
+  try:
+    start_row, end_row = tile
+    histogram_rows[index] = create_color_histogram(
+      sample_rows(rgba, start_row, end_row, quality))
+  finally:
+    del rgba, histogram_rows
+    pixel_memory.close()
+    histogram_memory.close()
+
+
+def share_theme(deserialized_colors: dict) -> SharedTheme:
+  packed_theme = pack_theme(deserialized_colors)
+  populations = deserialized_colors['populations']
+
+  handles: List[SharedArray] = []
+  try:
+    for array in [packed_theme.colors, packed_theme.palette]:
+      handles.append(share_array(array))
+    if populations is not None:
+      handles.append(share_array(np.asarray(populations, dtype=np.int64)))
+  except Exception:
+    for handle in handles:
+      unlink_shared_array(handle)
+    raise
+
+  return SharedTheme(
+    average_luminance=deserialized_colors['average_luminance'],
+    average_saturation=deserialized_colors['average_saturation'],
+    is_light_theme=deserialized_colors['is_light_theme'],
+    roles=packed_theme.roles,
+    colors=handles[0],
+    palette=handles[1],
+    populations=handles[2] if populations is not None else None,
+  )
+
+
+def load_shared_theme(shared_theme: SharedTheme) -> dict:
+  deserialized_colors = unpack_theme(
+    PackedTheme(
+      is_light_theme=shared_theme.is_light_theme,
+      roles=shared_theme.roles,
+      colors=read_shared_array(shared_theme.colors),
+      palette=read_shared_array(shared_theme.palette),
+    ))
+  deserialized_colors['average_luminance'] = shared_theme.average_luminance
+  deserialized_colors['average_saturation'] = shared_theme.average_saturation
+  if shared_theme.populations is not None:
+    deserialized_colors['populations'] = read_shared_array(
+      shared_theme.populations).tolist()
+
+  return deserialized_colors
+
+
+def unlink_shared_theme(shared_theme: Optional[SharedTheme]):
+  if shared_theme is None:
+    return
+
+  for handle in [
+      shared_theme.colors, shared_theme.palette, shared_theme.populations
+  ]:
+    unlink_shared_array(handle)
@@ -0,0 +1,123 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from tint_gear import aio
+from tint_gear.aio import ThemeProcessor, process_async
+from tint_gear.main import process
+
+
+def test_process_async(tmp_path, create_image):
+  image_path = create_image(tmp_path / 'image.png')
+
+  result = asyncio.run(process_async(image_path, num_colors=6))
+
+  assert result == process(image_path, num_colors=6)
+
+
+def test_process_async_coalesces_requests(tmp_path, create_image):
+  image_path = create_image(tmp_path / 'image.png')
+
+  async def run():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+      processor = ThemeProcessor(executor=executor, max_concurrency=1)
+      first, second, other = await asyncio.gather(
+        processor.process(image_path),
+        processor.process(image_path),
+        processor.process(image_path, num_colors=4),
+      )
+      assert not processor.in_flight
+      assert not processor.waiters
+      return first, second, other
+
+  first, second, other = asyncio.run(run())
+
+  assert first == second
+  assert first is not second
+  assert first['colors'] is not second['colors']
+  assert other != first
+
+
+def test_process_async_cancellation(tmp_path, create_image):
+  image_path = create_image(tmp_path / 'image.png')
+
+  async def run():
+    processor = ThemeProcessor()
+    request = asyncio.ensure_future(processor.process(image_path))
+    while not processor.in_flight:
+      await asyncio.sleep(0.001)
+    task, = processor.in_flight.values()
+    request.cancel()
+    await asyncio.gather(request, return_exceptions=True)
+    await asyncio.sleep(0)
+    return processor, task
+
+  processor, task = asyncio.run(run())
+
+  assert task.cancelled()
+  assert not processor.in_flight
+  assert not processor.waiters
+
+
+def test_process_async_cancellation_holds_slot(tmp_path, monkeypatch,
+                                               create_image):
+  image_path = create_image(tmp_path / 'image.png')
+  started = threading.Event()
+  release = threading.Event()
+
+  def process_image_data(data, **options):
+    started.set()
+    release.wait()
+    return {}
+
+  monkeypatch.setattr(aio, 'process_image_data', process_image_data)
+
+  async def run():
+    with ThreadPoolExecutor(max_workers=1) as executor:
+      processor = ThemeProcessor(executor=executor, max_concurrency=1)
+      request = asyncio.ensure_future(processor.process(image_path))
+      await asyncio.to_thread(started.wait)
+      task, = processor.in_flight.values()
+      request.cancel()
+      await asyncio.sleep(0.01)
+      locked = processor.semaphore.locked()
+      release.set()
+      await asyncio.gather(task, return_exceptions=True)
+      return locked, processor.semaphore.locked(), task
+
+  locked_while_running, locked_after, task = asyncio.run(run())
+
+  assert locked_while_running
+  assert not locked_after
+  assert task.cancelled()
+
+
+def test_process_async_after_cancellation(tmp_path, monkeypatch, create_image):
+  image_path = create_image(tmp_path / 'image.png')
+  started = threading.Event()
+  release = threading.Event()
+
+  def process_image_data(data, **options):
+    started.set()
+    release.wait()
+    return {'calls': 1}
+
+  monkeypatch.setattr(aio, 'process_image_data', process_image_data)
+
+  async def run():
+    with ThreadPoolExecutor(max_workers=2) as executor:
+      processor = ThemeProcessor(executor=executor, max_concurrency=2)
+      cancelled = asyncio.ensure_future(processor.process(image_path))
+      await asyncio.to_thread(started.wait)
+      cancelled.cancel()
+      await asyncio.sleep(0)
+      request = asyncio.ensure_future(processor.process(image_path))
+      await asyncio.sleep(0.01)
+      release.set()
+      return await request, await asyncio.gather(cancelled,
+                                                 return_exceptions=True)
+
+  result, (error, ) = asyncio.run(run())
+
+  assert result == {'calls': 1}
+  assert isinstance(error, asyncio.CancelledError)
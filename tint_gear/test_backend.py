@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from tint_gear.backend import (
+  BACKEND_ENVIRONMENT_VARIABLE,
+  create_numba_backend,
+  create_numpy_backend,
+  create_python_backend,
+  select_backend,
+)
+
+
+def create_grid(levels=13):
+  values = np.linspace(0.0, 1.0, levels)
+  return np.stack(np.meshgrid(values, values, values, indexing='ij'),
+                  axis=-1).reshape(-1, 3)
+
+
+def assert_backends_match(backend, numpy_backend):
+  generator = np.random.default_rng(0)
+  colors = create_grid()
+  targets = generator.permutation(np.linspace(0.0, 1.0, len(colors)))
+  oklab = numpy_backend.srgb_to_oklab(colors)
+
+  for name, args in [
+    ('srgb_to_oklab', (colors, )),
+    ('oklab_to_srgb', (oklab, )),
+    ('gamut_map_oklab', (oklab * [1.0, 3.0, 3.0], )),
+    ('get_luminance', (colors, )),
+    ('get_saturation', (colors, )),
+    ('set_luminance', (colors, targets)),
+    ('set_luminance', (colors, np.zeros(len(colors)))),
+    ('set_luminance', (colors, np.ones(len(colors)))),
+    ('set_saturation', (colors, targets * 0.4)),
+    ('step_luminance', (colors, targets)),
+    ('step_luminance', (colors[:1], 0.5, 0.05)),
+    ('adjust_contrast', (colors, 0.6, True, True, False, 4.0)),
+    ('adjust_contrast', (colors, 0.2, False, False, True, 4.0)),
+  ]:
+    expected = getattr(numpy_backend, name)(*args)
+    actual = getattr(backend, name)(*args)
+    assert actual.shape == expected.shape, name
+    assert np.allclose(actual, expected, rtol=0.0, atol=1e-6), name
+
+  chromatic = numpy_backend.get_saturation(colors) > 1e-4
+  hue_differences = np.abs(
+    backend.get_hue(colors) - numpy_backend.get_hue(colors)) % 360
+  assert np.minimum(hue_differences,
+                    360 - hue_differences)[chromatic].max() < 1e-6
+
+
+def test_python_backend_matches_numpy_backend():
+  assert_backends_match(create_python_backend(), create_numpy_backend())
+
+
+def test_numba_backend_matches_numpy_backend():
+  pytest.importorskip('numba')
+
+  assert_backends_match(create_numba_backend(), create_numpy_backend())
+
+
+def test_select_backend(monkeypatch):
+  monkeypatch.setenv(BACKEND_ENVIRONMENT_VARIABLE, 'python')
+  assert select_backend().name == 'python'
+  assert select_backend('numpy').name == 'numpy'
+
+  monkeypatch.delenv(BACKEND_ENVIRONMENT_VARIABLE)
+  assert select_backend().name in ['numba', 'numpy']
+
+  with pytest.raises(ValueError):
+    select_backend('fortran')
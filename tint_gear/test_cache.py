@@ -0,0 +1,57 @@
+from tint_gear.cache import (
+  create_cache_key,
+  get_cache_connection,
+  load_theme,
+  quantize_populations,
+)
+from tint_gear.main import derive_theme
+
+OPTIONS = {
+  'light_theme_threshold': 0.25,
+  'alternate': False,
+  'k': 4.0,
+  'high_contrast': False,
+  'contrast_targets': None,
+}
+
+
+def test_derive_theme_cache(tmp_path, colors):
+  cache_path = str(tmp_path / 'cache.db')
+  key = create_cache_key(colors, None, OPTIONS)
+
+  assert load_theme(cache_path, key) is None
+
+  stored = derive_theme(colors, cache_path=cache_path)
+  loaded = derive_theme(colors, cache_path=cache_path)
+
+  assert stored == loaded == derive_theme(colors)
+  assert load_theme(cache_path, key) == stored
+  assert derive_theme(colors, k=2.0, cache_path=cache_path) != stored
+  assert get_cache_connection(cache_path) is get_cache_connection(cache_path)
+
+
+def test_derive_theme_cache_weighted(tmp_path, colors):
+  cache_path = str(tmp_path / 'cache.db')
+  populations = [10, 30, 5, 55]
+  scaled_populations = [population * 7 for population in populations]
+
+  stored = derive_theme(colors, populations, cache_path=cache_path)
+  loaded = derive_theme(colors, scaled_populations, cache_path=cache_path)
+
+  assert stored == derive_theme(colors, populations)
+  assert loaded == derive_theme(colors, scaled_populations)
+  assert loaded['populations'] == scaled_populations
+  assert quantize_populations(populations) == quantize_populations(
+    scaled_populations)
+  assert load_theme(
+    cache_path,
+    create_cache_key(colors, quantize_populations(populations), OPTIONS),
+  ) is not None
+
+
+def test_derive_theme_cache_unquantized_colors(tmp_path, colors):
+  cache_path = str(tmp_path / 'cache.db')
+  colors = [(r + 1e-3, g, b) for r, g, b in colors]
+
+  assert derive_theme(colors, cache_path=cache_path) == derive_theme(colors)
+  assert derive_theme(colors, cache_path=cache_path) == derive_theme(colors)
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+
+from tint_gear.batch import (
+  calculate_contrast_ratio_batch,
+  get_luminance_batch,
+)
+from tint_gear.contrast import (
+  parse_contrast_target,
+  resolve_roles,
+  solve_contrast,
+  solve_luminances,
+)
+from tint_gear.main import derive_theme
+
+EPSILON = 1e-6
+
+COLORS = [
+  (0.1, 0.2, 0.3),
+  (0.9, 0.4, 0.2),
+  (0.2, 0.8, 0.5),
+  (0.5, 0.5, 0.45),
+]
+
+
+def test_solve_luminances():
+  luminances = np.array([[0.25, 0.2, 0.22], [0.5, 0.0, 0.9]])
+  pairs = np.array([[0, 1], [2, 1]])
+  ratios = np.array([7.0, 4.5])
+
+  solved = solve_luminances(luminances, pairs, ratios)
+
+  for (foreground, background), ratio in zip(pairs, ratios):
+    contrast = calculate_contrast_ratio_batch(
+      solved[:, foreground],
+      solved[:, background],
+    )
+    assert (contrast >= ratio - EPSILON).all()
+  assert np.abs(solved[1] - luminances[1]).max() < EPSILON
+
+
+def test_solve_contrast():
+  theme = derive_theme(COLORS)
+  targets = [
+    parse_contrast_target('text:background=7'),
+    parse_contrast_target('ansi:background=4.5'),
+  ]
+
+  solved = solve_contrast(theme, targets)
+
+  for target in targets:
+    for foreground_section, foreground in resolve_roles(target.foreground):
+      for background_section, background in resolve_roles(target.background):
+        for variant in solved['bootstrap']['text']:
+          contrast = calculate_contrast_ratio_batch(
+            get_luminance_batch(
+              np.array(solved[foreground_section][foreground][variant])),
+            get_luminance_batch(
+              np.array(solved[background_section][background][variant])),
+          )
+          assert contrast >= target.ratio - EPSILON
+  assert solved['bootstrap']['danger'] is solved['terminal']['red']
+  assert solved['bootstrap']['primary'] is theme['bootstrap']['primary']
+
+
+def test_solve_contrast_infeasible():
+  theme = derive_theme(COLORS)
+  targets = [
+    parse_contrast_target('text:primary=10'),
+    parse_contrast_target('primary:background=10'),
+  ]
+
+  with pytest.raises(ValueError, match='text:primary=10'):
+    solve_contrast(theme, targets)
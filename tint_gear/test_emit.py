@@ -0,0 +1,74 @@
+import os
+
+from tint_gear.emit import (
+  BOOTSTRAP_NAMES,
+  TERMINAL_NAMES,
+  VARIANT_NAMES,
+  EMITTERS,
+  render_emitters,
+  emit_all,
+  write_atomic,
+)
+
+
+def create_deserialized_colors():
+  color_object = {variant: (0.5, 0.25, 0.75) for variant in VARIANT_NAMES}
+  return {
+    'is_light_theme': False,
+    'colors': [(0.0, 0.0, 0.0), (1.0, 1.0, 1.0)],
+    'bootstrap': {
+      name: color_object
+      for name in BOOTSTRAP_NAMES
+    },
+    'terminal': {
+      name: color_object
+      for name in TERMINAL_NAMES
+    },
+  }
+
+
+def test_render_emitters():
+  rendered = render_emitters(create_deserialized_colors(), list(EMITTERS))
+
+  assert len(rendered) == len(EMITTERS)
+  for content in rendered:
+    assert '#8040bf' in content
+    assert '$' not in content
+
+
+def test_emit_all(tmp_path):
+  template_path = tmp_path / 'template.txt'
+  template_path.write_text("${terminal_red_normal} ${is_light_theme}")
+  css_path = tmp_path / 'colors.css'
+  custom_path = tmp_path / 'custom.txt'
+
+  emit_all(
+    create_deserialized_colors(),
+    [('css', str(css_path)), (str(template_path), str(custom_path))],
+  )
+
+  assert css_path.read_text().startswith(":root {")
+  assert custom_path.read_text() == "#8040bf false"
+  assert sorted(os.listdir(tmp_path)) == [
+    'colors.css',
+    'custom.txt',
+    'template.txt',
+  ]
+
+
+def test_write_atomic_mode(tmp_path):
+  output_path = str(tmp_path / 'output.txt')
+  umask = os.umask(0o027)
+  try:
+    write_atomic(output_path, "first")
+  finally:
+    os.umask(umask)
+
+  assert os.stat(output_path).st_mode & 0o777 == 0o640
+
+  os.chmod(output_path, 0o604)
+  write_atomic(output_path, b"second")
+
+  assert os.stat(output_path).st_mode & 0o777 == 0o604
+  with open(output_path, 'r', encoding='utf-8') as output_file:
+    assert output_file.read() == "second"
@@ -0,0 +1,190 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from tint_gear.batch import SRGB_TO_LINEAR_LUT
+from tint_gear.extract import (
+  extract_prominent_colors,
+  extract_palette_histogram,
+  extract_image_statistics,
+  extract_region_palette_histograms,
+  extract_frame_palette_histograms,
+  extract_merged_frame_palette_histogram,
+  load_image_pixels,
+  sample_rows,
+  create_color_histogram,
+  create_tiled_color_histogram,
+  refine_colors,
+  sample_pixels,
+  plan_extraction,
+)
+from tint_gear.profiling import get_resident_memory
+
+RGB_MIN = 0.0
+RGB_MAX = 1.0
+
+
+def test_sample_pixels(tmp_path, create_image):
+  image_path = create_image(tmp_path / 'image.png')
+
+  pixels = sample_pixels(image_path, quality=1)
+
+  assert pixels.shape == (64 * 48, 3)
+  assert pixels.dtype == np.uint8
+
+
+def test_refine_colors(tmp_path, create_image):
+  image_path = create_image(tmp_path / 'image.png')
+  colors = extract_prominent_colors(image_path, 6)
+
+  pixels = sample_pixels(image_path)
+
+  refined, populations = refine_colors(pixels, colors)
+
+  assert len(refined) == len(populations)
+  assert 0 < len(refined) <= len(colors)
+  assert sum(populations) == len(pixels)
+  for color in refined:
+    assert all(RGB_MIN <= component <= RGB_MAX for component in color)
+
+
+def test_extract_palette_histogram(tmp_path, create_image):
+  image_path = create_image(tmp_path / 'image.png')
+
+  colors, populations = extract_palette_histogram(image_path, 6)
+
+  assert len(colors) == len(populations)
+  assert sum(populations) == len(sample_pixels(image_path))
+
+
+def test_extract_palette_histogram_flat_image(tmp_path):
+  image_path = str(tmp_path / 'flat.png')
+  Image.new('RGB', (64, 48), (30, 60, 120)).save(image_path)
+
+  colors, populations = extract_palette_histogram(image_path, 6)
+
+  assert len(colors) == 1
+  assert populations == [len(sample_pixels(image_path))]
+
+
+def test_extract_palette_histogram_flat_background(tmp_path):
+  image_path = str(tmp_path / 'subject.png')
+  generator = np.random.default_rng(0)
+  pixels = np.full((300, 400, 3), (30, 40, 60), dtype=np.uint8)
+  pixels[50:150, 50:110] = generator.integers(0, 256, (100, 60, 3))
+  pixels[200:250, 300:330] = (204, 102, 92)
+  Image.fromarray(pixels, 'RGB').save(image_path)
+
+  colors, populations = extract_palette_histogram(image_path, 8)
+
+  assert len(colors) > 3
+  assert sum(populations) == len(sample_pixels(image_path))
+  assert any(r > 0.7 and r - g > 0.2 and r - b > 0.2 for r, g, b in colors)
+
+
+def test_extract_image_statistics(tmp_path):
+  image_path = str(tmp_path / 'image.png')
+  image = Image.new('RGBA', (300, 100), (240, 240, 240, 255))
+  image.paste((255, 255, 255, 255), (0, 0, 100, 100))
+  image.paste((0, 0, 0, 0), (100, 0, 200, 100))
+  image.save(image_path)
+
+  statistics = extract_image_statistics(image_path, max_size=150)
+
+  assert sum(statistics.luminance_histogram) == 50 * 50
+  assert max(statistics.luminance_histogram) == 50 * 50
+  assert abs(statistics.average_luminance - SRGB_TO_LINEAR_LUT[240]) < 1e-6
+  assert statistics.average_saturation < 1e-3
+
+
+def test_create_tiled_color_histogram(tmp_path, create_image):
+  image_path = create_image(tmp_path / 'image.png', width=37, height=29)
+  rgba = load_image_pixels(image_path)
+
+  histogram = create_color_histogram(sample_rows(rgba))
+
+  for tile_rows in [1, 4, 29]:
+    tiled_histogram = create_tiled_color_histogram(
+      rgba,
+      workers=2,
+      tile_rows=tile_rows,
+    )
+    assert (tiled_histogram == histogram).all()
+
+
+def test_extract_palette_histogram_max_memory(tmp_path, create_image):
+  image_path = create_image(tmp_path / 'image.png', width=64, height=300)
+
+  plan = plan_extraction(64, 300, 4, 600 * 1024)
+  assert plan.scale == 1 and plan.quality == 10 and plan.tile_rows < 300
+  assert plan_extraction(4000, 3000, 4, 16 << 20).scale == 2
+  assert plan_extraction(4000, 3000, 4, 24 << 20, refine=True).quality > 10
+
+  resident_memory = get_resident_memory()
+  for max_memory, refine in [
+    (resident_memory + 600 * 1024, False),
+    (resident_memory + (1 << 30), True),
+  ]:
+    assert extract_palette_histogram(
+      image_path,
+      6,
+      refine=refine,
+      max_memory=max_memory,
+    ) == extract_palette_histogram(image_path, 6, refine=refine)
+
+  with pytest.raises(ValueError):
+    extract_palette_histogram(image_path, 6, max_memory=resident_memory // 2)
+
+
+def test_extract_region_palette_histograms(tmp_path, create_image):
+  image_path = create_image(tmp_path / 'image.png', width=90, height=40)
+  regions = [(0, 0, 30, 40), (30, 5, 31, 30), (61, 0, 29, 40)]
+
+  region_palettes = extract_region_palette_histograms(image_path, regions, 6)
+
+  rgba = load_image_pixels(image_path)
+  for (x, y, width, height), region_palette in zip(regions, region_palettes):
+    crop_path = str(tmp_path / 'crop.png')
+    Image.fromarray(rgba[y:y + height, x:x + width]).save(crop_path)
+    assert extract_palette_histogram(crop_path, 6) == region_palette
+
+
+def create_animation(image_path, frame_count=6):
+  frames = []
+  for index in range(frame_count):
+    pixels = np.zeros((30, 40, 3), dtype=np.uint8)
+    pixels[..., 0] = index * 40
+    pixels[:15, :, 1] = 200
+    pixels[:, 20:, 2] = 160
+    frames.append(Image.fromarray(pixels, 'RGB'))
+  frames[0].save(image_path, save_all=True, append_images=frames[1:])
+  return str(image_path)
+
+
+def test_extract_frame_palette_histograms(tmp_path):
+  image_path = create_animation(tmp_path / 'animation.gif')
+
+  timeline = list(extract_frame_palette_histograms(image_path, 4, frame_step=2))
+
+  assert [frame for frame, _, _ in timeline] == [0, 2, 4]
+  assert len({len(colors) for _, colors, _ in timeline}) == 1
+  for _, colors, populations in timeline:
+    assert len(colors) == len(populations)
+    for color in colors:
+      assert all(RGB_MIN <= component <= RGB_MAX for component in color)
+
+  reds = [min(color[0] for color in colors) for _, colors, _ in timeline]
+  assert reds == sorted(reds)
+
+
+def test_extract_merged_frame_palette_histogram(tmp_path):
+  image_path = create_animation(tmp_path / 'animation.gif')
+
+  colors, populations = extract_merged_frame_palette_histogram(
+    image_path,
+    4,
+    max_frames=3,
+  )
+
+  assert len(colors) == len(populations)
+  assert sum(populations) == 3 * len(sample_pixels(image_path))
@@ -0,0 +1,21 @@
+from tint_gear.backend import list_available_backends
+from tint_gear.harness import KERNELS, create_grid_levels, run_harness
+
+
+def test_create_grid_levels():
+  assert len(create_grid_levels(1)) == 256
+  assert list(create_grid_levels(100)) == [0, 100, 200, 255]
+
+
+def test_run_harness():
+  reports = run_harness(step=51, chunk_size=100)
+
+  expected = []
+  for kernel in KERNELS:
+    backends = list_available_backends() if kernel.per_backend else ['numpy']
+    expected.extend((kernel.name, backend) for backend in backends)
+
+  assert [(report.name, report.backend) for report in reports] == expected
+  for report in reports:
+    assert report.samples == 6**3
+    assert report.passed, report
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from tint_gear import index as index_module
+from tint_gear.index import (
+  append_theme_index,
+  create_theme_index,
+  extract_role_features,
+  find_duplicate_themes,
+  load_theme_index,
+  query_theme_index,
+  save_theme_index,
+)
+from tint_gear.main import derive_theme
+
+PALETTES = [
+  [(0.1, 0.2, 0.3), (0.9, 0.4, 0.2), (0.2, 0.8, 0.5), (0.95, 0.95, 0.9)],
+  [(0.1, 0.2, 0.31), (0.9, 0.4, 0.2), (0.2, 0.8, 0.5), (0.95, 0.95, 0.9)],
+  [(0.8, 0.1, 0.6), (0.1, 0.1, 0.1), (0.3, 0.6, 0.9), (0.7, 0.7, 0.2)],
+  [(0.05, 0.5, 0.1), (0.9, 0.9, 0.8), (0.6, 0.2, 0.1)],
+]
+
+
+def test_save_and_load_theme_index(tmp_path, monkeypatch):
+  themes = [derive_theme(colors) for colors in PALETTES]
+  index = create_theme_index(['a', 'b', 'c'], themes[:3])
+  index = append_theme_index(index, ['c', 'd'], themes[2:])
+
+  index_path = str(tmp_path / 'themes.npz')
+  save_theme_index(index_path, index)
+  loaded = load_theme_index(index_path)
+
+  assert loaded.paths.tolist() == ['a', 'b', 'c', 'd']
+  assert loaded.palette_sizes.tolist() == [4, 4, 4, 3]
+  assert loaded.palettes.shape == (4, 4)
+  assert np.array_equal(loaded.roles, index.roles)
+
+  with pytest.raises(ValueError):
+    create_theme_index(['a'], [])
+
+  monkeypatch.setattr(index_module, 'get_algorithm_fingerprint', lambda: '')
+  with pytest.raises(ValueError, match='rebuild'):
+    load_theme_index(index_path)
+
+
+def test_query_theme_index():
+  themes = [derive_theme(colors) for colors in PALETTES]
+  index = create_theme_index(['a', 'b', 'c', 'd'], themes)
+
+  neighbors, distances = query_theme_index(
+    index,
+    extract_role_features([themes[0], themes[2]]),
+    neighbors=2,
+  )
+
+  assert neighbors.tolist()[0] == [0, 1]
+  assert neighbors.tolist()[1][0] == 2
+  assert distances[0, 0] < 1e-6
+  assert distances[0, 0] <= distances[0, 1]
+
+  neighbors, distances = query_theme_index(
+    index,
+    extract_role_features(themes[:1]),
+    neighbors=10,
+  )
+  assert neighbors.shape == (1, 4)
+  assert np.all(np.diff(distances[0]) >= 0)
+
+  assert find_duplicate_themes(index, 0.02) == [[0, 1]]
+  assert find_duplicate_themes(index, 0.0) == []
@@ -13,10 +13,17 @@ from tint_gear.lib import (
   set_saturation,
   get_luminance,
   set_luminance,
+  calculate_average_luminance,
+  calculate_average_saturation,
   determine_theme_light_or_dark,
   determine_primary_secondary_accent,
   determine_black_white,
   determine_semantic_color,
+  create_palette_index,
+  select_by_luminance,
+  create_hue_index,
+  find_nearest_hue,
+  calculate_hue_difference,
   adjust_contrast,
 )
 
@@ -113,9 +120,9 @@ def test_srgb_to_hex_and_back(r, g, b):
   assert RGB_MIN <= g_back <= RGB_MAX
   assert RGB_MIN <= b_back <= RGB_MAX
 
-  assert abs(r - r_back) <= 1e-1
-  assert abs(g - g_back) <= 1e-1
-  assert abs(b - b_back) <= 1e-1
+  assert abs(r - r_back) <= 0.5 / 255 + EPSILON
+  assert abs(g - g_back) <= 0.5 / 255 + EPSILON
+  assert abs(b - b_back) <= 0.5 / 255 + EPSILON
 
 
 @settings(max_examples=MAX_SAMPLES)
@@ -199,6 +206,31 @@ def test_set_luminance(r, g, b, target_luminance):
   assert RGB_MIN <= b_new <= RGB_MAX
 
 
+@settings(max_examples=MAX_SAMPLES, deadline=DEADLINE)
+@given(
+  colors=st.lists(
+    st.tuples(rgb_values, rgb_values, rgb_values),
+    min_size=1,
+  ),
+  weight=st.integers(min_value=1, max_value=1000),
+)
+def test_calculate_weighted_averages(colors, weight):
+  weights = [weight] * len(colors)
+
+  assert abs(
+    calculate_average_luminance(colors, weights) -
+    calculate_average_luminance(colors)) <= EPSILON
+  assert abs(
+    calculate_average_saturation(colors, weights) -
+    calculate_average_saturation(colors)) <= EPSILON
+
+  dominant_weights = [1] * len(colors)
+  dominant_weights[0] = 10**9
+  assert abs(
+    calculate_average_luminance(colors, dominant_weights) -
+    get_luminance(*colors[0])) <= 1e-3
+
+
 @settings(max_examples=MAX_SAMPLES, deadline=DEADLINE)
 @given(average_luminance=luminance_values, )
 def test_determine_theme_light_or_dark(average_luminance) -> None:
@@ -235,6 +267,33 @@ def test_determine_primary_secondary_accent(colors, average_saturation) -> None:
   assert RGB_MIN <= accent[2] <= RGB_MAX
 
 
+@settings(max_examples=MAX_SAMPLES, deadline=DEADLINE)
+@given(
+  color=st.tuples(rgb_values, rgb_values, rgb_values),
+  repeat=st.integers(min_value=1, max_value=2),
+  is_light_theme=st.booleans(),
+)
+def test_determine_roles_with_few_colors(color, repeat, is_light_theme):
+  colors = [color] * repeat
+
+  primary, secondary, accent = determine_primary_secondary_accent(colors)
+  background_color, text_color = determine_black_white(colors, is_light_theme,
+                                                       0.1)
+
+  for role_color in [primary, secondary, accent, background_color, text_color]:
+    assert all(RGB_MIN <= component <= RGB_MAX for component in role_color)
+
+
+def test_determine_primary_secondary_accent_synthesizes_hues():
+  primary, secondary, accent = determine_primary_secondary_accent([(0.12, 0.24,
+                                                                    0.48)])
+
+  hues = [get_hue(*color) for color in [primary, secondary, accent]]
+  assert calculate_hue_difference(hues[0], hues[1]) > 90.0
+  assert calculate_hue_difference(hues[0], hues[2]) > 90.0
+  assert calculate_hue_difference(hues[1], hues[2]) > 30.0
+
+
 @settings(max_examples=MAX_SAMPLES, deadline=DEADLINE)
 @given(
   colors=st.lists(
@@ -289,6 +348,45 @@ def test_determine_semantic_color(
   assert RGB_MIN <= adjusted_color[2] <= RGB_MAX
 
 
+@settings(max_examples=MAX_SAMPLES, deadline=DEADLINE)
+@given(
+  colors=st.lists(
+    st.tuples(rgb_values, rgb_values, rgb_values),
+    min_size=1,
+  ),
+  data=st.data(),
+)
+def test_select_by_luminance(colors, data):
+  rank = data.draw(st.integers(min_value=0, max_value=len(colors) - 1))
+  palette_index = create_palette_index(colors)
+
+  darkest = colors[select_by_luminance(palette_index, rank)]
+  lightest = colors[select_by_luminance(palette_index, rank, lightest=True)]
+
+  by_luminance = sorted(colors, key=lambda color: get_luminance(*color))
+  assert darkest == by_luminance[rank]
+  assert lightest == list(reversed(by_luminance))[rank]
+
+
+@settings(max_examples=MAX_SAMPLES, deadline=DEADLINE)
+@given(
+  colors=st.lists(
+    st.tuples(rgb_values, rgb_values, rgb_values),
+    min_size=1,
+  ),
+  hue=hue_values,
+)
+def test_find_nearest_hue(colors, hue):
+  hue_index = create_hue_index(colors)
+
+  _, nearest_hue = find_nearest_hue(hue_index, hue)
+
+  expected_difference = min(
+    calculate_hue_difference(get_hue(*color), hue) for color in colors)
+  assert abs(calculate_hue_difference(nearest_hue, hue) -
+             expected_difference) <= EPSILON
+
+
 @settings(max_examples=MAX_SAMPLES, deadline=DEADLINE)
 @given(
   color=st.tuples(
@@ -0,0 +1,68 @@
+import numpy as np
+
+from tint_gear.lib import adjust_contrast
+from tint_gear.lut import (
+  apply_contrast_transform,
+  apply_recolor_transform,
+  create_lattice,
+  write_cube,
+)
+from tint_gear.main import derive_theme
+from tint_gear.recolor import create_recolor_palette
+
+
+def test_write_cube(tmp_path):
+  cube_path = tmp_path / 'theme.cube'
+  lattice = create_lattice(17)
+
+  write_cube(str(cube_path), lattice, 17)
+
+  lines = cube_path.read_text().splitlines()
+  assert lines[1] == "LUT_3D_SIZE 17"
+  assert len(lines) == 4 + 17**3
+  assert lines[5] == "0.062500 0.000000 0.000000"
+  assert np.abs(np.loadtxt(lines[4:]) - lattice).max() < 1e-6
+
+
+def test_apply_transforms(colors):
+  theme = derive_theme(colors)
+  lattice = create_lattice(17)
+
+  contrasted = apply_contrast_transform(lattice, theme)
+  assert contrasted.shape == lattice.shape
+
+  palette = create_recolor_palette(theme)
+  recolored = apply_recolor_transform(lattice, palette)
+  palette_pixels = np.rint(palette * 255)
+  assert (np.rint(recolored[:, np.newaxis] *
+                  255) == palette_pixels).all(axis=-1).any(axis=-1).all()
+
+
+def test_apply_contrast_transform_matches_theme_mapping(colors):
+  lattice = create_lattice(17)
+
+  for average_luminance, is_light_theme, high_contrast in [
+    (0.6, True, False),
+    (0.2, False, True),
+  ]:
+    theme = {
+      **derive_theme(colors),
+      'average_luminance': average_luminance,
+      'is_light_theme': is_light_theme,
+    }
+    expected = np.array([
+      adjust_contrast(
+        color,
+        average_luminance,
+        is_light=is_light_theme,
+        invert=is_light_theme,
+        high_contrast=high_contrast,
+        k=4.0,
+      ) for color in map(tuple, lattice.tolist())
+    ])
+    contrasted = apply_contrast_transform(
+      lattice,
+      theme,
+      high_contrast=high_contrast,
+    )
+    assert np.abs(contrasted - expected).max() < 1e-9
@@ -0,0 +1,33 @@
+import re
+
+from tint_gear.emit import BOOTSTRAP_NAMES, TERMINAL_NAMES
+from tint_gear.main import derive_theme
+from tint_gear.preview import render_preview, render_previews
+from tint_gear.theme import format_hex_batch, pack_theme
+
+
+def strip_ansi(text):
+  return re.sub("\033\\[[0-9;]*m", "", text)
+
+
+def test_render_preview(colors):
+  theme = derive_theme(colors)
+
+  preview = render_preview(theme)
+
+  lines = strip_ansi(preview).splitlines()
+  assert len(lines) == 3 + 2 + len(colors) + 2 * 3 + len(BOOTSTRAP_NAMES) + len(
+    TERMINAL_NAMES)
+  for line in lines:
+    assert line == line.rstrip()
+  for hex_color in format_hex_batch(pack_theme(theme).colors):
+    assert hex_color in preview
+
+
+def test_render_previews(colors):
+  themes = [derive_theme(colors), derive_theme(colors, alternate=True)]
+
+  previews = render_previews(themes, ["First", "Second"])
+
+  assert previews.startswith("First:\n\n")
+  assert "\nSecond:\n\n" in previews
@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from tint_gear import recolor
+from tint_gear.main import derive_theme
+from tint_gear.recolor import create_recolor_palette, recolor_image
+
+
+def test_recolor_image(tmp_path, colors, create_image):
+  image_path = create_image(tmp_path / 'image.png')
+  output_path = str(tmp_path / 'output.png')
+  palette = create_recolor_palette(derive_theme(colors))
+
+  for dither in [0.0, 32.0]:
+    recolor_image(image_path, output_path, palette, dither=dither, strip_rows=7)
+
+    with Image.open(output_path) as output:
+      assert output.size == (64, 48)
+      pixels = np.asarray(output)[..., :3].reshape(-1, 3)
+    palette_pixels = np.rint(palette * 255).astype(np.uint8)
+    assert (pixels[:, np.newaxis] == palette_pixels).all(axis=-1).any(
+      axis=-1).all()
+
+
+def test_recolor_image_shift(tmp_path, colors, create_image):
+  image_path = create_image(tmp_path / 'image.png')
+  output_path = str(tmp_path / 'output.png')
+  palette = create_recolor_palette(derive_theme(colors), source='colors')
+
+  recolor_image(image_path, output_path, palette, mode='shift', strength=0.0)
+
+  with Image.open(image_path) as image, Image.open(output_path) as output:
+    difference = np.abs(
+      np.asarray(image.convert('RGB')).astype(int) -
+      np.asarray(output.convert('RGB')).astype(int))
+  assert difference.max() <= 1
+
+
+def test_recolor_image_streams_png(tmp_path, colors):
+  rng = np.random.default_rng(0)
+  image_path = str(tmp_path / 'image.png')
+  Image.fromarray(rng.integers(0, 256, size=(45, 30, 4), dtype=np.uint8),
+                  'RGBA').save(image_path)
+  palette = create_recolor_palette(derive_theme(colors))
+
+  recolor_image(image_path,
+                str(tmp_path / 'output.png'),
+                palette,
+                dither=8.0,
+                strip_rows=7)
+  recolor_image(image_path, str(tmp_path / 'output.tiff'), palette, dither=8.0)
+
+  with Image.open(tmp_path / 'output.png') as streamed, Image.open(
+      tmp_path / 'output.tiff') as pasted:
+    assert streamed.mode == pasted.mode == 'RGBA'
+    assert np.array_equal(np.asarray(streamed), np.asarray(pasted))
+
+
+def test_recolor_image_in_place(tmp_path, colors, create_image):
+  image_path = create_image(tmp_path / 'image.png')
+  output_path = str(tmp_path / 'output.png')
+  palette = create_recolor_palette(derive_theme(colors))
+
+  recolor_image(image_path, output_path, palette, strip_rows=7)
+  recolor_image(image_path, image_path, palette, strip_rows=7)
+
+  with Image.open(image_path) as image, Image.open(output_path) as output:
+    assert np.array_equal(np.asarray(image), np.asarray(output))
+  assert sorted(os.listdir(tmp_path)) == ['image.png', 'output.png']
+
+
+def test_recolor_image_interrupted(tmp_path, colors, create_image, monkeypatch):
+  image_path = create_image(tmp_path / 'image.png')
+  palette = create_recolor_palette(derive_theme(colors))
+  with open(image_path, 'rb') as image_file:
+    original = image_file.read()
+  strips = []
+
+  def fail_recolor_pixels(rgb, *args, **kwargs):
+    strips.append(rgb)
+    if len(strips) > 1:
+      raise KeyboardInterrupt
+    return rgb
+
+  monkeypatch.setattr(recolor, 'recolor_pixels', fail_recolor_pixels)
+
+  for output_path in [image_path, str(tmp_path / 'output.tiff')]:
+    strips.clear()
+    with pytest.raises(KeyboardInterrupt):
+      recolor_image(image_path, output_path, palette, strip_rows=7)
+
+  with open(image_path, 'rb') as image_file:
+    assert image_file.read() == original
+  assert os.listdir(tmp_path) == ['image.png']
@@ -0,0 +1,86 @@
+import numpy as np
+from PIL import Image
+
+from tint_gear.extract import load_image_pixels
+from tint_gear.main import derive_theme, process, process_batch, serialize_colors
+from tint_gear.shared import (
+  decode_shared_pixels,
+  load_shared_theme,
+  read_shared_array,
+  share_array,
+  share_theme,
+  unlink_shared_array,
+  unlink_shared_theme,
+)
+
+
+def test_share_theme():
+  array = np.arange(12, dtype=np.uint32).reshape(3, 4)
+  handle = share_array(array)
+  try:
+    assert np.array_equal(read_shared_array(handle), array)
+  finally:
+    unlink_shared_array(handle)
+
+  deserialized_colors = derive_theme(
+    [(0.1, 0.2, 0.3), (0.9, 0.4, 0.2), (0.2, 0.8, 0.5), (0.95, 0.95, 0.9)],
+    populations=[4, 3, 2, 1],
+  )
+  shared_theme = share_theme(deserialized_colors)
+  try:
+    loaded_colors = load_shared_theme(shared_theme)
+  finally:
+    unlink_shared_theme(shared_theme)
+
+  assert serialize_colors(loaded_colors) == serialize_colors(
+    deserialized_colors)
+  assert loaded_colors['average_luminance'] == deserialized_colors[
+    'average_luminance']
+  assert loaded_colors['populations'] == [4, 3, 2, 1]
+
+
+def test_process_batch(tmp_path, create_image):
+  image_paths = [
+    create_image(tmp_path / f"image{shift}.png", height=600, shift=shift)
+    for shift in [0, 60, 120]
+  ]
+
+  batch_colors = process_batch(
+    image_paths,
+    processes=2,
+    weighted=True,
+    refine=True,
+  )
+
+  assert [serialize_colors(colors) for colors in batch_colors] == [
+    serialize_colors(process(image_path, weighted=True, refine=True))
+    for image_path in image_paths
+  ]
+
+
+def test_decode_shared_pixels(tmp_path, create_image):
+  image_path = create_image(tmp_path / 'image.png', height=600)
+
+  handle = decode_shared_pixels(image_path)
+  try:
+    assert np.array_equal(read_shared_array(handle),
+                          load_image_pixels(image_path))
+  finally:
+    unlink_shared_array(handle)
+
+
+def test_process_batch_reports_image_errors(tmp_path, create_image):
+  image_paths = [
+    create_image(tmp_path / 'image.png', height=600),
+    str(tmp_path / 'white.png'),
+    str(tmp_path / 'broken.png'),
+  ]
+  Image.new('RGB', (32, 32), (255, 255, 255)).save(image_paths[1])
+  (tmp_path / 'broken.png').write_bytes(b'not an image')
+
+  batch_colors = process_batch(image_paths, processes=2)
+
+  assert serialize_colors(batch_colors[0]) == serialize_colors(
+    process(image_paths[0]))
+  assert isinstance(batch_colors[1], ValueError)
+  assert isinstance(batch_colors[2], OSError)
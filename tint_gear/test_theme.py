@@ -0,0 +1,117 @@
+import hashlib
+import json
+
+import numpy as np
+from PIL import Image
+
+from tint_gear.backend import get_backend, set_backend
+
+from tint_gear.lib import srgb_to_hex
+from tint_gear.main import (
+  derive_theme,
+  process,
+  process_statistics,
+  serialize_colors,
+)
+from tint_gear.theme import (
+  ALGORITHM_VERSION,
+  get_algorithm_fingerprint,
+  deserialize_colors,
+  flatten_theme,
+  format_ansi_batch,
+  format_hex_batch,
+  pack_theme,
+  unpack_theme,
+)
+
+PINNED_OUTPUTS = {
+  2: 'ceeb38db405fde75f74582c6c626c03f83140e89ceaed9b935b3dbcf0bb97af6',
+}
+
+
+def test_pack_theme(colors):
+  theme = derive_theme(colors)
+
+  packed_theme = pack_theme(theme)
+
+  _, colors = flatten_theme(theme)
+  assert packed_theme.colors.dtype == np.uint32
+  assert format_hex_batch(
+    packed_theme.colors) == [srgb_to_hex(*color) for color in colors.tolist()]
+  assert serialize_colors(unpack_theme(packed_theme)) == serialize_colors(theme)
+
+
+def test_format_ansi_batch():
+  packed = np.array([0x102030, 0xffffff], dtype=np.uint32)
+
+  assert format_ansi_batch(packed) == [
+    "\033[38;2;16;32;48m#102030\033[0m",
+    "\033[38;2;255;255;255m#ffffff\033[0m",
+  ]
+  assert format_ansi_batch(
+    packed,
+    2)[0] == ("\033[48;2;16;32;48m  \033[0m \033[38;2;16;32;48m#102030\033[0m")
+
+
+def test_deserialize_colors(colors):
+  serialized_colors = serialize_colors(derive_theme(colors))
+
+  deserialized_colors = deserialize_colors(serialized_colors)
+
+  assert serialize_colors(deserialized_colors) == serialized_colors
+
+
+def test_serialize_colors_with_ties(colors):
+  colors = colors + [colors[1], colors[2]]
+
+  serialized_colors = serialize_colors(derive_theme(colors))
+
+  assert serialized_colors['algorithmVersion'] == ALGORITHM_VERSION
+  assert serialized_colors == serialize_colors(derive_theme(colors))
+
+
+def test_process_statistics_matches_process(tmp_path):
+  rng = np.random.default_rng(0)
+  pixels = np.full((300, 400, 3), 255, dtype=np.uint8)
+  pixels[150:] = rng.integers(0, 120, size=(150, 400, 3), dtype=np.uint8)
+  pixels[150:, :100] = (230, 230, 230)
+  image_path = str(tmp_path / 'image.png')
+  Image.fromarray(pixels).save(image_path)
+
+  for options in [
+    {},
+    {
+      'light_theme_threshold': 0.1
+    },
+    {
+      'alternate': True
+    },
+  ]:
+    statistics = process_statistics(image_path, **options)
+    theme = process(image_path, weighted=True, **options)
+
+    assert statistics['is_light_theme'] == theme['is_light_theme']
+
+
+def test_algorithm_version_pins_output(tmp_path, create_image):
+  image_path = create_image(tmp_path / 'image.png')
+
+  serialized_colors = serialize_colors(process(image_path))
+  digest = hashlib.sha256(
+    json.dumps(serialized_colors, sort_keys=True).encode('utf-8')).hexdigest()
+
+  assert digest == PINNED_OUTPUTS.get(ALGORITHM_VERSION)
+
+
+def test_get_algorithm_fingerprint():
+  backend_name = get_backend().name
+  try:
+    set_backend('python')
+    python_fingerprint = get_algorithm_fingerprint()
+    set_backend('numpy')
+    numpy_fingerprint = get_algorithm_fingerprint()
+  finally:
+    set_backend(backend_name)
+
+  assert python_fingerprint == numpy_fingerprint
+  assert get_algorithm_fingerprint() == get_algorithm_fingerprint()
@@ -0,0 +1,81 @@
+import numpy as np
+from PIL import Image
+
+from tint_gear.main import derive_theme, process
+from tint_gear.result import load_result
+from tint_gear.theme import flatten_theme
+from tint_gear.transition import interpolate_themes
+
+EPSILON = 1e-6
+
+FIRST_COLORS = [
+  (0.1, 0.2, 0.3),
+  (0.9, 0.4, 0.2),
+  (0.2, 0.8, 0.5),
+  (0.95, 0.95, 0.9),
+]
+
+SECOND_COLORS = [
+  (0.0, 0.0, 1.0),
+  (1.0, 0.0, 0.0),
+  (0.1, 0.1, 0.1),
+  (0.3, 0.9, 0.9),
+]
+
+
+def test_interpolate_themes():
+  first = derive_theme(FIRST_COLORS)
+  second = derive_theme(SECOND_COLORS)
+
+  themes = interpolate_themes(first, second, 5, endpoints=True)
+
+  assert len(themes) == 5
+  _, first_colors = flatten_theme(first)
+  _, second_colors = flatten_theme(second)
+  _, start_colors = flatten_theme(themes[0])
+  _, end_colors = flatten_theme(themes[-1])
+  assert np.abs(start_colors - first_colors).max() < EPSILON
+  assert np.abs(end_colors - second_colors).max() < EPSILON
+  for theme in themes:
+    _, colors = flatten_theme(theme)
+    assert ((colors >= 0.0) & (colors <= 1.0)).all()
+    assert len(theme['colors']) == len(FIRST_COLORS)
+
+
+def test_interpolate_themes_without_endpoints():
+  first = derive_theme(FIRST_COLORS)
+  second = derive_theme(SECOND_COLORS)
+
+  themes = interpolate_themes(first, second, 3)
+
+  assert len(themes) == 3
+  assert themes[0]['is_light_theme'] == first['is_light_theme']
+  assert themes[-1]['is_light_theme'] == second['is_light_theme']
+
+
+def test_interpolate_themes_with_reordered_roles():
+  first = derive_theme(FIRST_COLORS)
+  second = derive_theme(SECOND_COLORS)
+  reordered = {
+    **second,
+    'terminal': dict(reversed(list(second['terminal'].items()))),
+  }
+
+  themes = interpolate_themes(first, reordered, 2, endpoints=True)
+
+  assert themes[-1]['terminal'] == second['terminal']
+  assert themes[-1]['bootstrap'] == second['bootstrap']
+
+
+def test_load_result_theme_options(tmp_path):
+  rng = np.random.default_rng(0)
+  image_path = str(tmp_path / 'image.png')
+  Image.fromarray(rng.integers(0, 256, size=(40, 60, 3),
+                               dtype=np.uint8)).save(image_path)
+
+  assert load_result(image_path, num_colors=3) == process(image_path,
+                                                          num_colors=3)
+  assert len(load_result(image_path, num_colors=3)['colors']) < len(
+    load_result(image_path)['colors'])
+  assert load_result(image_path, k=2.0) == process(image_path, k=2.0)
+  assert load_result(image_path, k=2.0) != load_result(image_path)
@@ -0,0 +1,183 @@
+import hashlib
+import json
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+import numpy as np
+from colorthief import MMCQ
+
+from tint_gear.batch import pack_colors_batch, unpack_colors_batch
+from tint_gear.extract import (
+  ALPHA_THRESHOLD,
+  FLAT_MAX_BINS,
+  FLAT_MIN_COVERAGE,
+  KMEANS_MAX_ITERATIONS,
+  KMEANS_SEED,
+  KMEANS_TOLERANCE,
+  SAMPLE_QUALITY,
+  WHITE_THRESHOLD,
+)
+from tint_gear.lib import (
+  calculate_average_luminance,
+  calculate_average_saturation,
+  hex_to_srgb,
+)
+
+ALGORITHM_VERSION = 2
+ALGORITHM_FINGERPRINT_LENGTH = 16
+
+THEME_SECTIONS = ['bootstrap', 'terminal']
+
+ThemeRole = Tuple[str, str, str]
+FlatTheme = Tuple[List[ThemeRole], np.ndarray]
+
+
+def get_algorithm_fingerprint() -> str:
+  parameters = {
+    'version':
+    ALGORITHM_VERSION,
+    'mmcq': [
+      MMCQ.SIGBITS,
+      MMCQ.RSHIFT,
+      MMCQ.MAX_ITERATION,
+      MMCQ.FRACT_BY_POPULATIONS,
+    ],
+    'sampling': [SAMPLE_QUALITY, ALPHA_THRESHOLD, WHITE_THRESHOLD],
+    'flat': [FLAT_MAX_BINS, FLAT_MIN_COVERAGE],
+    'kmeans': [KMEANS_SEED, KMEANS_MAX_ITERATIONS, KMEANS_TOLERANCE],
+  }
+  serialized = json.dumps(parameters, sort_keys=True, separators=(',', ':'))
+  return hashlib.sha256(
+    serialized.encode('utf-8')).hexdigest()[:ALGORITHM_FINGERPRINT_LENGTH]
+
+
+def assert_same_roles(roles: List[ThemeRole], other_roles: List[ThemeRole]):
+  if len(roles) != len(other_roles) or set(roles) != set(other_roles):
+    raise ValueError("Themes must have the same named colors and variants.")
+
+
+def flatten_theme(deserialized_colors: dict) -> FlatTheme:
+  roles = []
+  colors = []
+  for section in THEME_SECTIONS:
+    for name, color_object in deserialized_colors[section].items():
+      for variant, color in color_object.items():
+        roles.append((section, name, variant))
+        colors.append(color)
+
+  return roles, np.array(colors, dtype=np.float64).reshape(-1, 3)
+
+
+def nest_roles(
+  roles: List[ThemeRole],
+  values: List[Any],
+) -> Dict[str, Dict[str, Dict[str, Any]]]:
+  nested: Dict[str, Dict[str, Dict[str, Any]]] = {
+    section: {}
+    for section in THEME_SECTIONS
+  }
+  for (section, name, variant), value in zip(roles, values):
+    nested[section].setdefault(name, {})[variant] = value
+
+  return nested
+
+
+def unflatten_theme(
+  roles: List[ThemeRole],
+  colors: np.ndarray,
+) -> Dict[str, Dict[str, Dict[str, Tuple[float, float, float]]]]:
+  return nest_roles(roles, [tuple(color) for color in colors.tolist()])
+
+
+class PackedTheme(NamedTuple):
+  is_light_theme: bool
+  roles: List[ThemeRole]
+  colors: np.ndarray
+  palette: np.ndarray
+
+
+def pack_theme(deserialized_colors: dict) -> PackedTheme:
+  roles, colors = flatten_theme(deserialized_colors)
+  palette = np.array(deserialized_colors['colors'],
+                     dtype=np.float64).reshape(-1, 3)
+
+  return PackedTheme(
+    is_light_theme=deserialized_colors['is_light_theme'],
+    roles=roles,
+    colors=pack_colors_batch(colors),
+    palette=pack_colors_batch(palette),
+  )
+
+
+def unpack_theme(packed_theme: PackedTheme) -> dict:
+  colors = [
+    tuple(color)
+    for color in unpack_colors_batch(packed_theme.palette).tolist()
+  ]
+  return {
+    'average_luminance':
+    calculate_average_luminance(colors),
+    'average_saturation':
+    calculate_average_saturation(colors),
+    'is_light_theme':
+    packed_theme.is_light_theme,
+    'colors':
+    colors,
+    'populations':
+    None,
+    **unflatten_theme(
+      packed_theme.roles,
+      unpack_colors_batch(packed_theme.colors),
+    ),
+  }
+
+
+def format_hex_batch(packed: np.ndarray) -> List[str]:
+  return [f"#{value:06x}" for value in packed.tolist()]
+
+
+def format_ansi_batch(
+  packed: np.ndarray,
+  swatch_width: int = 0,
+) -> List[str]:
+  formatted = []
+  for value in packed.tolist():
+    rgb = f"{value >> 16};{(value >> 8) & 0xff};{value & 0xff}"
+    swatch = (f"\033[48;2;{rgb}m{' ' * swatch_width}\033[0m "
+              if swatch_width > 0 else "")
+    formatted.append(f"{swatch}\033[38;2;{rgb}m#{value:06x}\033[0m")
+  return formatted
+
+
+def serialize_packed_theme(packed_theme: PackedTheme) -> dict:
+  return {
+    'algorithmVersion': ALGORITHM_VERSION,
+    'isLightTheme': packed_theme.is_light_theme,
+    'colors': format_hex_batch(packed_theme.palette),
+    **nest_roles(packed_theme.roles, format_hex_batch(packed_theme.colors)),
+  }
+
+
+def deserialize_colors(serialized_colors: dict) -> dict:
+  colors = [hex_to_srgb(color) for color in serialized_colors['colors']]
+  deserialized_colors = {
+    'average_luminance': calculate_average_luminance(colors),
+    'average_saturation': calculate_average_saturation(colors),
+    'is_light_theme': serialized_colors['isLightTheme'],
+    'colors': colors,
+    'populations': None,
+    **{
+      section: {
+        name: {
+          variant: hex_to_srgb(color)
+          for variant, color in color_object.items()
+        }
+        for name, color_object in serialized_colors[section].items()
+      }
+      for section in THEME_SECTIONS
+    },
+  }
+
+  if 'frame' in serialized_colors:
+    deserialized_colors['frame'] = serialized_colors['frame']
+
+  return deserialized_colors
@@ -0,0 +1,186 @@
+import argparse
+from typing import List
+
+import numpy as np
+
+from tint_gear.backend import get_backend
+from tint_gear.emit import EMITTERS, emit_all
+from tint_gear.main import print_colors_list
+from tint_gear.result import (
+  add_theme_arguments,
+  get_theme_options,
+  load_result,
+)
+from tint_gear.theme import (
+  assert_same_roles,
+  flatten_theme,
+  unflatten_theme,
+)
+
+DEFAULT_STEPS = 8
+
+
+def assert_steps(steps):
+  if not isinstance(steps, int):
+    raise TypeError("steps must be an integer.")
+  if steps <= 0:
+    raise ValueError("steps must be a positive integer.")
+
+
+def main():
+  parsed_args = parse_args()
+
+  theme_options = get_theme_options(parsed_args)
+  themes = interpolate_themes(
+    load_result(parsed_args.first, **theme_options),
+    load_result(parsed_args.second, **theme_options),
+    parsed_args.steps,
+    endpoints=parsed_args.endpoints,
+  )
+
+  if parsed_args.emit:
+    for index, deserialized_colors in enumerate(themes):
+      emit_all(
+        deserialized_colors,
+        [(emitter, output_path.format(step=index))
+         for emitter, output_path in parsed_args.emit],
+      )
+
+  print_colors_list(
+    themes,
+    [f"Step {index}" for index in range(len(themes))],
+    parsed_args.pretty,
+    parsed_args.json,
+  )
+
+
+def create_steps(steps: int, endpoints: bool = False) -> np.ndarray:
+  assert_steps(steps)
+
+  if endpoints:
+    return np.linspace(0.0, 1.0, steps)
+
+  return np.linspace(0.0, 1.0, steps + 2)[1:-1]
+
+
+def interpolate_themes(
+  first: dict,
+  second: dict,
+  steps: int = DEFAULT_STEPS,
+  endpoints: bool = False,
+) -> List[dict]:
+  roles, first_colors = flatten_theme(first)
+  other_roles, second_colors = flatten_theme(second)
+  assert_same_roles(roles, other_roles)
+  other_indices = {role: index for index, role in enumerate(other_roles)}
+  second_colors = second_colors[[other_indices[role] for role in roles]]
+
+  role_count = len(roles)
+  interpolate_palette = len(first['colors']) == len(second['colors'])
+  if interpolate_palette:
+    first_colors = np.concatenate(
+      [first_colors, np.array(first['colors']).reshape(-1, 3)])
+    second_colors = np.concatenate(
+      [second_colors, np.array(second['colors']).reshape(-1, 3)])
+
+  t = create_steps(steps, endpoints)
+  backend = get_backend()
+  first_oklab = backend.srgb_to_oklab(first_colors)
+  second_oklab = backend.srgb_to_oklab(second_colors)
+  difference = second_oklab - first_oklab
+  offsets = t[:, np.newaxis, np.newaxis] * difference
+  interpolated = backend.gamut_map_oklab(first_oklab + offsets)
+  interpolated[t == 0.0] = first_colors
+  interpolated[t == 1.0] = second_colors
+
+  themes = []
+  for step, colors in zip(t.tolist(), interpolated):
+    nearest = first if step < 0.5 else second
+    average_luminance = first['average_luminance'] + step * (
+      second['average_luminance'] - first['average_luminance'])
+    average_saturation = first['average_saturation'] + step * (
+      second['average_saturation'] - first['average_saturation'])
+    palette = nearest['colors']
+    if interpolate_palette:
+      palette = [tuple(color) for color in colors[role_count:].tolist()]
+
+    themes.append({
+      'average_luminance': average_luminance,
+      'average_saturation': average_saturation,
+      'is_light_theme': nearest['is_light_theme'],
+      'colors': palette,
+      'populations': nearest['populations'],
+      **unflatten_theme(roles, colors[:role_count]),
+    })
+
+  return themes
+
+
+def parse_args():
+  parser = argparse.ArgumentParser(description="Tint Gear transition")
+
+  parser.add_argument(
+    'first',
+    type=str,
+    help="Path to the first image or tint-gear json result.",
+  )
+
+  parser.add_argument(
+    'second',
+    type=str,
+    help="Path to the second image or tint-gear json result.",
+  )
+
+  parser.add_argument(
+    '--steps',
+    type=int,
+    default=DEFAULT_STEPS,
+    help="Number of interpolated themes",
+  )
+
+  parser.add_argument(
+    '--endpoints',
+    action='store_true',
+    help="Include the first and second themes in the steps",
+  )
+
+  add_theme_arguments(parser)
+
+  parser.add_argument(
+    '--pretty',
+    action='store_true',
+    help="Pretty print all colors",
+  )
+
+  parser.add_argument(
+    '--json',
+    action='store_true',
+    help="When pretty printing, print indented json instead",
+  )
+
+  parser.add_argument(
+    '--emit',
+    nargs=2,
+    action='append',
+    metavar=('EMITTER', 'OUTPUT_PATH'),
+    help=("Render each step with an emitter and atomically write it to a "
+          f"file; emitter is one of {', '.join(EMITTERS)} or a template "
+          "file path; {step} in the path is replaced by the step index"),
+  )
+
+  parsed_args = parser.parse_args()
+
+  if parsed_args.steps <= 0:
+    parser.error("--steps must be a positive integer")
+
+  if (parsed_args.steps > 1 and parsed_args.emit
+      and any('{step}' not in output_path
+              for _, output_path in parsed_args.emit)):
+    parser.error("--emit output paths must contain {step} "
+                 "when multiple steps are generated")
+
+  return parsed_args
+
+
+if __name__ == '__main__':
+  main()